@@ -0,0 +1,92 @@
+# compares the token based format_sql with the old regex beautify on big scripts
+# usage: python benchmarks/bench_beautify.py [lines]
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from sql_formatter import format_sql
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "create_test_db")
+
+
+def legacy_beautify(raw_sql):
+    """The regex beautify from before the tokenizer, kept here as the baseline."""
+    keywords = [
+        "select", "from", "where", "join", "inner", "left", "right", "on",
+        "group by", "order by", "having", "limit", "offset", "insert", "into",
+        "values", "update", "set", "delete", "create", "table", "drop", "alter",
+        "add", "distinct", "union", "all", "as", "and", "or", "not", "in", "is",
+        "null", "like", "between", "exists", "case", "when", "then", "else", "end",
+        "sum", "avg", "min", "max", "count", "upper", "lower", "show", "desc", "asc"
+    ]
+    for kw in sorted(keywords, key=len, reverse=True):
+        pattern = r"\b" + re.escape(kw) + r"\b"
+        raw_sql = re.sub(pattern, lambda match: match.group(0).upper(), raw_sql, flags=re.IGNORECASE)
+
+    new_line_keywords = [
+        "FROM", "WHERE", "GROUP BY", "ORDER BY", "HAVING", "LIMIT", "OFFSET",
+        "INNER JOIN", "LEFT JOIN", "RIGHT JOIN", "UNION", "VALUES", "SET"
+    ]
+    formatted_sql = raw_sql
+    for kw in new_line_keywords:
+        pattern = r"\s*\b" + re.escape(kw) + r"\b\s*"
+        formatted_sql = re.sub(pattern, f"\n  {kw} ", formatted_sql, flags=re.IGNORECASE)
+
+    output_lines = []
+    for line in formatted_sql.split('\n'):
+        if line.strip().startswith("SELECT"):
+            parts = [p.strip() for p in line[6:].split(',')]
+            if len(parts) > 1:
+                output_lines.append(line.split(' ', 1)[0])
+                for part in parts:
+                    if part:
+                        output_lines.append(f"    {part},")
+                if output_lines and output_lines[-1].endswith(','):
+                    output_lines[-1] = output_lines[-1][:-1]
+                continue
+        if " JOIN " in line.upper() and " ON " in line.upper():
+            line = re.sub(r"\bON\b", "\n    ON", line, flags=re.IGNORECASE)
+        output_lines.append(line.strip())
+
+    final_sql = "\n".join(output_lines)
+    return re.sub(r'\n\s*\n', '\n', final_sql).strip()
+
+
+def build_script(lines):
+    """Repeats the sql files of create_test_db until the script has about the given number of lines."""
+    parts = []
+    for name in sorted(os.listdir(SQL_DIR)):
+        if name.endswith(".sql"):
+            with open(os.path.join(SQL_DIR, name), encoding="utf-8") as f:
+                parts.append(f.read().strip().rstrip(";") + ";\n")
+    chunk = "".join(parts)
+    repeat = max(1, lines // chunk.count("\n"))
+    return chunk * repeat
+
+
+def measure(function, script, rounds=3):
+    best = None
+    for _ in range(rounds):
+        start_time = time.perf_counter()
+        function(script)
+        duration = time.perf_counter() - start_time
+        best = duration if best is None else min(best, duration)
+    return best
+
+
+def main():
+    target_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    for lines in sorted({500, target_lines // 2, target_lines}):
+        script = build_script(lines)
+        legacy = measure(legacy_beautify, script)
+        tokenized = measure(format_sql, script)
+        print(
+            f"{script.count(chr(10)):>7} lines  legacy regex: {legacy:8.3f} sec  "
+            f"tokenizer: {tokenized:8.3f} sec  speedup: {legacy / tokenized:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
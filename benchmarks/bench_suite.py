@@ -0,0 +1,343 @@
+# reproducible benchmarks of the hot paths: fetch, result store, tree fill, copy, csv export, beautify, DESC all
+# usage: python benchmarks/bench_suite.py [--backend sqlite|mysql] [--scales 10000,100000,1000000] [--seed 42]
+#                                         [--seed-mysql] [--out results.json] [--compare old_results.json]
+#
+# the dataset is made by generate_data.py with fixed seeds. --backend sqlite (default) loads it into a local
+# sqlite file as stand-in for the server, so the gui side can be measured without mysql. --backend mysql
+# uses the wws_test database of generate_data.py, --seed-mysql refills it (truncates the tables!).
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import re
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(BENCH_DIR, "..")
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "create_test_db"))
+import engine
+from sql_formatter import format_sql
+
+DATA_DIR = os.path.join(BENCH_DIR, "data")        # cached sqlite datasets, one file per scale and seed
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+SCHEMA_SQL = os.path.join(ROOT_DIR, "create_test_db", "wws_test.sql")
+BEAUTIFY_SQL = os.path.join(ROOT_DIR, "create_test_db", "test_gui_performance.sql")
+
+DEFAULT_SCALES = [10000, 100000, 1000000]
+FETCH_BATCH_SIZE = 1000     # same as main.py
+VISIBLE_ROWS = 40           # rows of the virtual grid window
+TREE_REFRESHES = 200        # scroll positions painted in the tree fill benchmark
+BEAUTIFY_LINES = 5000
+REGRESSION_THRESHOLD = 1.2  # --compare reports a benchmark as regression when it got 20% slower
+
+
+def configure_generator(scale, seed):
+    """Sets counts and seeds of generate_data.py, scale = number of kunden (and bestellungen)."""
+    import generate_data
+    generate_data.SEED = seed
+    generate_data.NUM_KUNDEN = scale
+    generate_data.NUM_BESTELLUNGEN = scale
+    generate_data.NUM_PRODUKTE = max(scale // 10, 10)
+    generate_data.NUM_LIEFERANTEN = max(scale // 25, 10)
+    generate_data.NUM_THREADS = 1 # one insert worker, so the auto increment ids are the same on every run
+    return generate_data
+
+
+def sqlite_schema_statements():
+    """The tables of wws_test.sql translated to sqlite."""
+    with open(SCHEMA_SQL, encoding="utf-8") as f:
+        script = f.read()
+    for statement in engine.split_sql_statements(script):
+        if re.match(r"(CREATE\s+DATABASE|USE)\b", statement, re.IGNORECASE):
+            continue
+        statement = re.sub(r"INT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY", "INTEGER PRIMARY KEY", statement, flags=re.IGNORECASE)
+        yield re.sub(r"ENUM\([^)]*\)", "TEXT", statement, flags=re.IGNORECASE)
+
+
+def seed_sqlite(path, scale, seed):
+    """Fills a sqlite file with the kunden, produkte and lieferanten rows of generate_data.py.
+
+    The batches come from the same process pool shards as for mysql, only the insert differs.
+    bestellungen need mysql (lastrowid of multi-row inserts).
+    """
+    generate_data = configure_generator(scale, seed)
+    os.makedirs(DATA_DIR, exist_ok=True)
+    temp_path = path + ".tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    conn = sqlite3.connect(temp_path)
+    for statement in sqlite_schema_statements():
+        conn.execute(statement)
+    counts = {
+        "kunden": generate_data.NUM_KUNDEN,
+        "produkte": generate_data.NUM_PRODUKTE,
+        "lieferanten": generate_data.NUM_LIEFERANTEN,
+    }
+    with multiprocessing.Pool(generate_data.NUM_PROCESSES) as pool:
+        for _, sql, batch in generate_data.iter_primary_batches(pool, counts):
+            conn.executemany(sql.replace("%s", "?").replace("INSERT IGNORE", "INSERT OR IGNORE"), batch)
+    conn.commit()
+    conn.close()
+    os.replace(temp_path, path)
+    print()
+
+
+def sqlite_schema(conn):
+    """Schema in the layout of engine.load_schema (DESCRIBE-like rows) from sqlite's table_info."""
+    tables = {}
+    for (table_name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name").fetchall():
+        tables[table_name] = [
+            (name, column_type, "NO" if not_null else "YES", "PRI" if primary_key else "", default, "")
+            for _, name, column_type, not_null, default, primary_key in conn.execute(f"PRAGMA table_info(`{table_name}`)")
+        ]
+    return {"tables": tables, "loaded_at": time.time()}
+
+
+def open_backend(args, scale):
+    """Returns (connection, schema loader) of the dataset at the given scale."""
+    if args.backend == "mysql":
+        import generate_data
+        if args.seed_mysql:
+            configure_generator(scale, args.seed).main()
+        conn = engine.acquire_connection(generate_data.DATABASE)
+        return conn, lambda: engine.get_schema(conn, generate_data.DATABASE, refresh=True)
+
+    path = os.path.join(DATA_DIR, f"wws_{scale}_seed{args.seed}.sqlite3")
+    if not os.path.exists(path):
+        print(f"seeding {path} ...")
+        seed_sqlite(path, scale, args.seed)
+    conn = sqlite3.connect(path)
+    return conn, lambda: sqlite_schema(conn)
+
+
+def measure(function, rounds):
+    """Best time of several rounds plus the peak python memory of one extra traced run.
+
+    function returns the number of rows it processed.
+    """
+    best = None
+    for _ in range(rounds):
+        start_time = time.perf_counter()
+        rows = function()
+        duration = time.perf_counter() - start_time
+        best = duration if best is None else min(best, duration)
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result = {"seconds": round(best, 6), "rows": rows, "peak_mb": round(peak / 1024 / 1024, 2)}
+    if rows and best:
+        result["rows_per_sec"] = round(rows / best)
+    return result
+
+
+def fetch_rows(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM kunden")
+    columns = [desc[0] for desc in cursor.description]
+    rows = []
+    for batch in iter(lambda: cursor.fetchmany(FETCH_BATCH_SIZE), []):
+        rows.extend(batch)
+    cursor.close()
+    return columns, rows
+
+
+def build_store(columns, rows):
+    """The column store of the grid (engine.extend_column_store), filled in fetch batches."""
+    store = {"columns": columns, "data": [[] for _ in columns], "rows": 0}
+    for start in range(0, len(rows), FETCH_BATCH_SIZE):
+        engine.extend_column_store(store, rows[start:start + FETCH_BATCH_SIZE])
+    return store
+
+
+def copy_text(store):
+    """Clipboard text of "Copy All Data" (engine.tab_separated_text)."""
+    return engine.tab_separated_text(store["columns"], zip(*store["data"]))
+
+
+def fill_tree(root, store):
+    """Paints the virtual grid window at TREE_REFRESHES scroll positions with the window and row
+    helpers of main.refresh_result_view, the tree items are recycled like there."""
+    from tkinter import ttk
+    tree = ttk.Treeview(root, columns=store["columns"], show="headings")
+    for column in store["columns"]:
+        tree.heading(column, text=column)
+    total = store["rows"]
+    offsets = random.Random(0).choices(range(max(total, 1)), k=TREE_REFRESHES)
+    items = []
+    painted = 0
+    for requested_offset in offsets:
+        offset, wanted = engine.clamp_view_window(requested_offset, VISIBLE_ROWS, total)
+        for position in range(wanted):
+            values = engine.column_store_row(store["data"], offset + position)
+            if position < len(items):
+                tree.item(items[position], values=values)
+            else:
+                items.append(tree.insert("", "end", values=values))
+        painted += wanted
+    root.update_idletasks()
+    tree.destroy()
+    return painted
+
+
+def export_csv(conn, path):
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM kunden")
+    with engine.open_export_file(path) as f:
+        rows = engine.write_result_set(cursor, f, "csv")
+    cursor.close()
+    return rows
+
+
+def open_tk():
+    """A hidden tk root for the tree and clipboard benchmarks, None without a display."""
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as err: # ImportError or TclError (no $DISPLAY)
+        print(f"tk benchmarks skipped: {err}")
+        return None
+    root.withdraw()
+    return root
+
+
+def store_results(conn, rounds):
+    """Benchmark of filling the column store and the filled store, the fetched rows are freed on return."""
+    columns, rows = fetch_rows(conn)
+    return measure(lambda: build_store(columns, rows)["rows"], rounds), build_store(columns, rows)
+
+
+def grid_results(conn, root, rounds):
+    """Result store, copy and tree fill, the store is freed on return before the export runs."""
+    results = {}
+    results["result_store"], store = store_results(conn, rounds)
+    results["copy_text"] = measure(lambda: copy_text(store).count("\n"), rounds)
+    if root is None:
+        results["tree_fill"] = results["copy_clipboard"] = {"skipped": "no display"}
+        return results
+    results["tree_fill"] = measure(lambda: fill_tree(root, store), rounds)
+
+    def clipboard():
+        root.clipboard_clear()
+        root.clipboard_append(copy_text(store))
+        root.update()
+        return store["rows"]
+    results["copy_clipboard"] = measure(clipboard, rounds)
+    return results
+
+
+def run_scale(args, scale, root):
+    conn, load_schema = open_backend(args, scale)
+    results = {}
+    try:
+        results["fetch"] = measure(lambda: len(fetch_rows(conn)[1]), args.rounds)
+        results.update(grid_results(conn, root, args.rounds))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "export.csv")
+            results["csv_export"] = measure(lambda: export_csv(conn, path), args.rounds)
+
+        def describe_all():
+            schema = load_schema()
+            engine.describe_tables_text(schema)
+            return sum(len(table_columns) for table_columns in schema["tables"].values())
+        results["desc_all"] = measure(describe_all, args.rounds)
+    finally:
+        if args.backend == "mysql":
+            engine.release_connection(conn)
+        else:
+            conn.close()
+    return results
+
+
+def beautify_results(rounds):
+    with open(BEAUTIFY_SQL, encoding="utf-8") as f:
+        chunk = f.read().strip().rstrip(";").rstrip(")") + ";\n"
+    script = chunk * max(1, BEAUTIFY_LINES // chunk.count("\n"))
+    return {"beautify": measure(lambda: format_sql(script).count("\n"), rounds)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def max_rss_mb():
+    try:
+        import resource
+    except ImportError: # windows
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1) # kilobytes on linux
+
+
+def compare(old_path, new):
+    """Prints the time ratio new/old per benchmark, returns True if something got slower than the threshold."""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    regression = False
+    print(f"\ncompared with {old_path} (commit {old.get('commit')}, backend {old.get('backend')})")
+    for scale, benchmarks in new["results"].items():
+        for name, result in benchmarks.items():
+            old_result = old.get("results", {}).get(scale, {}).get(name, {})
+            if "seconds" not in result or not old_result.get("seconds"):
+                continue
+            ratio = result["seconds"] / old_result["seconds"]
+            flag = "REGRESSION" if ratio > REGRESSION_THRESHOLD else ""
+            regression = regression or bool(flag)
+            print(f"{scale:>8} {name:<15} {old_result['seconds']:10.4f} -> {result['seconds']:10.4f} sec  {ratio:6.2f}x  {flag}")
+    return regression
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of the sql gui hot paths.")
+    parser.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite")
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)), help="comma separated row counts")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--seed-mysql", action="store_true", help="refill wws_test with generate_data.py first")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--out", help="result json, default benchmarks/results/<commit>-<backend>.json")
+    parser.add_argument("--compare", help="earlier result json to compare with")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "backend": args.backend,
+        "seed": args.seed,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": {"global": beautify_results(args.rounds)},
+    }
+    root = open_tk()
+    for scale in [int(value) for value in args.scales.split(",") if value.strip()]:
+        print(f"--- {scale} rows ---")
+        report["results"][str(scale)] = run_scale(args, scale, root)
+        for name, result in report["results"][str(scale)].items():
+            print(f"{name:<15} " + ("skipped" if "skipped" in result else f"{result['seconds']:10.4f} sec  {result['peak_mb']:8.1f} MB peak"))
+    report["max_rss_mb"] = max_rss_mb()
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{commit or time.strftime('%Y%m%d-%H%M%S')}-{args.backend}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults written to {out}")
+
+    if args.compare and compare(args.compare, report):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
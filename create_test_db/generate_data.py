@@ -3,9 +3,13 @@ from faker import Faker
 import random
 from datetime import datetime, timedelta
 import threading
+import multiprocessing
+import itertools
+import os
+import sys
+import tempfile
 from queue import Queue
 import time
-from typing import List, Tuple
 
 # ==================================
 # 1. KONFIGURATION
@@ -25,6 +29,8 @@ NUM_BESTELLUNGEN = 200000
 # Steuerung
 BATCH_SIZE = 5000 
 NUM_THREADS = 8 
+NUM_PROCESSES = os.cpu_count() or 4  # Faker-Generierung, ein Shard = ein Batch
+SEED = 42  # gleicher Seed = gleiche Daten, egal wie viele Prozesse
 
 MIN_POSITIONEN_PRO_BESTELLUNG = 1
 MAX_POSITIONEN_PRO_BESTELLUNG = 5
@@ -40,14 +46,32 @@ DE_ADDRESS_PAIRS = [
     ("30159", "Hannover"), ("90403", "Nürnberg"), ("28195", "Bremen")
 ]
 
-data_queue = Queue()
+INSERT_SQL = {
+    # Korrektur: Nutzt INSERT IGNORE, um Duplicate-Entry-Fehler (1062) zu vermeiden
+    "kunden": "INSERT IGNORE INTO kunden (vorname, nachname, email, strasse, plz, ort) VALUES (%s, %s, %s, %s, %s, %s)",
+    "produkte": "INSERT INTO produkte (produkt_name, beschreibung, ek_preis, vk_preis, lagerbestand) VALUES (%s, %s, %s, %s, %s)",
+    "lieferanten": "INSERT INTO lieferanten (firmenname, kontaktperson, telefon, email) VALUES (%s, %s, %s, %s)",
+    "bestellungen": "INSERT INTO bestellungen (kunde_id, bestelldatum, gesamtbetrag, lieferstatus) VALUES (%s, %s, %s, %s)",
+    "bestellpositionen": "INSERT INTO bestellpositionen (bestellung_id, produkt_id, menge, einzelpreis) VALUES (%s, %s, %s, %s)",
+}
+
+# begrenzt: der Generator wartet, wenn die Insert-Worker nicht hinterherkommen, statt alles im Speicher zu sammeln
+data_queue = Queue(maxsize=NUM_THREADS * 4)
+
+# Zeiten pro Stufe (Tabelle) für den Abschlussbericht
+STAGE_STATS = {}
+STATS_LOCK = threading.Lock()
+
+# Kontext der Bestellungs-Prozesse, wird per Pool-Initializer gesetzt
+ORDER_CONTEXT = {}
 
 # --- DB-Funktionen ---
 
-def connect_db(db_name=DATABASE):
+def connect_db(db_name=DATABASE, allow_local_infile=False):
     try:
         return mysql.connector.connect(
-            host=HOST, user=USER, password=PASSWORD, database=db_name, port=PORT
+            host=HOST, user=USER, password=PASSWORD, database=db_name, port=PORT,
+            allow_local_infile=allow_local_infile
         )
     except mysql.connector.Error as err:
         print(f"❌ Fehler bei der Datenbankverbindung: {err}")
@@ -90,10 +114,14 @@ def db_worker(queue: Queue, counter: dict, lock: threading.Lock):
         try:
             local_cursor.executemany(sql, batch_data)
             local_conn.commit()
+            record_stage(table_name, "inserted", len(batch_data))
             
             with lock:
                 counter[table_name] += len(batch_data)
-                print(f"\r🚀 {table_name.capitalize():15}: {counter[table_name]:,} / {total_count:,} ({counter[table_name]*100/total_count:.1f}%)", end='', flush=True)
+                if total_count:
+                    print(f"\r🚀 {table_name.capitalize():15}: {counter[table_name]:,} / {total_count:,} ({counter[table_name]*100/total_count:.1f}%)", end='', flush=True)
+                else:
+                    print(f"\r🚀 {table_name.capitalize():15}: {counter[table_name]:,}", end='', flush=True)
 
         except mysql.connector.Error as err:
             print(f"\n❌ DB-Fehler bei {table_name}: {err}")
@@ -108,85 +136,204 @@ def db_worker(queue: Queue, counter: dict, lock: threading.Lock):
     local_cursor.close()
     local_conn.close()
 
-def push_to_queue(all_data: List[Tuple], table_name: str, sql_insert: str, total_count: int):
-    for i in range(0, len(all_data), BATCH_SIZE):
-        batch = all_data[i:i + BATCH_SIZE]
-        data_queue.put((sql_insert, batch, table_name, total_count))
-    
-    print(f"\n📦 Alle {table_name} Batches ({len(all_data) // BATCH_SIZE + 1} Stück) in die Queue gestellt.")
+def load_worker(queue: Queue, counter: dict, lock: threading.Lock):
+    """Wie db_worker, lädt aber fertige Dateien per LOAD DATA LOCAL INFILE, ohne Unique- und FK-Prüfung."""
+    local_conn = connect_db(allow_local_infile=True)
+    if not local_conn:
+        return
 
-# --- Generierung primärer Daten (parallel) ---
+    local_cursor = local_conn.cursor()
+    local_cursor.execute("SET SESSION unique_checks = 0")
+    local_cursor.execute("SET SESSION foreign_key_checks = 0")
 
-def generate_kunden(count):
-    # Korrektur: Nutzt INSERT IGNORE, um Duplicate-Entry-Fehler (1062) zu vermeiden
-    sql = "INSERT IGNORE INTO kunden (vorname, nachname, email, strasse, plz, ort) VALUES (%s, %s, %s, %s, %s, %s)"
+    while True:
+        item = queue.get()
+
+        if item is None:
+            queue.task_done()
+            break
+
+        table_name, path, row_count = item
+
+        try:
+            columns = ", ".join(f"`{column}`" for column in LOAD_COLUMNS[table_name])
+            local_cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE `{table_name}` CHARACTER SET utf8mb4 ({columns})", (path,)
+            )
+            local_conn.commit()
+            record_stage(table_name, "inserted", row_count)
+
+            with lock:
+                counter[table_name] += row_count
+                print(f"\r🚀 {table_name.capitalize():17}: {counter[table_name]:,} geladen", end='', flush=True)
+
+        except mysql.connector.Error as err:
+            print(f"\n❌ LOAD DATA-Fehler bei {table_name} ({path}): {err}")
+            local_conn.rollback()
+        finally:
+            os.remove(path)
+            queue.task_done()
+
+    local_cursor.close()
+    local_conn.close()
+
+# --- Statistik pro Stufe ---
+
+def start_stage(table_name):
+    with STATS_LOCK:
+        STAGE_STATS[table_name] = {"start": time.perf_counter(), "generated": 0, "inserted": 0,
+                                   "generated_at": None, "inserted_at": None, "cpu": 0.0}
+
+def record_stage(table_name, step, rows, cpu=0.0):
+    """step ist "generated" oder "inserted", merkt Zeilen und Zeitpunkt des letzten Batches."""
+    with STATS_LOCK:
+        stats = STAGE_STATS.get(table_name)
+        if stats is None:
+            return
+        stats[step] += rows
+        stats[step + "_at"] = time.perf_counter()
+        stats["cpu"] += cpu
+
+def print_stage_report():
+    print("\n--- Durchsatz pro Stufe (Zeilen/Sek.) ---")
+    print(f"{'Tabelle':18} {'Zeilen':>10} {'Generierung':>13} {'pro Prozess':>12} {'Insert':>10}")
+    for table_name, stats in STAGE_STATS.items():
+        rows = max(stats["generated"], stats["inserted"])
+        generate_rate = process_rate = insert_rate = "-"
+        if stats["generated_at"]:
+            generate_rate = f"{stats['generated'] / max(stats['generated_at'] - stats['start'], 1e-9):,.0f}"
+        if stats["cpu"]:
+            process_rate = f"{stats['generated'] / stats['cpu']:,.0f}"
+        if stats["inserted_at"]:
+            insert_rate = f"{stats['inserted'] / max(stats['inserted_at'] - stats['start'], 1e-9):,.0f}"
+        print(f"{table_name:18} {rows:>10,} {generate_rate:>13} {process_rate:>12} {insert_rate:>10}")
+    print(f"(Generierung mit {NUM_PROCESSES} Prozessen, 'pro Prozess' = Zeilen je CPU-Sekunde eines Prozesses)")
+
+# --- Generierung in Shards (Prozess-Pool) ---
+# Jeder Shard ist ein Batch mit eigenem Seed aus SEED, Tabelle und Shard-Nummer.
+# Damit hängt das Ergebnis nicht davon ab, welcher Prozess den Shard rechnet.
+
+def shard_seed(table_name, shard):
+    return f"{SEED}:{table_name}:{shard}"
+
+def shard_tasks(table_name, count):
+    """(tabelle, seed, erste zeile, anzahl) je Batch."""
+    return [
+        (table_name, shard_seed(table_name, shard), start, min(BATCH_SIZE, count - start))
+        for shard, start in enumerate(range(0, count, BATCH_SIZE))
+    ]
+
+def make_kunden_rows(rng, row_numbers):
     data = []
-    generated_emails = set()
-    print(f"\nGeneriere {count} Kunden-Daten im Speicher...")
-    for _ in range(count):
+    for _ in row_numbers:
         first_name = fake.first_name()
         last_name = fake.last_name()
-        email_base = f"{first_name}.{last_name}@{fake.domain_name()}".lower().replace(' ', '')
-        email = email_base
-        attempt = 0
-        while email in generated_emails:
-            attempt += 1
-            email = f"{first_name}.{last_name}{random.randint(100, 999)}@{fake.domain_name()}".lower().replace(' ', '')
-        generated_emails.add(email)
-        plz, ort = random.choice(DE_ADDRESS_PAIRS)
+        email = f"{first_name}.{last_name}@{fake.domain_name()}".lower().replace(' ', '')
+        plz, ort = rng.choice(DE_ADDRESS_PAIRS)
         street = fake.street_name() + " " + fake.building_number()
         data.append((first_name, last_name, email, street, plz, ort))
-    
-    push_to_queue(data, "kunden", sql, count)
-    
+    return data
 
-def generate_produkte(count):
-    sql = "INSERT INTO produkte (produkt_name, beschreibung, ek_preis, vk_preis, lagerbestand) VALUES (%s, %s, %s, %s, %s)"
+def make_produkte_rows(rng, row_numbers):
     data = []
-    print(f"\nGeneriere {count} Produkte-Daten im Speicher...")
-    for i in range(count):
+    for i in row_numbers:
         name = f"Produkt {i+1}: {fake.catch_phrase()}"
-        ek_preis = round(random.uniform(5.0, 1000.0), 2)
-        vk_aufschlag = random.uniform(1.10, 3.0) 
+        ek_preis = round(rng.uniform(5.0, 1000.0), 2)
+        vk_aufschlag = rng.uniform(1.10, 3.0) 
         vk_preis = round(ek_preis * vk_aufschlag, 2) 
-        stock = random.randint(0, 500)
+        stock = rng.randint(0, 500)
         data.append((name, fake.paragraph(nb_sentences=2), ek_preis, vk_preis, stock))
-    
-    push_to_queue(data, "produkte", sql, count)
-
+    return data
 
-def generate_lieferanten(count):
-    sql = "INSERT INTO lieferanten (firmenname, kontaktperson, telefon, email) VALUES (%s, %s, %s, %s)"
+def make_lieferanten_rows(rng, row_numbers):
     data = []
-    print(f"\nGeneriere {count} Lieferanten-Daten im Speicher...")
-    for _ in range(count):
+    for _ in row_numbers:
         firm = fake.company()
         contact = fake.name()
         phone = fake.phone_number()
         email = fake.email()
         data.append((firm, contact, phone, email))
-    
-    push_to_queue(data, "lieferanten", sql, count)
+    return data
+
+# generator(rng, row_numbers) -> zeilen, row_numbers ist der range() der Zeilen des Shards (ab 0)
+ROW_GENERATORS = {
+    "kunden": make_kunden_rows,
+    "produkte": make_produkte_rows,
+    "lieferanten": make_lieferanten_rows,
+}
+
+def generate_shard(task):
+    """Läuft im Pool-Prozess. Gibt (tabelle, erste zeile, zeilen, cpu-sekunden) zurück."""
+    table_name, seed, start, count = task
+    cpu_start = time.process_time()
+    fake.seed_instance(seed)
+    rows = ROW_GENERATORS[table_name](random.Random(seed), range(start, start + count))
+    return table_name, start, rows, time.process_time() - cpu_start
+
+def unique_emails(rows, start, generated_emails):
+    """E-Mails sind nur pro Shard eindeutig, Dubletten bekommen die Zeilennummer angehängt.
+
+    Läuft im Hauptprozess in Shard-Reihenfolge, das Ergebnis bleibt reproduzierbar.
+    """
+    data = []
+    for offset, row in enumerate(rows):
+        email = row[2]
+        if email in generated_emails:
+            local_part, domain = email.split("@", 1)
+            email = f"{local_part}{start + offset + 1}@{domain}"
+        generated_emails.add(email)
+        data.append(row[:2] + (email,) + row[3:])
+    return data
+
+def iter_primary_batches(pool, counts):
+    """Liefert (tabelle, sql, batch) in fester Reihenfolge, sobald der jeweilige Shard fertig ist.
+
+    counts: {tabelle: anzahl}. Alle Tabellen laufen durch denselben Pool, damit er an den
+    Tabellengrenzen nicht leerläuft.
+    """
+    tasks = []
+    for table_name, count in counts.items():
+        tasks.extend(shard_tasks(table_name, count))
+    generated_emails = set()
+    for table_name, start, rows, cpu in pool.imap(generate_shard, tasks):
+        if table_name == "kunden":
+            rows = unique_emails(rows, start, generated_emails)
+        record_stage(table_name, "generated", len(rows), cpu)
+        yield table_name, INSERT_SQL[table_name], rows
+
+def generate_primary_data(pool, counts):
+    """Stellt die Batches direkt in die Queue der Insert-Worker, ohne vorher die ganze Liste zu bauen."""
+    for table_name, count in counts.items():
+        start_stage(table_name)
+        print(f"\nGeneriere {count:,} {table_name.capitalize()}-Daten mit {NUM_PROCESSES} Prozessen...")
+    for table_name, sql, batch in iter_primary_batches(pool, counts):
+        data_queue.put((sql, batch, table_name, counts[table_name]))
 
 # --- Generierung abhängiger Daten (seriell) ---
 
+def generate_links(num_products, num_suppliers):
+    """Alle (produkt_id, lieferant_id) Paare, sortiert und ohne Dubletten."""
+    links = set()
+    rng = random.Random(shard_seed("produkt_lieferant", 0))
+    for prod_id in range(1, num_products + 1):
+        num_links = rng.randint(MIN_LIEFERANTEN_PRO_PRODUKT, MAX_LIEFERANTEN_PRO_PRODUKT)
+        for _ in range(num_links):
+            supplier_id = rng.randint(1, num_suppliers)
+            links.add((prod_id, supplier_id))
+    return sorted(links)
+
 def generate_produkt_lieferant_links_sequentially(conn, num_products, num_suppliers):
     """Generiert Produkt-Lieferant-Links seriell im Hauptthread, um Deadlocks zu vermeiden."""
     
     cursor = conn.cursor()
     sql = "INSERT IGNORE INTO produkt_lieferant (produkt_id, lieferant_id) VALUES (%s, %s)"
-    links = set()
+    start_stage("produkt_lieferant")
     
     print("\nGeneriere Produkt-Lieferant-Verknüpfungen (seriell/Batch)...")
     
-    for prod_id in range(1, num_products + 1):
-        num_links = random.randint(MIN_LIEFERANTEN_PRO_PRODUKT, MAX_LIEFERANTEN_PRO_PRODUKT)
-        for _ in range(num_links):
-            supplier_id = random.randint(1, num_suppliers)
-            links.add((prod_id, supplier_id))
-    
-    all_links_list = list(links)
+    all_links_list = generate_links(num_products, num_suppliers)
     total_count = len(all_links_list)
+    record_stage("produkt_lieferant", "generated", total_count)
     
     for batch_index in range(0, total_count, BATCH_SIZE):
         batch = all_links_list[batch_index:batch_index + BATCH_SIZE]
@@ -194,6 +341,7 @@ def generate_produkt_lieferant_links_sequentially(conn, num_products, num_suppli
         try:
             cursor.executemany(sql, batch)
             conn.commit()
+            record_stage("produkt_lieferant", "inserted", len(batch))
             
             inserted_count = batch_index + len(batch)
             print(f"\r📦 Produkt_lieferant: {inserted_count:,} / {total_count:,} eingefügt. ({inserted_count*100/total_count:.1f}%)", end='', flush=True)
@@ -204,8 +352,48 @@ def generate_produkt_lieferant_links_sequentially(conn, num_products, num_suppli
     cursor.close()
     return total_count
 
+def init_order_worker(product_prices, max_kunde_id):
+    ORDER_CONTEXT["product_prices"] = product_prices
+    ORDER_CONTEXT["product_ids"] = list(product_prices.keys())
+    ORDER_CONTEXT["max_kunde_id"] = max_kunde_id
+
+def generate_order_shard(task):
+    """Bestellungen eines Shards plus Positionen, die Positionen zeigen auf den Index im Shard."""
+    _, seed, start, count = task
+    cpu_start = time.process_time()
+    fake.seed_instance(seed)
+    rng = random.Random(seed)
+    product_prices = ORDER_CONTEXT["product_prices"]
+    product_ids = ORDER_CONTEXT["product_ids"]
+    max_kunde_id = ORDER_CONTEXT["max_kunde_id"]
+
+    status_options = ['Geliefert'] * 70 + ['Versandt'] * 15 + ['Bearbeitung'] * 10 + ['Storniert'] * 5 
+    start_date = datetime.now() - timedelta(days=730)
 
-def generate_bestellungen_and_positions_sequentially(conn, num_kunden, num_produkte, count):
+    bestell_data = []
+    pos_data_temp = []
+    for index in range(count):
+        kunde_id = rng.randint(1, max_kunde_id) # Nutze die max ID
+        order_date = fake.date_between(start_date=start_date, end_date='today')
+        lieferstatus = rng.choice(status_options)
+        
+        num_items = rng.randint(MIN_POSITIONEN_PRO_BESTELLUNG, MAX_POSITIONEN_PRO_BESTELLUNG)
+        total_amount = 0.0
+        
+        selected_product_ids = rng.sample(product_ids, k=min(num_items, len(product_ids)))
+        
+        for prod_id in selected_product_ids:
+            menge = rng.randint(1, 10)
+            einzelpreis = product_prices[prod_id]
+            pos_data_temp.append((index, prod_id, menge, einzelpreis)) 
+            total_amount += menge * einzelpreis
+            
+        bestell_data.append((kunde_id, order_date, round(total_amount, 2), lieferstatus))
+    return start, bestell_data, pos_data_temp, time.process_time() - cpu_start
+
+def generate_bestellungen_and_positions(conn, count):
+    """Bestellungen kommen shardweise aus dem Pool und werden hier eingefügt (lastrowid für die FK),
+    die Positionen gehen danach als Batches an die Insert-Worker."""
     cursor = conn.cursor()
     
     # Korrektur: Max ID abfragen, um Foreign Key-Fehler (1452) durch fehlende Kunden zu vermeiden
@@ -214,150 +402,325 @@ def generate_bestellungen_and_positions_sequentially(conn, num_kunden, num_produ
     
     if max_kunde_id is None:
         print("❌ Keine Kunden-IDs in der Datenbank gefunden. Breche Bestellungserstellung ab.")
-        return 0, 0
+        return 0
     
     product_prices = {}
-    cursor.execute("SELECT produkt_id, vk_preis FROM produkte")
+    cursor.execute("SELECT produkt_id, vk_preis FROM produkte ORDER BY produkt_id")
     for (prod_id, vk_preis) in cursor.fetchall():
         product_prices[prod_id] = float(vk_preis) 
     
-    product_ids = list(product_prices.keys())
-    if not product_ids:
+    if not product_prices:
         print("❌ Keine Produkte gefunden. Breche Bestellungserstellung ab.")
-        return 0, 0
+        return 0
         
-    sql_bestellung = "INSERT INTO bestellungen (kunde_id, bestelldatum, gesamtbetrag, lieferstatus) VALUES (%s, %s, %s, %s)"
-    sql_position = "INSERT INTO bestellpositionen (bestellung_id, produkt_id, menge, einzelpreis) VALUES (%s, %s, %s, %s)"
-    
-    bestell_data = []
-    pos_data_temp = [] 
-    
-    status_options = ['Geliefert'] * 70 + ['Versandt'] * 15 + ['Bearbeitung'] * 10 + ['Storniert'] * 5 
-    start_date = datetime.now() - timedelta(days=730)
-    
-    print(f"\nGeneriere {count} Bestellungen und Positionen im Speicher (seriell/FK-abh.)...")
+    start_stage("bestellungen")
+    start_stage("bestellpositionen")
+    print(f"\nGeneriere {count:,} Bestellungen und Positionen mit {NUM_PROCESSES} Prozessen (FK-abh.)...")
     
-    for i in range(1, count + 1):
-        kunde_id = random.randint(1, max_kunde_id) # Nutze die max ID
-        order_date = fake.date_between(start_date=start_date, end_date='today')
-        lieferstatus = random.choice(status_options)
-        
-        num_items = random.randint(MIN_POSITIONEN_PRO_BESTELLUNG, MAX_POSITIONEN_PRO_BESTELLUNG)
-        total_amount = 0.0
-        
-        selected_product_ids = random.sample(product_ids, k=min(num_items, len(product_ids)))
-        
-        for prod_id in selected_product_ids:
-            menge = random.randint(1, 10)
-            einzelpreis = product_prices[prod_id]
-            pos_data_temp.append((i, prod_id, menge, einzelpreis)) 
-            total_amount += menge * einzelpreis
+    inserted_count = 0
+    with multiprocessing.Pool(NUM_PROCESSES, initializer=init_order_worker, initargs=(product_prices, max_kunde_id)) as pool:
+        for start, batch, positions, cpu in pool.imap(generate_order_shard, shard_tasks("bestellungen", count)):
+            record_stage("bestellungen", "generated", len(batch), cpu)
+            record_stage("bestellpositionen", "generated", len(positions))
+
+            cursor.executemany(INSERT_SQL["bestellungen"], batch)
+            first_id = cursor.lastrowid
             
-        bestell_data.append((kunde_id, order_date, round(total_amount, 2), lieferstatus))
-        
-    print(f"\nStarte Batch-Einfügung der {count:,} Bestellungen...")
-    
-    all_pos_data_final = []
-    
-    for batch_index in range(0, len(bestell_data), BATCH_SIZE):
-        batch = bestell_data[batch_index:batch_index + BATCH_SIZE]
-        
-        cursor.executemany(sql_bestellung, batch)
-        first_id = cursor.lastrowid
-        
-        if first_id is None: 
-            conn.rollback()
-            raise Exception("Fehler beim Abrufen der AUTO_INCREMENT ID nach Batch-Insert.")
-        
-        start_temp_id = batch_index + 1
-        end_temp_id = batch_index + len(batch)
-        
-        pos_batch_data = [
-            (first_id + temp_id - start_temp_id, prod_id, menge, einzelpreis)
-            for temp_id, prod_id, menge, einzelpreis in pos_data_temp
-            if start_temp_id <= temp_id <= end_temp_id
-        ]
-        all_pos_data_final.extend(pos_batch_data)
-        
-        conn.commit()
-        
-        inserted_count = batch_index + len(batch)
-        print(f"\r📦 Bestellungen: {inserted_count:,} / {count:,} eingefügt. ({inserted_count*100/count:.1f}%)", end='', flush=True)
+            if first_id is None: 
+                conn.rollback()
+                raise Exception("Fehler beim Abrufen der AUTO_INCREMENT ID nach Batch-Insert.")
+            conn.commit()
+            record_stage("bestellungen", "inserted", len(batch))
+
+            pos_batch_data = [
+                (first_id + index, prod_id, menge, einzelpreis)
+                for index, prod_id, menge, einzelpreis in positions
+            ]
+            for batch_index in range(0, len(pos_batch_data), BATCH_SIZE):
+                data_queue.put((INSERT_SQL["bestellpositionen"], pos_batch_data[batch_index:batch_index + BATCH_SIZE], "bestellpositionen", None))
+            
+            inserted_count = start + len(batch)
+            print(f"\r📦 Bestellungen: {inserted_count:,} / {count:,} eingefügt. ({inserted_count*100/count:.1f}%)", end='', flush=True)
 
-    print(f"\nStarte Batch-Einfügung der {len(all_pos_data_final):,} Positionen...")
-    
-    total_pos_count = len(all_pos_data_final)
-    for batch_index in range(0, total_pos_count, BATCH_SIZE):
-        batch = all_pos_data_final[batch_index:batch_index + BATCH_SIZE]
-        cursor.executemany(sql_position, batch)
-        conn.commit()
-        inserted_count = batch_index + len(batch)
-        print(f"\r📦 Positionen: {inserted_count:,} / {total_pos_count:,} eingefügt. ({inserted_count*100/total_pos_count:.1f}%)", end='', flush=True)
+    cursor.close()
+    return inserted_count
+
+# --- Schnellimport (LOAD DATA, --fast) ---
+# IDs werden hier vergeben statt per AUTO_INCREMENT, dadurch hängen Bestellungen und Positionen
+# nicht mehr an lastrowid und alle Tabellen können gleichzeitig geladen werden.
+
+LOAD_COLUMNS = {
+    "kunden": ["kunde_id", "vorname", "nachname", "email", "strasse", "plz", "ort"],
+    "produkte": ["produkt_id", "produkt_name", "beschreibung", "ek_preis", "vk_preis", "lagerbestand"],
+    "lieferanten": ["lieferant_id", "firmenname", "kontaktperson", "telefon", "email"],
+    "produkt_lieferant": ["produkt_id", "lieferant_id"],
+    "bestellungen": ["bestellung_id", "kunde_id", "bestelldatum", "gesamtbetrag", "lieferstatus"],
+    "bestellpositionen": ["position_id", "bestellung_id", "produkt_id", "menge", "einzelpreis"],
+}
+
+def load_value(value):
+    # Standardformat von LOAD DATA: Tab zwischen Feldern, Backslash als Escape, \N ist NULL
+    if value is None:
+        return "\\N"
+    if isinstance(value, str):
+        return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    return str(value)
+
+def write_load_file(directory, table_name, shard, rows):
+    path = os.path.join(directory, f"{table_name}_{shard:05d}.tsv")
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.writelines("\t".join(map(load_value, row)) + "\n" for row in rows)
+    return path
+
+def server_allows_local_infile(conn):
+    cursor = conn.cursor()
+    cursor.execute("SHOW GLOBAL VARIABLES LIKE 'local_infile'")
+    row = cursor.fetchone()
+    cursor.close()
+    return bool(row) and str(row[1]).upper() in ("ON", "1")
 
+def read_secondary_keys(conn):
+    """Sekundärindizes und Fremdschlüssel der Datenbank, damit sie nach dem Laden neu angelegt werden können."""
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT TABLE_NAME, INDEX_NAME, NON_UNIQUE, COLUMN_NAME FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND INDEX_NAME <> 'PRIMARY' "
+        "ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX"
+    )
+    indexes = {}
+    for table_name, index_name, non_unique, column in cursor.fetchall():
+        index = indexes.setdefault((table_name, index_name), {"unique": not int(non_unique), "columns": []})
+        index["columns"].append(column)
+
+    cursor.execute(
+        "SELECT k.TABLE_NAME, k.CONSTRAINT_NAME, k.COLUMN_NAME, k.REFERENCED_TABLE_NAME, k.REFERENCED_COLUMN_NAME, "
+        "r.UPDATE_RULE, r.DELETE_RULE FROM information_schema.KEY_COLUMN_USAGE k "
+        "JOIN information_schema.REFERENTIAL_CONSTRAINTS r "
+        "ON r.CONSTRAINT_SCHEMA = k.CONSTRAINT_SCHEMA AND r.CONSTRAINT_NAME = k.CONSTRAINT_NAME AND r.TABLE_NAME = k.TABLE_NAME "
+        "WHERE k.TABLE_SCHEMA = DATABASE() AND k.REFERENCED_TABLE_NAME IS NOT NULL "
+        "ORDER BY k.TABLE_NAME, k.CONSTRAINT_NAME, k.ORDINAL_POSITION"
+    )
+    foreign_keys = {}
+    for table_name, name, column, ref_table, ref_column, update_rule, delete_rule in cursor.fetchall():
+        key = foreign_keys.setdefault((table_name, name), {
+            "columns": [], "ref_table": ref_table, "ref_columns": [], "update_rule": update_rule, "delete_rule": delete_rule
+        })
+        key["columns"].append(column)
+        key["ref_columns"].append(ref_column)
     cursor.close()
-    return count, total_pos_count
+    return {"indexes": indexes, "foreign_keys": foreign_keys}
 
-# --- Hauptausführung ---
-def main():
-    start_time = time.time()
-    conn = connect_db()
-    if conn is None:
-        return
+def quoted_columns(columns):
+    return ", ".join(f"`{column}`" for column in columns)
+
+def alter_per_table(conn, clauses):
+    """clauses: {tabelle: [klausel, ...]}, ein ALTER TABLE pro Tabelle baut alle Indizes in einem Durchgang."""
+    cursor = conn.cursor()
+    cursor.execute("SET SESSION foreign_key_checks = 0")
+    for table_name, table_clauses in clauses.items():
+        cursor.execute(f"ALTER TABLE `{table_name}` {', '.join(table_clauses)}")
+    cursor.execute("SET SESSION foreign_key_checks = 1")
+    cursor.close()
+
+def drop_secondary_keys(conn, keys):
+    # erst die Fremdschlüssel, sonst lässt InnoDB deren Indizes nicht löschen
+    foreign_keys = {}
+    for table_name, name in keys["foreign_keys"]:
+        foreign_keys.setdefault(table_name, []).append(f"DROP FOREIGN KEY `{name}`")
+    alter_per_table(conn, foreign_keys)
+    indexes = {}
+    for table_name, name in keys["indexes"]:
+        indexes.setdefault(table_name, []).append(f"DROP INDEX `{name}`")
+    alter_per_table(conn, indexes)
+
+def restore_secondary_keys(conn, keys):
+    indexes = {}
+    for (table_name, name), index in keys["indexes"].items():
+        kind = "UNIQUE INDEX" if index["unique"] else "INDEX"
+        indexes.setdefault(table_name, []).append(f"ADD {kind} `{name}` ({quoted_columns(index['columns'])})")
+    alter_per_table(conn, indexes)
+    # foreign_key_checks = 0: die Daten werden beim Anlegen nicht noch einmal geprüft
+    foreign_keys = {}
+    for (table_name, name), key in keys["foreign_keys"].items():
+        foreign_keys.setdefault(table_name, []).append(
+            f"ADD CONSTRAINT `{name}` FOREIGN KEY ({quoted_columns(key['columns'])}) "
+            f"REFERENCES `{key['ref_table']}` ({quoted_columns(key['ref_columns'])}) "
+            f"ON UPDATE {key['update_rule']} ON DELETE {key['delete_rule']}"
+        )
+    alter_per_table(conn, foreign_keys)
+
+def write_fast_files(directory, counts):
+    """Generiert alle Tabellen in den Prozessen, schreibt pro Shard eine Datei und stellt sie in die Lade-Queue.
+
+    counts: {tabelle: anzahl} für kunden, produkte, lieferanten und bestellungen.
+    """
+    next_ids = {table_name: 1 for table_name in LOAD_COLUMNS}
+    file_numbers = itertools.count()
+    product_prices = {}
+
+    def push(table_name, rows, with_id=True):
+        if with_id:
+            first_id = next_ids[table_name]
+            rows = [(first_id + offset,) + row for offset, row in enumerate(rows)]
+            next_ids[table_name] += len(rows)
+        path = write_load_file(directory, table_name, next(file_numbers), rows)
+        data_queue.put((table_name, path, len(rows)))
+        return rows
+
+    with multiprocessing.Pool(NUM_PROCESSES) as pool:
+        primary_counts = {table_name: counts[table_name] for table_name in ROW_GENERATORS}
+        for table_name, _, rows in iter_primary_batches(pool, primary_counts):
+            rows = push(table_name, rows)
+            if table_name == "produkte":
+                product_prices.update((row[0], row[4]) for row in rows)
+
+    start_stage("produkt_lieferant")
+    links = generate_links(counts["produkte"], counts["lieferanten"])
+    record_stage("produkt_lieferant", "generated", len(links))
+    for batch_index in range(0, len(links), BATCH_SIZE):
+        push("produkt_lieferant", links[batch_index:batch_index + BATCH_SIZE], with_id=False)
+
+    start_stage("bestellungen")
+    start_stage("bestellpositionen")
+    with multiprocessing.Pool(NUM_PROCESSES, initializer=init_order_worker, initargs=(product_prices, counts["kunden"])) as pool:
+        for start, batch, positions, cpu in pool.imap(generate_order_shard, shard_tasks("bestellungen", counts["bestellungen"])):
+            record_stage("bestellungen", "generated", len(batch), cpu)
+            record_stage("bestellpositionen", "generated", len(positions))
+            push("bestellungen", batch)
+            # die bestellung_id steht schon fest: start + index im Shard + 1
+            push("bestellpositionen", [
+                (start + index + 1, prod_id, menge, einzelpreis)
+                for index, prod_id, menge, einzelpreis in positions
+            ])
+    return next_ids
+
+def load_fast(conn):
+    """Generiert in Dateien und lädt per LOAD DATA, Sekundärindizes und FKs werden danach in einem Durchgang gebaut."""
+    inserted_counts = {table_name: 0 for table_name in LOAD_COLUMNS}
+    counts = {"kunden": NUM_KUNDEN, "produkte": NUM_PRODUKTE, "lieferanten": NUM_LIEFERANTEN, "bestellungen": NUM_BESTELLUNGEN}
+    lock = threading.Lock()
+
+    keys = read_secondary_keys(conn)
+    index_start = time.perf_counter()
+    drop_secondary_keys(conn, keys)
+    print(f"\n🔧 {len(keys['indexes'])} Indizes und {len(keys['foreign_keys'])} Fremdschlüssel entfernt ({time.perf_counter() - index_start:.2f} Sek.)")
 
     try:
-        truncate_and_reset(conn)
-        
         worker_threads = []
-        inserted_counts = {"kunden": 0, "produkte": 0, "lieferanten": 0, "produkt_lieferant": 0, "bestellungen": 0, "bestellpositionen": 0}
-        lock = threading.Lock()
-        
-        print(f"\n--- Starte {NUM_THREADS} Worker-Threads ---")
+        print(f"\n--- Starte {NUM_THREADS} Lade-Threads und {NUM_PROCESSES} Generator-Prozesse ---")
         for _ in range(NUM_THREADS):
-            t = threading.Thread(target=db_worker, args=(data_queue, inserted_counts, lock))
+            t = threading.Thread(target=load_worker, args=(data_queue, inserted_counts, lock))
             t.start()
             worker_threads.append(t)
-            
-        # 3. UNABHÄNGIGE TABELLEN (Parallel)
-        generate_kunden(NUM_KUNDEN)
-        generate_produkte(NUM_PRODUKTE)
-        generate_lieferanten(NUM_LIEFERANTEN)
-        
-        # 4. Warten auf Abschluss der Parallel-Jobs
-        data_queue.join() 
-        print("\n\n✅ Primärdaten (Kunden, Produkte, Lieferanten) erfolgreich per Batch eingefügt.")
 
-        # 4b. PRODUKT_LIEFERANT (Seriell, da hohe Deadlock-Gefahr)
-        inserted_counts["produkt_lieferant"] = generate_produkt_lieferant_links_sequentially(conn, NUM_PRODUKTE, NUM_LIEFERANTEN)
+        with tempfile.TemporaryDirectory(prefix="wws_load_") as directory:
+            for table_name in ROW_GENERATORS: # bestellungen starten erst nach den Produkten (Preise)
+                start_stage(table_name)
+                print(f"\nGeneriere {counts[table_name]:,} {table_name.capitalize()}-Daten mit {NUM_PROCESSES} Prozessen...")
+            try:
+                write_fast_files(directory, counts)
+            finally:
+                for _ in range(NUM_THREADS):
+                    data_queue.put(None)
+                for t in worker_threads:
+                    t.join()
+        print("\n✅ Alle Dateien geladen.")
+    finally:
+        index_start = time.perf_counter()
+        print("\n🔧 Baue Indizes und Fremdschlüssel wieder auf...")
+        restore_secondary_keys(conn, keys)
+        print(f"🔧 Indizes und Fremdschlüssel aufgebaut ({time.perf_counter() - index_start:.2f} Sek.)")
+    return inserted_counts
+
+# --- Hauptausführung ---
+
+def insert_batches(conn):
+    """Der normale Weg: executemany-Batches über die Worker-Threads."""
+    worker_threads = []
+    inserted_counts = {"kunden": 0, "produkte": 0, "lieferanten": 0, "produkt_lieferant": 0, "bestellungen": 0, "bestellpositionen": 0}
+    lock = threading.Lock()
+    
+    print(f"\n--- Starte {NUM_THREADS} Worker-Threads und {NUM_PROCESSES} Generator-Prozesse ---")
+    for _ in range(NUM_THREADS):
+        t = threading.Thread(target=db_worker, args=(data_queue, inserted_counts, lock))
+        t.start()
+        worker_threads.append(t)
         
-        # 5. Abschluss der Worker-Threads
-        for _ in range(NUM_THREADS):
-            data_queue.put(None)
-        for t in worker_threads:
-            t.join() 
-        print("✅ Alle Worker-Threads sauber beendet.")
+    # 3. UNABHÄNGIGE TABELLEN (Parallel: Prozesse generieren, Threads fügen ein)
+    with multiprocessing.Pool(NUM_PROCESSES) as pool:
+        generate_primary_data(pool, {
+            "kunden": NUM_KUNDEN,
+            "produkte": NUM_PRODUKTE,
+            "lieferanten": NUM_LIEFERANTEN,
+        })
+    
+    # 4. Warten auf Abschluss der Parallel-Jobs
+    data_queue.join() 
+    print("\n\n✅ Primärdaten (Kunden, Produkte, Lieferanten) erfolgreich per Batch eingefügt.")
+
+    # 4b. PRODUKT_LIEFERANT (Seriell, da hohe Deadlock-Gefahr)
+    inserted_counts["produkt_lieferant"] = generate_produkt_lieferant_links_sequentially(conn, NUM_PRODUKTE, NUM_LIEFERANTEN)
+
+    # 5. BESTELLUNGEN (Seriell wegen lastrowid), POSITIONEN über die Worker-Threads
+    inserted_counts["bestellungen"] = generate_bestellungen_and_positions(conn, NUM_BESTELLUNGEN)
+    data_queue.join()
+    print("\n✅ Bestellungen und Positionen erfolgreich per Batch eingefügt.")
+    
+    # 6. Abschluss der Worker-Threads
+    for _ in range(NUM_THREADS):
+        data_queue.put(None)
+    for t in worker_threads:
+        t.join() 
+    print("✅ Alle Worker-Threads sauber beendet.")
+    return inserted_counts
+
+def main(fast=False):
+    """Gibt die Gesamtzeit in Sekunden zurück, None bei Fehlern."""
+    start_time = time.time()
+    conn = connect_db()
+    if conn is None:
+        return None
+    STAGE_STATS.clear()
+
+    try:
+        truncate_and_reset(conn)
 
-        # 6. BESTELLUNGEN/POSITIONEN (Seriell/Batch, da FK-Abhängigkeit)
-        inserted_counts["bestellungen"], inserted_counts["bestellpositionen"] = \
-            generate_bestellungen_and_positions_sequentially(conn, NUM_KUNDEN, NUM_PRODUKTE, NUM_BESTELLUNGEN)
-        print("\n✅ Bestellungen und Positionen erfolgreich sequenziell/Batch eingefügt.")
+        if fast and not server_allows_local_infile(conn):
+            print("❌ Der Server erlaubt kein LOAD DATA LOCAL INFILE (SET GLOBAL local_infile = 1). Nutze den normalen Weg.")
+            fast = False
+        inserted_counts = load_fast(conn) if fast else insert_batches(conn)
 
         # 7. Zählung
         check_counts(conn)
+        print_stage_report()
         
         end_time = time.time()
         print("\n=======================================================")
-        print(f"✅ Gesamte Generierung abgeschlossen in: {end_time - start_time:.2f} Sekunden.")
+        print(f"✅ Gesamte Generierung ({'LOAD DATA' if fast else 'INSERT'}) abgeschlossen in: {end_time - start_time:.2f} Sekunden.")
         print(f"Eingefügte Datensätze (gezählt): {inserted_counts}")
         print("=======================================================")
+        return end_time - start_time
 
     except Exception as e:
         print(f"\n❌ Ein schwerwiegender Fehler ist aufgetreten: {e}")
         conn.rollback()
+        return None
     finally:
         if conn and conn.is_connected():
             conn.close()
             print("Datenbankverbindung geschlossen.")
 
+def compare_load_paths():
+    """Läuft beide Wege nacheinander (jeweils mit TRUNCATE) und vergleicht die Gesamtzeit."""
+    insert_time = main(fast=False)
+    fast_time = main(fast=True)
+    if insert_time is None or fast_time is None:
+        return
+    print("\n=======================================================")
+    print(f"INSERT-Batches : {insert_time:8.2f} Sek.")
+    print(f"LOAD DATA      : {fast_time:8.2f} Sek.  ({insert_time / fast_time:.1f}x schneller)")
+    print("=======================================================")
+
 def check_counts(conn):
     cursor = conn.cursor(dictionary=True)
     print("\n--- Überprüfung der generierten Datenmengen ---")
@@ -393,4 +756,8 @@ def check_counts(conn):
     cursor.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # --fast: LOAD DATA statt INSERT, --compare: beide Wege nacheinander mit Zeitvergleich
+    if "--compare" in sys.argv:
+        compare_load_paths()
+    else:
+        main(fast="--fast" in sys.argv)
\ No newline at end of file
@@ -0,0 +1,434 @@
+"""Execution engine of the sql gui without any tkinter: connection pool, schema cache,
+statement splitting, result store, result export and describe. Used by main.py, the headless
+sqlgui.py and the benchmarks."""
+import mysql.connector
+import re
+import time
+import csv
+import gzip
+import json
+import os
+import threading
+
+# global config - adjust as needed, can create .env file to change these
+DB_HOST = "localhost"
+DB_USER = "root"
+DB_PASSWORD = os.getenv("MYSQL_PASSWORD", "")
+DB_PORT = int(os.getenv("MYSQL_PORT", 3306)) # check if this is your port!!!!
+DB_POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", 4)) # idle connections kept per database
+DB_POOL_IDLE_TIMEOUT = int(os.getenv("MYSQL_POOL_IDLE_TIMEOUT", 300)) # seconds until an idle connection is closed
+POOL_PING_AFTER = 30 # seconds of idleness after which a pooled connection is pinged before reuse
+
+CONNECTION_POOL = {}       # database name -> list of (connection, last_used) idle connections
+CONNECTION_DATABASES = {}  # connection -> database it is currently using
+POOL_LOCK = threading.Lock()
+
+SCHEMA_CACHE = {}  # database name -> {"tables": {table: [DESCRIBE-like rows]}, "loaded_at": timestamp}
+SCHEMA_LOCK = threading.Lock()
+
+EXPORT_BATCH_SIZE = 5000  # rows per fetchmany() when exporting straight from the server cursor
+
+def connect_db(database=None, allow_local_infile=False):
+    """Opens a new connection, errors are raised to the caller."""
+    return mysql.connector.connect(
+        host=DB_HOST,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        port=DB_PORT,
+        database=database if database else None,
+        autocommit=True, # pooled connections must not keep a stale snapshot between queries
+        allow_local_infile=allow_local_infile
+    )
+
+def prune_idle_connections(now):
+    """Closes pooled connections that were idle longer than DB_POOL_IDLE_TIMEOUT. Caller holds POOL_LOCK."""
+    for database, idle in CONNECTION_POOL.items():
+        keep = []
+        for conn, last_used in idle:
+            if now - last_used > DB_POOL_IDLE_TIMEOUT:
+                CONNECTION_DATABASES.pop(conn, None)
+                try:
+                    conn.close()
+                except mysql.connector.Error:
+                    pass
+            else:
+                keep.append((conn, last_used))
+        CONNECTION_POOL[database] = keep
+
+def take_idle_connection(database):
+    """Pops an idle connection, preferring one that already uses the given database."""
+    with POOL_LOCK:
+        prune_idle_connections(time.time())
+        idle = CONNECTION_POOL.get(database)
+        if idle:
+            return idle.pop() # newest first, keeps the warm connections in use
+        for other_idle in CONNECTION_POOL.values():
+            if other_idle:
+                return other_idle.pop()
+    return None, None
+
+def acquire_connection(database=None):
+    """Returns a healthy connection to the given database, reusing a pooled one if possible.
+
+    A pooled connection of another database is switched with USE instead of opening a new one.
+    Connection errors are raised.
+    """
+    while True:
+        conn, last_used = take_idle_connection(database)
+        if conn is None:
+            break
+        try:
+            if time.time() - last_used > POOL_PING_AFTER:
+                conn.ping()
+            if database and CONNECTION_DATABASES.get(conn) != database:
+                conn.cmd_init_db(database) # same as USE, no new handshake
+                CONNECTION_DATABASES[conn] = database
+            return conn
+        except mysql.connector.Error:
+            # dead connection (server restart, wait_timeout...), drop it and try the next one
+            CONNECTION_DATABASES.pop(conn, None)
+            try:
+                conn.close()
+            except mysql.connector.Error:
+                pass
+
+    conn = connect_db(database)
+    CONNECTION_DATABASES[conn] = database
+    return conn
+
+def release_connection(conn, cursor=None):
+    """Closes the cursor and hands the connection back to the pool (or closes it if it is not reusable)."""
+    if cursor is not None:
+        try:
+            cursor.close()
+        except mysql.connector.Error:
+            pass # unread result of a cancelled stream, the connection is discarded below
+
+    reusable = False
+    try:
+        if conn.unread_result:
+            reusable = False
+        else:
+            if conn.in_transaction:
+                conn.rollback()
+            reusable = True
+    except mysql.connector.Error:
+        reusable = False
+
+    with POOL_LOCK:
+        database = CONNECTION_DATABASES.get(conn)
+        idle = CONNECTION_POOL.setdefault(database, [])
+        if reusable and len(idle) < DB_POOL_SIZE:
+            idle.append((conn, time.time()))
+            return
+        CONNECTION_DATABASES.pop(conn, None)
+    try:
+        conn.close()
+    except mysql.connector.Error:
+        pass
+
+def track_use_statement(conn, query):
+    """Keeps the pool bookkeeping right when a query switched the database with USE."""
+    use_match = re.match(r"\s*USE\s+`?(\w+)`?\s*;?\s*$", query, re.IGNORECASE)
+    if use_match:
+        CONNECTION_DATABASES[conn] = use_match.group(1)
+
+def close_connection_pool():
+    """Closes all idle pooled connections, used on shutdown."""
+    with POOL_LOCK:
+        for idle in CONNECTION_POOL.values():
+            for conn, _ in idle:
+                try:
+                    conn.close()
+                except mysql.connector.Error:
+                    pass
+        CONNECTION_POOL.clear()
+        CONNECTION_DATABASES.clear()
+
+def load_schema(conn, database):
+    """Loads all tables and columns of a database with a single information_schema query."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY, COLUMN_DEFAULT, EXTRA "
+            "FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = %s "
+            "ORDER BY TABLE_NAME, ORDINAL_POSITION",
+            (database,)
+        )
+        tables = {}
+        for row in cursor.fetchall():
+            # some server versions return information_schema strings as bytes
+            table_name, *column = [value.decode() if isinstance(value, (bytes, bytearray)) else value for value in row]
+            tables.setdefault(table_name, []).append(tuple(column)) # same layout as a DESCRIBE row
+        return {"tables": tables, "loaded_at": time.time()}
+    finally:
+        cursor.close()
+
+def get_schema(conn, database, refresh=False):
+    """Returns the cached schema of a database, loading it on first use (or when refresh is set)."""
+    with SCHEMA_LOCK:
+        schema = SCHEMA_CACHE.get(database)
+    if schema is None or refresh:
+        schema = load_schema(conn, database)
+        with SCHEMA_LOCK:
+            SCHEMA_CACHE[database] = schema
+    return schema
+
+def invalidate_schema(database=None):
+    """Drops the cached schema of one database, or of all databases."""
+    with SCHEMA_LOCK:
+        if database is None:
+            SCHEMA_CACHE.clear()
+        else:
+            SCHEMA_CACHE.pop(database, None)
+
+def schema_table_columns(schema, table_name):
+    """Returns the DESCRIBE-like column rows of a table from a cached schema, or None if it does not exist."""
+    columns = schema["tables"].get(table_name)
+    if columns is None:
+        # table names are case-insensitive on windows/mac servers
+        for name, table_columns in schema["tables"].items():
+            if name.lower() == table_name.lower():
+                return table_columns
+    return columns
+
+def is_ddl_statement(statement):
+    """True for statements that can change the schema (CREATE/ALTER/DROP/RENAME)."""
+    return re.match(r"\s*(CREATE|ALTER|DROP|RENAME)\b", statement, re.IGNORECASE) is not None
+
+def get_primary_key_columns(conn, table_name, database=None):
+    """Alle Primary Key Spalten der Tabelle in Spaltenreihenfolge (aus dem Schema-Cache), [] wenn unbekannt."""
+    database = database or CONNECTION_DATABASES.get(conn)
+    if not database:
+        return []
+    try:
+        columns = schema_table_columns(get_schema(conn, database), table_name)
+    except mysql.connector.Error:
+        return []
+    return [field_name for field_name, _, _, key_type, _, _ in columns or [] if key_type == 'PRI']
+
+def get_primary_key_column(conn, table_name, database=None):
+    """Findet den Namen der Primary Key Spalte für die gegebene Tabelle (aus dem Schema-Cache)."""
+    primary_keys = get_primary_key_columns(conn, table_name, database)
+    return primary_keys[0] if primary_keys else None # None: Kein PK gefunden
+
+def skip_quoted(script, start):
+    """Returns the index after the quoted string/identifier that starts at script[start]."""
+    quote = script[start]
+    i = start + 1
+    length = len(script)
+    while i < length:
+        ch = script[i]
+        if ch == "\\" and quote != "`":
+            i += 2 # escaped character
+        elif ch == quote:
+            if i + 1 < length and script[i + 1] == quote:
+                i += 2 # doubled quote ('it''s')
+            else:
+                return i + 1
+        else:
+            i += 1
+    return length
+
+def skip_comment(script, start):
+    """Returns the index after the comment at script[start], or start if there is none."""
+    if script.startswith("/*", start):
+        end = script.find("*/", start + 2)
+        return len(script) if end == -1 else end + 2
+    if script[start] == "#" or (script.startswith("--", start) and (start + 2 == len(script) or script[start + 2].isspace())):
+        end = script.find("\n", start)
+        return len(script) if end == -1 else end + 1
+    return start
+
+def split_sql_statements(script):
+    """Splits a script into single statements, respecting quotes, comments and DELIMITER.
+
+    Comments in front of a statement are dropped, comments inside it are kept, as are
+    /*! ... */ and /*+ ... */ since the server interprets them.
+    """
+    statements = []
+    delimiter = ";"
+    special = re.compile(r"['\"`#]|--|/\*|" + re.escape(delimiter))
+    stmt_start = None
+    i = 0
+    length = len(script)
+
+    while i < length:
+        if stmt_start is None:
+            # between statements: skip whitespace, comments and DELIMITER lines
+            if script[i].isspace():
+                i += 1
+                continue
+            if not script.startswith(("/*!", "/*+"), i):
+                after_comment = skip_comment(script, i)
+                if after_comment != i:
+                    i = after_comment
+                    continue
+            delimiter_match = re.match(r"DELIMITER[ \t]+(\S+)[^\n]*", script[i:i + 200], re.IGNORECASE)
+            if delimiter_match:
+                delimiter = delimiter_match.group(1)
+                special = re.compile(r"['\"`#]|--|/\*|" + re.escape(delimiter))
+                i += delimiter_match.end()
+                continue
+            stmt_start = i
+
+        match = special.search(script, i)
+        if not match:
+            break
+        i = match.start()
+        token = match.group(0)
+        if token in ("'", '"', "`"):
+            i = skip_quoted(script, i)
+        elif token == delimiter:
+            statement = script[stmt_start:i].strip()
+            if statement:
+                statements.append(statement)
+            stmt_start = None
+            i += len(delimiter)
+        else:
+            after_comment = skip_comment(script, i)
+            i = after_comment if after_comment != i else i + 1
+
+    if stmt_start is not None:
+        statement = script[stmt_start:].strip()
+        if statement:
+            statements.append(statement)
+    return statements
+
+def statement_summary(statement, width=60):
+    """First line of a statement, shortened for the script log."""
+    first_line = statement.strip().splitlines()[0] if statement.strip() else ""
+    return first_line if len(first_line) <= width else first_line[:width - 3] + "..."
+
+def extend_column_store(store, rows):
+    """Appends fetched row tuples to a column store ({"data": one list per column, "rows": count})."""
+    # transpose the batch once and extend each column list, much cheaper than appending cell by cell
+    for column_values, new_values in zip(store["data"], zip(*rows)):
+        column_values.extend(new_values)
+    store["rows"] += len(rows)
+
+def column_store_row(data, index):
+    """Returns the row at the given index of the column lists as a tuple."""
+    return tuple(column_values[index] for column_values in data)
+
+def clamp_view_window(offset, capacity, total):
+    """First row and row count of a grid window of capacity rows, it never scrolls past the last row."""
+    offset = max(0, min(offset, total - capacity))
+    return offset, min(capacity, total - offset)
+
+def tab_separated_text(columns, rows):
+    """Header line and rows as tab separated text, the clipboard format of "Copy All Data"."""
+    lines = ["\t".join(columns)]
+    for values in rows:
+        # convert all values to string to avoid issues with None or other types
+        lines.append("\t".join(map(str, values)))
+    return "\n".join(lines)
+
+def export_value(value):
+    """Converts a fetched value for export: bytes are decoded, everything else stays as is."""
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8', errors='replace')
+    return value
+
+def open_export_file(filename):
+    """Opens the export target, gzip-compressed if the name ends with .gz."""
+    if filename.lower().endswith('.gz'):
+        return gzip.open(filename, 'wt', newline='', encoding='utf-8')
+    return open(filename, 'w', newline='', encoding='utf-8')
+
+def export_format_for(filename):
+    """Picks the export format from the file extension: csv (default), tsv or jsonl."""
+    name = filename.lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    if name.endswith('.tsv') or name.endswith('.txt'):
+        return 'tsv'
+    if name.endswith('.jsonl') or name.endswith('.ndjson') or name.endswith('.json'):
+        return 'jsonl'
+    return 'csv'
+
+def describe_tables_text(schema):
+    """DESCRIBE output of all tables of a cached schema as aligned plain text."""
+    tables = sorted(schema["tables"])
+    output = ""
+    desc_cols = ["Field", "Type", "Null", "Key", "Default", "Extra"]
+    padding = 2  # spacing
+    for table_name in tables:
+        output += f"tablename: {table_name}\n"
+
+        # None -> NULL
+        processed_rows = [[str(x) if x is not None else 'NULL' for x in row] for row in schema["tables"][table_name]]
+        col_widths = [len(col) for col in desc_cols]
+        for row in processed_rows:
+            for i, value in enumerate(row):
+                if i < len(col_widths):
+                    col_widths[i] = max(col_widths[i], len(value))
+                else:
+                    col_widths.append(len(value))
+
+        output += "".join(col.ljust(col_widths[i] + padding) for i, col in enumerate(desc_cols)).rstrip() + "\n"
+        output += "".join("-" * width + " " * padding for width in col_widths).rstrip() + "\n"
+        for row in processed_rows:
+            output += "".join(value.ljust(col_widths[i] + padding) for i, value in enumerate(row)).rstrip() + "\n"
+        output += "\n" # empty line between tables
+    return output.strip()
+
+def write_result_set(cursor, f, export_format, on_batch=None):
+    """Streams the rows of an executed cursor into an open text file, returns the row count.
+
+    csv uses ';' for excel like export_to_excel, tsv and jsonl are for everything else.
+    on_batch(rows) is called after every fetchmany() batch, e.g. for progress output.
+    """
+    columns = [desc[0] for desc in cursor.description]
+    rows = 0
+    if export_format == 'jsonl':
+        for batch in iter(lambda: cursor.fetchmany(EXPORT_BATCH_SIZE), []):
+            f.writelines(
+                json.dumps(dict(zip(columns, map(export_value, row))), default=str, ensure_ascii=False) + "\n"
+                for row in batch
+            )
+            rows += len(batch)
+            if on_batch:
+                on_batch(len(batch))
+    else:
+        writer = csv.writer(f, delimiter=';' if export_format == 'csv' else '\t')
+        writer.writerow(columns)
+        for batch in iter(lambda: cursor.fetchmany(EXPORT_BATCH_SIZE), []):
+            writer.writerows([export_value(value) for value in row] for row in batch)
+            rows += len(batch)
+            if on_batch:
+                on_batch(len(batch))
+    return rows
+
+def run_statements(conn, statements, f, export_format="csv", log=None):
+    """Runs statements one after another on one connection, like a script in the gui.
+
+    The result set of the last statement is streamed into f, result sets of earlier
+    statements are only counted. log(index, statement, duration, rows) is called after
+    every statement. Returns the total number of rows written or affected.
+    """
+    cursor = conn.cursor() # unbuffered: rows go to the file as fast as the server sends them
+    total = 0
+    try:
+        for index, statement in enumerate(statements, start=1):
+            start_time = time.time()
+            cursor.execute(statement)
+            track_use_statement(conn, statement)
+            if cursor.description:
+                if index == len(statements):
+                    rows = write_result_set(cursor, f, export_format)
+                else:
+                    rows = sum(len(batch) for batch in iter(lambda: cursor.fetchmany(EXPORT_BATCH_SIZE), []))
+            else:
+                rows = max(cursor.rowcount, 0)
+                if is_ddl_statement(statement):
+                    invalidate_schema()
+            total += rows
+            if log:
+                log(index, statement, time.time() - start_time, rows)
+    finally:
+        try:
+            cursor.close()
+        except mysql.connector.Error:
+            pass # unread rows after an error, release_connection discards the connection
+    return total
@@ -1,21 +1,130 @@
-#todo wenn es viele datensätze gibt, sollen nur die ersten 1000 geladen werden. Im hintergrund sollen alle geladen werden. wenn diese geladen sind, soll das gui mit allen upgedated werden.
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
+from tkinter import ttk, messagebox, filedialog, simpledialog
 import mysql.connector
+from sql_formatter import format_sql, lex_line, tokenize_sql, SQL_KEYWORDS, KEYWORD_SET
+import engine
+from engine import (
+    SCHEMA_CACHE, release_connection, track_use_statement, close_connection_pool,
+    get_schema, schema_table_columns, is_ddl_statement, get_primary_key_column, get_primary_key_columns,
+    split_sql_statements, statement_summary, open_export_file, export_format_for, describe_tables_text, write_result_set,
+    extend_column_store, column_store_row, clamp_view_window, tab_separated_text
+)
 import re
 import time
+import sys
 import csv
+import json
 import os
-
-# global config - adjust as needed, can create .env file to change these
-DB_HOST = "localhost"
-DB_USER = "root"
-DB_PASSWORD = os.getenv("MYSQL_PASSWORD", "")
-DB_PORT = int(os.getenv("MYSQL_PORT", 3306)) # check if this is your port!!!!
-
-QUERY_HISTORY = []
-HISTORY_INDEX = -1
-MAX_HISTORY = 10
+import sqlite3
+import threading
+import queue
+import bisect
+import pickle
+import tempfile
+from collections import OrderedDict
+from decimal import Decimal
+from operator import itemgetter
+import itertools
+
+# connection config (DB_HOST, MYSQL_PASSWORD, pool size...) lives in engine.py, shared with the headless sqlgui.py
+
+# autocomplete (Ctrl+Space): sorted prefix indexes built from the schema cache in a background thread
+COMPLETION_INDEX = {}  # database name -> index, None while it is loading
+COMPLETION_LOCK = threading.Lock()
+COMPLETION_LIMIT = 50  # max suggestions shown
+COMPLETION_POPUP = None  # {"window", "listbox", "matches", "prefix"} while the suggestion list is open
+
+# persistent query history in a local sqlite file, appended by a writer thread
+HISTORY_DB_PATH = os.getenv("SQLGUI_HISTORY_DB", os.path.join(os.path.expanduser("~"), ".sqlgui_history.sqlite3"))
+HISTORY_QUEUE = queue.Queue()  # (query, db, duration, row_count, executed_at, tab) waiting to be written
+HISTORY_READER = None          # sqlite connection of the tk thread, None if the history is unavailable
+HISTORY_FTS = False            # True if sqlite has fts5 for the search panel
+HISTORY_UNWRITTEN = []         # entries of HISTORY_QUEUE not committed yet, F1/F2 and the search merge them in
+HISTORY_LOCK = threading.Lock()
+HISTORY_WRITE_ERROR = None     # last error of the writer thread, shown by poll_history_writer
+HISTORY_POSITION = None        # executed_at of the history entry shown by F1/F2, None = at the end
+HISTORY_SEARCH_LIMIT = 200
+
+# progressive result loading: the first rows are shown right away, the rest is fetched in the background
+INITIAL_ROWS = 1000      # rows painted immediately after the query returns
+FETCH_BATCH_SIZE = 1000  # rows per fetchmany() call in the background thread
+RENDER_BUDGET_MS = 40    # max time per root.after tick spent moving fetched rows into the result store
+RENDER_INTERVAL_MS = 15  # pause between two render ticks so the gui stays responsive
+
+ACTIVE_QUERY = None  # job of the query that is running or streaming its result set into the result store
+QUERY_INTERRUPTED_ERRNO = 1317  # server error after KILL QUERY
+SPINNER_FRAMES = "|/-\\"
+
+# the result grid is virtual: rows live in a column store, the tree only holds the visible window
+RESULT_STORE = {"columns": [], "data": [], "rows": 0}  # data = one list per column
+VIEW_OFFSET = 0          # index of the first row shown in the tree
+DEFAULT_ROW_HEIGHT = 20  # used until the tree has an item to measure
+
+# paged result mode: simple single-table SELECTs are fetched page by page while scrolling
+PAGE_SIZE = 500
+PAGE_PREFETCH_ROWS = 100  # the next page is requested when the view gets this close to the last loaded row
+PAGED_RESULT = None       # state of the paged result shown in the grid, None in normal mode
+
+AUTO_SELECT_LIMIT = 1000  # max rows read back after an INSERT/UPDATE
+
+# inline editing of single-table results with a primary key: edits are queued by key and written
+# as one transaction on Commit
+EDIT_TARGET = None  # {"db", "table", "pk_columns", "columns", "pk_indexes"} of the grid result, None = read-only
+PENDING_EDITS = {}  # primary key tuple -> {column index: new value}
+EDIT_BATCH_ROWS = 500  # edited rows per UPDATE statement on Commit
+CELL_EDITOR = None  # {"entry", "row", "column"} while a cell is being edited
+
+# client-side sort (header click) and quick filters on the loaded rows, the store itself is never reordered
+VIEW_ROWS = None         # store row indexes in display order, None = all rows in store order
+SORT_STATE = None        # (column index, descending)
+COLUMN_FILTERS = {}      # column index -> casefolded text the value has to contain
+SORT_CACHE = {}          # column index -> ascending order of all store rows, built on first sort
+FILTER_TEXT_CACHE = {}   # column index -> casefolded str() of every value, built on first filter
+FILTER_AFTER_ID = None
+FILTER_DEBOUNCE_MS = 150
+
+# "Compare with previous result": hash join of the grid result with the one shown before it
+PREVIOUS_RESULT = None       # {"columns", "data", "rows", "path"} of the replaced result, data is None once spilled
+DIFF_SNAPSHOT_MAX_MB = 256   # bigger previous results are moved to a temp file
+DIFF_PARTITION_ROWS = 250000 # rows per in-memory hash table, bigger diffs are partitioned through temp files
+DIFF_SPILL_BATCH_ROWS = 10000
+SNAPSHOT_LOCK = threading.Lock()  # "path"/"dropped" of snapshots, set by the spill thread and the tk thread
+DIFF_MAX_REMOVED_ROWS = 100000  # removed rows appended to the diff view, the rest is only counted
+DIFF_TAGS = {"+": ("diff_added",), "~": ("diff_changed",), "-": ("diff_removed",)}
+
+LAST_PROFILE = None  # phases/status/stages of the last profiled run, exported as json
+
+IMPORT_BATCH_ROWS = 2000  # rows per multi-row INSERT when LOAD DATA LOCAL INFILE is not available
+
+# opt-in client side cache for SELECT results, keyed on (database, normalized sql)
+RESULT_CACHE = OrderedDict()  # least recently used first
+RESULT_CACHE_LOCK = threading.Lock()
+RESULT_CACHE_MAX_MB = 256  # estimated memory of all cached result sets
+RESULT_CACHE_TTL = 600     # seconds until a cached result is considered stale
+
+# incremental syntax highlighting of the editor: only edited lines are lexed again
+HIGHLIGHT_COLORS = {
+    "keyword": {"foreground": "#0000c0"},
+    "string": {"foreground": "#a31515"},
+    "comment": {"foreground": "#008000"},
+    "number": {"foreground": "#098658"},
+    "ident": {"foreground": "#795e26"},
+}
+HIGHLIGHT_LINE_STATES = [None]  # lexer state at the end of each editor line (index 0 = line 1)
+HIGHLIGHT_DIRTY = set()         # line numbers that have to be lexed again
+HIGHLIGHT_AFTER_ID = None
+HIGHLIGHT_DEBOUNCE_MS = 30      # typing bursts are collected into one highlighting pass
+HIGHLIGHT_LINES_PER_TICK = 500  # max lines lexed per tick, big pastes are highlighted over several ticks
+
+# query tabs: the globals above always belong to the selected tab, the other tabs keep theirs in session["state"]
+SESSIONS = []          # one dict per tab, in tab order
+ACTIVE_SESSION = None  # session of the selected tab
+SESSION_NUMBERS = itertools.count(1)
+SESSION_GLOBALS = (
+    "RESULT_STORE", "VIEW_OFFSET", "VIEW_ROWS", "SORT_STATE", "COLUMN_FILTERS", "ACTIVE_QUERY", "PAGED_RESULT",
+    "EDIT_TARGET", "PENDING_EDITS", "PREVIOUS_RESULT", "HISTORY_POSITION", "HIGHLIGHT_LINE_STATES", "HIGHLIGHT_DIRTY",
+)
+BACKGROUND_POLL_MS = 200  # finished work of a background tab waits until the tab is selected again
 
 def describe_all_tables():
     # writes table describe to input field so you can copy
@@ -25,153 +134,60 @@ def describe_all_tables():
         messagebox.showwarning("Warning", "Please choose a database first.")
         return
 
-    conn = connect_db(db_name)
+    conn = acquire_connection(db_name)
     if not conn:
         return
-    cursor = conn.cursor()
     
     output = ""
     start_time = time.time()
 
     try:
-        cursor.execute("SHOW TABLES")
-        tables = [row[0] for row in cursor.fetchall()]
+        # one information_schema query for all tables instead of SHOW TABLES + one DESCRIBE per table
+        from_cache = db_name in SCHEMA_CACHE
+        schema = get_schema(conn, db_name)
+        tables = sorted(schema["tables"])
         
         if not tables:
             output = f"Database '{db_name}' contains no tables."
         else:
-            desc_cols = ["Field", "Type", "Null", "Key", "Default", "Extra"]
-            for table_name in tables:
-                output += f"tablename: {table_name}\n"
-                
-                cursor.execute(f"DESCRIBE `{table_name}`")
-                desc_rows = cursor.fetchall()
-
-                processed_rows = []
-                for row in desc_rows:
-                    # None -> NULL
-                    str_row = [str(x) if x is not None else 'NULL' for x in row]
-                    processed_rows.append(str_row)
-                col_widths = [len(col) for col in desc_cols]
-                for row in processed_rows:
-                    for i, value in enumerate(row):
-                        if i < len(col_widths): 
-                            col_widths[i] = max(col_widths[i], len(value))
-                        else:
-                            col_widths.append(len(value))
-                padding = 2  # spacing
-
-                header_line = ""
-                for i, col in enumerate(desc_cols):
-                    header_line += col.ljust(col_widths[i] + padding)
-                output += header_line.rstrip() + "\n"
-
-                separator_line = ""
-                for i, width in enumerate(col_widths):
-                    separator_line += "-" * width + " " * padding
-                output += separator_line.rstrip() + "\n"
-
-                for row in processed_rows:
-                    data_line = ""
-                    for i, value in enumerate(row):
-                        data_line += value.ljust(col_widths[i] + padding)
-                    output += data_line.rstrip() + "\n"
-                
-                output += "\n" # empty line between tables
+            output = describe_tables_text(schema)
         
         duration = time.time() - start_time
 
         sql_entry.delete("1.0", tk.END)
         sql_entry.insert("1.0", output.strip())
         
+        source = "from schema cache" if from_cache else "1 query"
         feedback_label.config(
-            text=f"Successfully described {len(tables)} tables ({duration:.3f} sec)"
+            text=f"Successfully described {len(tables)} tables ({duration:.3f} sec, {source})"
         )
         
     except mysql.connector.Error as err:
         error_message = str(err)[(str(err).find(';')+2):]
         show_message_box(f"Error during table description: {error_message}")
     finally:
-        cursor.close()
-        conn.close()
+        release_connection(conn)
 
 def beautify():
     raw_sql = sql_entry.get("1.0", tk.END).strip()
     if not raw_sql:
         return
 
-    keywords = [
-        "select", "from", "where", "join", "inner", "left", "right", "on",
-        "group by", "order by", "having", "limit", "offset", "insert", "into",
-        "values", "update", "set", "delete", "create", "table", "drop", "alter",
-        "add", "distinct", "union", "all", "as", "and", "or", "not", "in", "is",
-        "null", "like", "between", "exists", "case", "when", "then", "else", "end",
-        "sum", "avg", "min", "max", "count", "upper", "lower", "show", "desc", "asc"
-    ]
-
-    def replace_keyword(match):
-        return match.group(0).upper()
-
-    for kw in sorted(keywords, key=len, reverse=True):
-        pattern = r"\b" + re.escape(kw) + r"\b"
-        raw_sql = re.sub(pattern, replace_keyword, raw_sql, flags=re.IGNORECASE)
-
-    new_line_keywords = [
-        "FROM", "WHERE", "GROUP BY", "ORDER BY", "HAVING", "LIMIT", "OFFSET",
-        "INNER JOIN", "LEFT JOIN", "RIGHT JOIN", "UNION", "VALUES", "SET"
-    ]
-    
-    formatted_sql = raw_sql
-
-    for kw in new_line_keywords:
-        # if keyword is followed by space or is the end of a string
-        pattern = r"\s*\b" + re.escape(kw) + r"\b\s*"
-        formatted_sql = re.sub(pattern, f"\n  {kw} ", formatted_sql, flags=re.IGNORECASE)
-
-    lines = formatted_sql.split('\n')
-    output_lines = []
-    
-    for line in lines:
-        if line.strip().startswith("SELECT"):
-            parts = [p.strip() for p in line[6:].split(',')]
-            
-            if len(parts) > 1:
-                output_lines.append(line.split(' ', 1)[0])
-                for part in parts:
-                    if part:
-                        output_lines.append(f"    {part},")  # 4 spaces
-                if output_lines and output_lines[-1].endswith(','):
-                    output_lines[-1] = output_lines[-1][:-1]
-                continue
-        
-        # indent on
-        if " JOIN " in line.upper() and " ON " in line.upper():
-            line = re.sub(r"\bON\b", "\n    ON", line, flags=re.IGNORECASE)
-
-        output_lines.append(line.strip())
-
-    final_sql = "\n".join(output_lines)
-    final_sql = re.sub(r'\n\s*\n', '\n', final_sql).strip()
+    # single pass over a token stream, strings/identifiers/comments are never touched
+    final_sql = format_sql(raw_sql)
     sql_entry.delete("1.0", tk.END)
     sql_entry.insert("1.0", final_sql)
 
 def copy_table_content(event=None):  
-    columns = tree["columns"]
+    columns = RESULT_STORE["columns"]
     if not columns:
         messagebox.showinfo("Copy", "No data to copy.")
         return
         
-    content = "\t".join(columns) + "\n"
-    
-    for child in tree.get_children():
-        values = tree.item(child, 'values')
-        # convert all values to string to avoid issues with None or other types
-        content += "\t".join(map(str, values)) + "\n"
-        
     root.clipboard_clear()
-    root.clipboard_append(content.strip()) # strip removes the last newline
+    root.clipboard_append(tab_separated_text(columns, iter_result_rows()))
     root.update()
-    messagebox.showinfo("Copy", f"{len(tree.get_children())} rows copied to clipboard.")  
+    messagebox.showinfo("Copy", f"{view_row_count()} rows copied to clipboard.")  
 
 def copy_selected_cell(event):
     """Kopiert den Inhalt des Feldes (Zelle), auf das rechts geklickt wurde."""
@@ -189,8 +205,8 @@ def copy_selected_cell(event):
         # convert column id to index
         column_index = int(column_id.replace('#', '')) - 1
 
-        # take the value of the cell
-        values = tree.item(item_id, 'values')
+        # take the value of the cell from the result store, the tree only holds display copies
+        values = result_row(store_row(VIEW_OFFSET + tree.index(item_id)))
         
         if 0 <= column_index < len(values):
             cell_value = str(values[column_index])
@@ -207,7 +223,7 @@ def copy_selected_cell(event):
 def export_to_excel():
     """Exportiert alle aktuell angezeigten Datensätze als CSV-Datei."""
     
-    columns = tree["columns"]
+    columns = RESULT_STORE["columns"]
     if not columns:
         messagebox.showwarning("Export", "No data to export.")
         return
@@ -230,16 +246,304 @@ def export_to_excel():
             writer.writerow(columns)
             
             # 2. write data rows
-            for child in tree.get_children():
-                values = tree.item(child, 'values')
+            for values in iter_result_rows():
                 # convert all values to string to avoid issues with None or other types
-                writer.writerow(values)
+                writer.writerow(map(str, values))
                 
-        messagebox.showinfo("Export Success", f"Successfully exported {len(tree.get_children())} rows to:\n{filename}")
+        messagebox.showinfo("Export Success", f"Successfully exported {view_row_count()} rows to:\n{filename}")
         
     except Exception as e:
         messagebox.showerror("Export Error", f"An error occurred during export: {e}")    
 
+def query_export_worker(job):
+    # runs in a background thread, must not touch any tk widget; poll_query_export reads the job dict
+    try:
+        conn = acquire_connection(job["db"], raise_errors=True)
+    except mysql.connector.Error as err:
+        job["error"] = err
+        job["finished"] = True
+        return
+    cursor = conn.cursor() # unbuffered: rows come from the server only as fast as they are written
+    try:
+        cursor.execute(job["query"])
+        if not cursor.description:
+            raise ValueError("The query does not return a result set.")
+        job["phase"] = "writing"
+
+        def count_rows(rows):
+            job["rows"] += rows
+
+        with open_export_file(job["filename"]) as f:
+            write_result_set(cursor, f, job["format"], on_batch=count_rows)
+    except (mysql.connector.Error, OSError, ValueError) as err:
+        job["error"] = err
+    finally:
+        release_connection(conn, cursor)
+        job["duration"] = time.time() - job["start"]
+        job["finished"] = True
+
+def poll_query_export(job):
+    """Shows the progress of a running export in the feedback label."""
+    elapsed = max(time.time() - job["start"], 0.001)
+    if not job["finished"]:
+        if job["phase"] == "executing":
+            feedback_label.config(text=f"Exporting: running query... ({elapsed:.1f} sec)")
+        else:
+            feedback_label.config(
+                text=f"Exporting: {job['rows']:,} rows written ({job['rows'] / elapsed:,.0f} rows/sec)"
+            )
+        root.after(100, poll_query_export, job)
+        return
+
+    btn_export_query.config(state=tk.NORMAL)
+    if "error" in job:
+        feedback_label.config(text=f"Export failed after {job['rows']:,} rows.")
+        error_message = str(job["error"])
+        if isinstance(job["error"], mysql.connector.Error):
+            error_message = error_message[(error_message.find(';')+2):]
+        show_message_box(f"Error during export: {error_message}")
+        return
+
+    duration = max(job["duration"], 0.001)
+    size_mb = os.path.getsize(job["filename"]) / (1024 * 1024)
+    feedback_label.config(
+        text=f"Exported {job['rows']:,} rows to {os.path.basename(job['filename'])} "
+             f"({duration:.3f} sec, {job['rows'] / duration:,.0f} rows/sec, {size_mb:.1f} MB)"
+    )
+
+def export_query_to_file():
+    """Runs the query in the editor again and streams its result straight into a file (csv, tsv, jsonl, optionally .gz)."""
+    query = sql_entry.get("1.0", tk.END).strip()
+    db_name = selected_db.get()
+    if not query or not db_name:
+        messagebox.showwarning("Export", "Please choose a database and enter a query.")
+        return
+    statements = split_sql_statements(query)
+    if len(statements) != 1:
+        messagebox.showwarning("Export", "Export to file needs exactly one statement in the editor.")
+        return
+
+    filename = filedialog.asksaveasfilename(
+        defaultextension=".csv",
+        filetypes=[
+            ("CSV (Excel, ;)", "*.csv"), ("TSV", "*.tsv"), ("JSON Lines", "*.jsonl"),
+            ("gzip compressed", "*.csv.gz *.tsv.gz *.jsonl.gz"), ("All files", "*.*")
+        ],
+        title="Export query result to file"
+    )
+    if not filename:
+        return # user cancelled
+
+    job = {
+        "db": db_name,
+        "query": statements[0],
+        "filename": filename,
+        "format": export_format_for(filename),
+        "phase": "executing",
+        "rows": 0,
+        "start": time.time(),
+        "duration": 0.0,
+        "finished": False,
+    }
+    btn_export_query.config(state=tk.DISABLED)
+    threading.Thread(target=query_export_worker, args=(job,), daemon=True).start()
+    root.after(100, poll_query_export, job)
+
+def sniff_csv_dialect(filename):
+    """Returns (delimiter, line terminator, encoding) of a csv file, looking only at its first bytes."""
+    with open(filename, 'rb') as f:
+        head = f.read(64 * 1024)
+    encoding = 'utf-8-sig' if head.startswith(b'\xef\xbb\xbf') else 'utf-8'
+    text = head.decode(encoding, errors='ignore')
+    line_terminator = "\r\n" if "\r\n" in text else "\n"
+    try:
+        delimiter = csv.Sniffer().sniff(text.split(line_terminator, 1)[0], delimiters=";,\t|").delimiter
+    except csv.Error:
+        delimiter = ';' # same as export_to_excel
+    return delimiter, line_terminator, encoding
+
+def map_csv_header(header, table_columns):
+    """Maps csv header names to table columns (case-insensitive). Unknown csv columns map to None."""
+    by_lower_name = {col.lower(): col for col in table_columns}
+    return [by_lower_name.get(name.strip().lower()) for name in header]
+
+def counting_lines(f, job):
+    # feeds csv.reader line by line and keeps track of the progress (characters ~ bytes)
+    for line in f:
+        job["bytes_read"] += len(line)
+        yield line
+
+def import_with_load_data(job, column_mapping, delimiter, line_terminator):
+    """Imports the whole file with LOAD DATA LOCAL INFILE. Raises mysql.connector.Error if the server refuses."""
+    # every field goes through a user variable, so unknown csv columns are skipped and '' becomes NULL
+    variables = []
+    assignments = []
+    for index, column in enumerate(column_mapping):
+        variables.append(f"@c{index}")
+        if column:
+            assignments.append(f"`{column}` = NULLIF(@c{index}, '')")
+    terminator_sql = "\\r\\n" if line_terminator == "\r\n" else "\\n"
+    load_sql = (
+        f"LOAD DATA LOCAL INFILE %s INTO TABLE `{job['table']}` CHARACTER SET utf8mb4 "
+        f"FIELDS TERMINATED BY %s OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+        f"LINES TERMINATED BY '{terminator_sql}' IGNORE 1 LINES "
+        f"({', '.join(variables)}) SET {', '.join(assignments)}"
+    )
+
+    # LOAD DATA LOCAL needs a connection that allows it, pooled connections do not
+    conn = connect_db(job["db"], raise_errors=True, allow_local_infile=True)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(load_sql, (job["filename"], delimiter))
+        job["rows"] = cursor.rowcount
+        job["bytes_read"] = job["bytes_total"]
+    finally:
+        cursor.close()
+        conn.close()
+
+def import_with_inserts(job, conn, column_mapping, delimiter, encoding):
+    """Streams the file through csv.reader and inserts it with batched executemany (multi-row INSERTs)."""
+    target_columns = [col for col in column_mapping if col]
+    placeholders = ", ".join(["%s"] * len(target_columns))
+    column_list = ", ".join(f"`{col}`" for col in target_columns)
+    insert_sql = f"INSERT INTO `{job['table']}` ({column_list}) VALUES ({placeholders})"
+    keep = [index for index, col in enumerate(column_mapping) if col]
+
+    cursor = conn.cursor()
+    try:
+        with open(job["filename"], 'r', newline='', encoding=encoding) as f:
+            reader = csv.reader(counting_lines(f, job), delimiter=delimiter)
+            next(reader, None) # header
+            batch = []
+            for record in reader:
+                if not record:
+                    continue # empty line
+                batch.append(tuple(
+                    (record[index] if index < len(record) and record[index] != '' else None) for index in keep
+                ))
+                if len(batch) >= IMPORT_BATCH_ROWS:
+                    cursor.executemany(insert_sql, batch) # mysql-connector sends this as one multi-row INSERT
+                    job["rows"] += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(insert_sql, batch)
+                job["rows"] += len(batch)
+    finally:
+        cursor.close()
+
+def csv_import_worker(job):
+    # runs in a background thread, must not touch any tk widget; poll_csv_import reads the job dict
+    try:
+        conn = acquire_connection(job["db"], raise_errors=True)
+    except mysql.connector.Error as err:
+        job["error"] = err
+        job["finished"] = True
+        return
+    cursor = conn.cursor(buffered=True) # fetchone() must not leave rows unread on the pooled connection
+    try:
+        table_rows = schema_table_columns(get_schema(conn, job["db"]), job["table"])
+        if table_rows is None:
+            raise ValueError(f"Table `{job['table']}` does not exist in '{job['db']}'.")
+        table_columns = [row[0] for row in table_rows]
+
+        delimiter, line_terminator, encoding = sniff_csv_dialect(job["filename"])
+        with open(job["filename"], 'r', newline='', encoding=encoding) as f:
+            header = next(csv.reader(f, delimiter=delimiter), [])
+        column_mapping = map_csv_header(header, table_columns)
+        if not any(column_mapping):
+            raise ValueError(f"None of the csv columns ({', '.join(header)}) exist in `{job['table']}`.")
+        job["skipped_columns"] = [name for name, col in zip(header, column_mapping) if not col]
+
+        cursor.execute("SHOW VARIABLES LIKE 'local_infile'")
+        local_infile = cursor.fetchone()
+        if local_infile and str(local_infile[1]).upper() in ("ON", "1"):
+            try:
+                job["method"] = "LOAD DATA LOCAL INFILE"
+                import_with_load_data(job, column_mapping, delimiter, line_terminator)
+                return
+            except mysql.connector.Error:
+                job["rows"] = 0 # client or server refused LOCAL, use INSERTs below
+
+        job["method"] = "batched INSERT"
+        import_with_inserts(job, conn, column_mapping, delimiter, encoding)
+    except (mysql.connector.Error, OSError, ValueError, csv.Error) as err:
+        job["error"] = err
+    finally:
+        release_connection(conn, cursor)
+        if job["rows"]:
+            invalidate_result_cache(tables={job["table"]})
+        job["duration"] = time.time() - job["start"]
+        job["finished"] = True
+
+def poll_csv_import(job):
+    """Updates progress bar and feedback label of a running csv import."""
+    elapsed = max(time.time() - job["start"], 0.001)
+    if job["bytes_total"]:
+        import_progress["value"] = 100 * job["bytes_read"] / job["bytes_total"]
+
+    if not job["finished"]:
+        feedback_label.config(
+            text=f"Importing into `{job['table']}` ({job['method']})... {job['rows']:,} rows ({job['rows'] / elapsed:,.0f} rows/sec)"
+        )
+        root.after(100, poll_csv_import, job)
+        return
+
+    import_progress.pack_forget()
+    btn_import.config(state=tk.NORMAL)
+    if "error" in job:
+        feedback_label.config(text=f"Import failed after {job['rows']:,} rows.")
+        error_message = str(job["error"])
+        if isinstance(job["error"], mysql.connector.Error):
+            error_message = error_message[(error_message.find(';')+2):]
+        show_message_box(f"Error during csv import: {error_message}")
+        return
+
+    duration = max(job["duration"], 0.001)
+    feedback_label.config(
+        text=f"Imported {job['rows']:,} rows into `{job['table']}` with {job['method']} ({duration:.3f} sec, {job['rows'] / duration:,.0f} rows/sec)"
+    )
+    if job["skipped_columns"]:
+        messagebox.showinfo("Import", f"These csv columns do not exist in `{job['table']}` and were skipped:\n{', '.join(job['skipped_columns'])}")
+
+def import_csv():
+    """Imports a csv file into a table of the selected database, in a background thread."""
+    db_name = selected_db.get()
+    if not db_name:
+        messagebox.showwarning("Warning", "Please choose a database first.")
+        return
+
+    filename = filedialog.askopenfilename(
+        filetypes=[("CSV files", "*.csv"), ("Text files", "*.txt *.tsv"), ("All files", "*.*")],
+        title="Import CSV into table"
+    )
+    if not filename:
+        return # user cancelled
+
+    default_table = os.path.splitext(os.path.basename(filename))[0]
+    table_name = simpledialog.askstring("Import CSV", f"Import into which table of '{db_name}'?", initialvalue=default_table)
+    if not table_name:
+        return
+    table_name = table_name.strip().strip('`')
+
+    job = {
+        "db": db_name,
+        "table": table_name,
+        "filename": filename,
+        "method": "preparing",
+        "rows": 0,
+        "bytes_read": 0,
+        "bytes_total": os.path.getsize(filename),
+        "skipped_columns": [],
+        "start": time.time(),
+        "duration": 0.0,
+        "finished": False,
+    }
+    btn_import.config(state=tk.DISABLED)
+    import_progress["value"] = 0
+    import_progress.pack(side="left", padx=5)
+    threading.Thread(target=csv_import_worker, args=(job,), daemon=True).start()
+    root.after(100, poll_csv_import, job)
+
 def format_and_display_error(err):
     """Formats a mysql.connector.Error and calls the display box."""
     error_message = str(err)
@@ -255,23 +559,42 @@ def format_and_display_error(err):
 
     show_message_box(error_message.strip())
 
-def connect_db(database=None):
+def connect_db(database=None, raise_errors=False, allow_local_infile=False):
+    """engine.connect_db, connection errors are shown in the gui unless raise_errors is set."""
     try:
-        conn = mysql.connector.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            port=DB_PORT,        
-            database=database if database else None
-        )
-        return conn
+        return engine.connect_db(database, allow_local_infile)
+    except mysql.connector.Error as err:
+        if raise_errors:
+            raise # caller is not on the tk thread and reports the error itself
+        format_and_display_error(err)
+        return None
+
+def acquire_connection(database=None, raise_errors=False):
+    """engine.acquire_connection (pooled), connection errors are shown in the gui unless raise_errors is set
+    (for use off the tk thread)."""
+    try:
+        return engine.acquire_connection(database)
     except mysql.connector.Error as err:
-        # Replaced messagebox.showerror with the new helper function
-        format_and_display_error(err) 
+        if raise_errors:
+            raise
+        format_and_display_error(err)
         return None
 
+def invalidate_schema(database=None):
+    """Drops the cached schema of one database (or of all) together with its autocomplete index."""
+    engine.invalidate_schema(database)
+    with COMPLETION_LOCK:
+        if database is None:
+            COMPLETION_INDEX.clear()
+        else:
+            COMPLETION_INDEX.pop(database, None)
+
+def format_timing(duration, connect_duration):
+    """Formats query time and connection acquisition time for the feedback label."""
+    return f"{duration:.3f} sec, connection {connect_duration:.3f} sec"
+
 def load_databases():
-    conn = connect_db()
+    conn = acquire_connection()
     if not conn:
         return
     cursor = conn.cursor()
@@ -284,255 +607,3017 @@ def load_databases():
     except mysql.connector.Error as err:
         messagebox.showerror("an error occurred when loading databases", str(err))
     finally:
-        cursor.close()
-        conn.close()
+        release_connection(conn, cursor)
         
+def open_history_db():
+    conn = sqlite3.connect(HISTORY_DB_PATH, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL") # readers (tk thread) never wait for the writer thread
+    return conn
+
+def init_history_store():
+    """Creates the history database if needed and starts the writer thread."""
+    global HISTORY_READER, HISTORY_FTS
+    try:
+        conn = open_history_db()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            "id INTEGER PRIMARY KEY, query TEXT NOT NULL, db TEXT, duration REAL, "
+            "row_count INTEGER, executed_at REAL NOT NULL)"
+        )
+        if "tab" not in [row[1] for row in conn.execute("PRAGMA table_info(history)")]:
+            conn.execute("ALTER TABLE history ADD COLUMN tab TEXT") # history files of older versions
+        # F1/F2 step by time, entries that are still queued have no id yet
+        conn.execute("CREATE INDEX IF NOT EXISTS history_executed_at ON history(executed_at)")
+        try:
+            # full text index, kept in sync by a trigger so appends stay a single INSERT
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(query, content='history', content_rowid='id')")
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS history_fts_insert AFTER INSERT ON history BEGIN "
+                "INSERT INTO history_fts(rowid, query) VALUES (new.id, new.query); END"
+            )
+            HISTORY_FTS = True
+        except sqlite3.OperationalError:
+            HISTORY_FTS = False # sqlite without fts5, search falls back to LIKE
+        conn.commit()
+        HISTORY_READER = conn
+    except sqlite3.Error as err:
+        feedback_label.config(text=f"History disabled, could not open {HISTORY_DB_PATH}: {err}")
+        return
+    threading.Thread(target=history_writer, daemon=True).start()
+    root.after(1000, poll_history_writer)
+
+def history_writer():
+    # runs in a background thread with its own sqlite connection, writes queued entries in batches
+    global HISTORY_WRITE_ERROR
+    conn = open_history_db()
+    while True:
+        entries = [HISTORY_QUEUE.get()]
+        while True:
+            try:
+                entries.append(HISTORY_QUEUE.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO history (query, db, duration, row_count, executed_at, tab) VALUES (?, ?, ?, ?, ?, ?)",
+                    entries
+                )
+        except sqlite3.Error as err:
+            HISTORY_WRITE_ERROR = str(err) # the entries are lost, like with a failed INSERT before
+        with HISTORY_LOCK:
+            del HISTORY_UNWRITTEN[:len(entries)] # same order as the queue
+        for _ in entries:
+            HISTORY_QUEUE.task_done()
+
+def poll_history_writer():
+    # the writer thread must not touch widgets, its errors are shown from here
+    global HISTORY_WRITE_ERROR
+    if HISTORY_WRITE_ERROR is not None:
+        feedback_label.config(text=f"Could not write query history: {HISTORY_WRITE_ERROR}")
+        HISTORY_WRITE_ERROR = None
+    root.after(1000, poll_history_writer)
+
+def flush_history():
+    """Waits until queued history entries are written (they are, within milliseconds). Only used on exit,
+    the tk thread reads HISTORY_UNWRITTEN instead of waiting for the writer."""
+    if HISTORY_READER is not None:
+        HISTORY_QUEUE.join()
+
+def tab_history_params():
+    """F1/F2 of a tab walk the history as it was when the tab was opened plus the tab's own runs,
+    not the runs of the other tabs. Goes with the condition "(executed_at <= ? OR tab = ?)"."""
+    return (ACTIVE_SESSION["opened_at"], ACTIVE_SESSION["key"])
+
+def tab_unwritten_history():
+    """Queued entries the tab can see, as (executed_at, query), oldest first."""
+    opened_at, key = tab_history_params()
+    with HISTORY_LOCK:
+        entries = list(HISTORY_UNWRITTEN)
+    return [(entry[4], entry[0]) for entry in entries if entry[4] <= opened_at or entry[5] == key]
+
 def update_history_buttons():
-    """Enables/disables the back/forward buttons based on the current history index."""
-    # Back button is enabled if not at the start of the history
-    if HISTORY_INDEX > 0:
+    """Enables/disables the back/forward buttons based on the current history position."""
+    has_older = False
+    if HISTORY_READER is not None:
+        position = HISTORY_POSITION if HISTORY_POSITION is not None else sys.maxsize
+        has_older = HISTORY_READER.execute(
+            "SELECT 1 FROM history WHERE executed_at < ? AND (executed_at <= ? OR tab = ?) LIMIT 1",
+            (position,) + tab_history_params()
+        ).fetchone() is not None
+        has_older = has_older or any(executed_at < position for executed_at, _ in tab_unwritten_history())
+
+    # Back button is enabled if there is an older entry
+    if has_older:
         btn_back.config(state=tk.NORMAL)
     else:
         btn_back.config(state=tk.DISABLED)
 
-    # Forward button is enabled if not at the end (len - 1) of the history
-    if HISTORY_INDEX < len(QUERY_HISTORY) - 1:
+    # Forward button is enabled if we are not at the end (newest entry) of the history
+    if HISTORY_POSITION is not None:
         btn_forward.config(state=tk.NORMAL)
     else:
         btn_forward.config(state=tk.DISABLED)
 
-def add_query_to_history(query):
-    """Adds a query to the history, manages max size, and updates index/buttons."""
-    global QUERY_HISTORY, HISTORY_INDEX
-    
-    # If the user navigated back and runs a new query, clear the "forward" history
-    if HISTORY_INDEX != len(QUERY_HISTORY) - 1:
-        QUERY_HISTORY = QUERY_HISTORY[:HISTORY_INDEX + 1]
-
-    # Avoid adding the same query twice in a row (if not empty)
-    if not QUERY_HISTORY or QUERY_HISTORY[-1] != query:
-        QUERY_HISTORY.append(query)
-        # Maintain maximum history size
-        if len(QUERY_HISTORY) > MAX_HISTORY:
-            QUERY_HISTORY.pop(0) # Remove oldest
+def add_query_to_history(query, db=None, duration=None, row_count=None):
+    """Queues a run for the persistent history (written by the writer thread) and resets the position."""
+    global HISTORY_POSITION
+    if HISTORY_READER is not None:
+        entry = (query, db, duration, row_count, time.time(), ACTIVE_SESSION["key"])
+        with HISTORY_LOCK:
+            HISTORY_UNWRITTEN.append(entry)
+        HISTORY_QUEUE.put(entry)
     
-    HISTORY_INDEX = len(QUERY_HISTORY) - 1
+    # like before: running a query jumps back to the end of the history
+    HISTORY_POSITION = None
     update_history_buttons()
 
+def show_history_entry(executed_at, query):
+    global HISTORY_POSITION
+    HISTORY_POSITION = executed_at
+    sql_entry.delete("1.0", tk.END)
+    sql_entry.insert("1.0", query)
+
 def query_back():
     """Moves back one step in the query history and updates the textbox."""
-    global HISTORY_INDEX
-    if HISTORY_INDEX > 0:
-        HISTORY_INDEX -= 1
-        sql_entry.delete("1.0", tk.END)
-        sql_entry.insert("1.0", QUERY_HISTORY[HISTORY_INDEX])
+    if HISTORY_READER is None:
+        return
+    position = HISTORY_POSITION if HISTORY_POSITION is not None else sys.maxsize
+    shown = sql_entry.get("1.0", tk.END).strip()
+    # skip entries that equal the text in the editor, the same query is often run several times in a row
+    entry = HISTORY_READER.execute(
+        "SELECT executed_at, query FROM history WHERE executed_at < ? AND query != ? AND (executed_at <= ? OR tab = ?) "
+        "ORDER BY executed_at DESC LIMIT 1",
+        (position, shown) + tab_history_params()
+    ).fetchone()
+    for executed_at, query in tab_unwritten_history():
+        if executed_at < position and query != shown and (entry is None or executed_at > entry[0]):
+            entry = (executed_at, query)
+    if entry:
+        show_history_entry(*entry)
     update_history_buttons()
 
 def query_forward():
     """Moves forward one step in the query history and updates the textbox."""
-    global HISTORY_INDEX
-    if HISTORY_INDEX < len(QUERY_HISTORY) - 1:
-        HISTORY_INDEX += 1
-        sql_entry.delete("1.0", tk.END)
-        sql_entry.insert("1.0", QUERY_HISTORY[HISTORY_INDEX])
+    global HISTORY_POSITION
+    if HISTORY_READER is None or HISTORY_POSITION is None:
+        return
+    shown = sql_entry.get("1.0", tk.END).strip()
+    entry = HISTORY_READER.execute(
+        "SELECT executed_at, query FROM history WHERE executed_at > ? AND query != ? AND (executed_at <= ? OR tab = ?) "
+        "ORDER BY executed_at ASC LIMIT 1",
+        (HISTORY_POSITION, shown) + tab_history_params()
+    ).fetchone()
+    for executed_at, query in tab_unwritten_history():
+        if executed_at > HISTORY_POSITION and query != shown and (entry is None or executed_at < entry[0]):
+            entry = (executed_at, query)
+    if entry:
+        show_history_entry(*entry)
+    else:
+        HISTORY_POSITION = None # reached the newest entry
     update_history_buttons()
 
-def get_primary_key_column(conn, table_name):
-    """Findet den Namen der Primary Key Spalte für die gegebene Tabelle."""
-    cursor = conn.cursor()
-    try:
-        # Finde den PK-Namen
-        cursor.execute(f"DESCRIBE `{table_name}`")
-        for field_name, _, _, key_type, _, _ in cursor.fetchall():
-            if key_type == 'PRI':
-                return field_name
-        return None # Kein PK gefunden
-    except mysql.connector.Error:
-        return None
-    finally:
-        cursor.close()
+def search_history(text, limit=HISTORY_SEARCH_LIMIT):
+    """Returns the newest history entries matching all words of text (prefix match), queued ones first."""
+    columns = "h.id, h.executed_at, h.db, h.duration, h.row_count, h.query"
+    words = text.split()
+    if not words:
+        entries = HISTORY_READER.execute(f"SELECT {columns} FROM history h ORDER BY h.id DESC LIMIT ?", (limit,)).fetchall()
+    elif HISTORY_FTS:
+        match = " ".join('"' + word.replace('"', '""') + '"*' for word in words)
+        # fts5 walks its index in rowid order, so the newest matches come without sorting all hits
+        entries = HISTORY_READER.execute(
+            f"SELECT {columns} FROM history h WHERE h.id IN ("
+            f"SELECT rowid FROM history_fts WHERE history_fts MATCH ? ORDER BY rowid DESC LIMIT ?"
+            f") ORDER BY h.id DESC",
+            (match, limit)
+        ).fetchall()
+    else:
+        conditions = " AND ".join("h.query LIKE ?" for _ in words)
+        entries = HISTORY_READER.execute(
+            f"SELECT {columns} FROM history h WHERE {conditions} ORDER BY h.id DESC LIMIT ?",
+            [f"%{word}%" for word in words] + [limit]
+        ).fetchall()
+
+    # entries the writer has not committed yet are matched here (substring instead of prefix match)
+    needles = [word.casefold() for word in words]
+    with HISTORY_LOCK:
+        unwritten = list(HISTORY_UNWRITTEN)
+    recent = [
+        (None, executed_at, db, duration, row_count, query)
+        for query, db, duration, row_count, executed_at, tab in reversed(unwritten)
+        if all(needle in query.casefold() for needle in needles)
+    ]
+    recent_times = {entry[1] for entry in recent}
+    return (recent + [entry for entry in entries if entry[1] not in recent_times])[:limit]
 
-def execute_query():
-    query = sql_entry.get("1.0", tk.END).strip()
-    if not query:
-        messagebox.showwarning("warning", "please enter an SQL query.")
+def open_history_search(event=None):
+    """Ctrl+R: search window over the whole persistent history."""
+    if HISTORY_READER is None:
+        messagebox.showinfo("History", "The query history is not available.")
         return
 
+    window = tk.Toplevel(root)
+    window.title("Search query history")
+    window.geometry("800x400")
+    search_text = tk.StringVar()
+    search_entry = tk.Entry(window, textvariable=search_text)
+    search_entry.pack(fill="x", padx=10, pady=(10, 5))
+    search_entry.focus_set()
+
+    columns = ("time", "db", "duration", "rows", "query")
+    results = ttk.Treeview(window, columns=columns, show="headings")
+    for col, width in zip(columns, (130, 90, 70, 70, 420)):
+        results.heading(col, text=col)
+        results.column(col, width=width, stretch=(col == "query"))
+    results.pack(expand=True, fill="both", padx=10)
+    status = tk.Label(window, text="", anchor="w", fg="gray")
+    status.pack(fill="x", padx=10, pady=(0, 10))
+
+    found = {}
+    pending = []
+
+    def run_search():
+        pending.clear()
+        start_time = time.time()
+        try:
+            entries = search_history(search_text.get())
+        except sqlite3.Error as err:
+            status.config(text=f"Invalid search: {err}")
+            return
+        results.delete(*results.get_children())
+        found.clear()
+        for position, (entry_id, executed_at, db, duration, row_count, query) in enumerate(entries):
+            found[str(position)] = (executed_at, query, db)
+            results.insert("", "end", iid=str(position), values=(
+                time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(executed_at)),
+                db or "",
+                "" if duration is None else f"{duration:.3f}",
+                "" if row_count is None else row_count,
+                " ".join(query.split())[:200],
+            ))
+        status.config(text=f"{len(entries)} entries shown ({(time.time() - start_time) * 1000:.1f} ms)")
+
+    def schedule_search(*args):
+        # debounce: search once the user paused typing
+        for after_id in pending:
+            window.after_cancel(after_id)
+        pending.clear()
+        pending.append(window.after(120, run_search))
+
+    def use_selected(event=None):
+        selection = results.selection() or results.get_children()[:1]
+        if not selection:
+            return
+        executed_at, query, db = found[selection[0]]
+        show_history_entry(executed_at, query)
+        if db and db in db_dropdown["values"]:
+            selected_db.set(db)
+        update_history_buttons()
+        window.destroy()
+
+    search_text.trace_add("write", schedule_search)
+    search_entry.bind("<Return>", use_selected)
+    search_entry.bind("<Down>", lambda event: results.focus_set())
+    results.bind("<Double-1>", use_selected)
+    results.bind("<Return>", use_selected)
+    window.bind("<Escape>", lambda event: window.destroy())
+    run_search()
+
+def refresh_schema():
+    """Reloads the schema cache of the selected database."""
     db_name = selected_db.get()
     if not db_name:
-        messagebox.showwarning("warning", "please choose a database.")
+        messagebox.showwarning("Warning", "Please choose a database first.")
         return
-
-    conn = connect_db(db_name)
+    conn = acquire_connection(db_name)
     if not conn:
         return
-    cursor = conn.cursor()
-
     start_time = time.time()
-    
-    # --- Speicherung für die nachträgliche SELECT-Abfrage ---
-    post_commit_select_query = None
-    table_name = None
-    query_upper = query.upper().strip() # Sicherstellen, dass die Großschreibung und Stripping korrekt sind
-    
-    # NEU: Der '?' Quantifizierer (non-greedy) wurde entfernt, um den gesamten Tabellennamen zu erfassen
-    table_match = re.search(
-        r"(?:INSERT\s+INTO|UPDATE)\s+`?([\w.]+)`?\s*", 
-        query, 
-        re.IGNORECASE
+    try:
+        schema = get_schema(conn, db_name, refresh=True)
+        column_count = sum(len(columns) for columns in schema["tables"].values())
+        feedback_label.config(
+            text=f"Schema of '{db_name}' reloaded: {len(schema['tables'])} tables, {column_count} columns ({time.time() - start_time:.3f} sec)"
+        )
+    except mysql.connector.Error as err:
+        error_message = str(err)[(str(err).find(';')+2):]
+        show_message_box(f"Error while loading the schema: {error_message}")
+    finally:
+        release_connection(conn)
+
+def sorted_prefix_index(entries):
+    """Sorted (name, kind) entries plus their lower case keys, searched with bisect."""
+    entries = sorted(set(entries), key=lambda entry: (entry[0].lower(), entry[1]))
+    return {"keys": [name.lower() for name, _ in entries], "entries": entries}
+
+def build_completion_index(schema):
+    """Builds the autocomplete indexes of a database from its cached schema."""
+    tables = schema["tables"]
+    words = [(keyword.upper(), "keyword") for keyword in SQL_KEYWORDS]
+    words += [(table_name, "table") for table_name in tables]
+    words += [(column[0], "column") for columns in tables.values() for column in columns]
+    return {
+        "words": sorted_prefix_index(words),
+        "columns": {
+            table_name.lower(): sorted_prefix_index([(column[0], "column") for column in columns])
+            for table_name, columns in tables.items()
+        },
+        "tables": {table_name.lower(): table_name for table_name in tables},
+    }
+
+def lookup_prefix(index, prefix, limit=COMPLETION_LIMIT):
+    """Returns up to limit (name, kind) entries starting with prefix (case-insensitive)."""
+    keys = index["keys"]
+    prefix = prefix.lower()
+    position = bisect.bisect_left(keys, prefix)
+    matches = []
+    while position < len(keys) and len(matches) < limit and keys[position].startswith(prefix):
+        matches.append(index["entries"][position])
+        position += 1
+    return matches
+
+def completion_loader(database):
+    # runs in a background thread, the result is picked up by the next Ctrl+Space
+    try:
+        conn = acquire_connection(database, raise_errors=True)
+        try:
+            index = build_completion_index(get_schema(conn, database))
+        finally:
+            release_connection(conn)
+    except mysql.connector.Error as err:
+        index = {"error": err}
+    with COMPLETION_LOCK:
+        COMPLETION_INDEX[database] = index
+
+def load_completion_index(database):
+    """Starts loading the autocomplete index of a database unless it is loaded or loading already."""
+    if not database:
+        return
+    with COMPLETION_LOCK:
+        if database in COMPLETION_INDEX:
+            return
+        COMPLETION_INDEX[database] = None
+    threading.Thread(target=completion_loader, args=(database,), daemon=True).start()
+
+# FROM/JOIN/UPDATE/INTO table [AS] alias, also the following tables of a comma separated FROM list
+ALIAS_PATTERN = re.compile(r"(?:\bFROM|\bJOIN|\bUPDATE|\bINTO|,)\s+`?([\w$]+)`?(?:\s+(?:AS\s+)?`?([\w$]+)`?)?", re.IGNORECASE)
+COMPLETION_CONTEXT_PATTERN = re.compile(r"(?:`?([\w$]+)`?\.)?`?([\w$]*)$")
+
+def statement_aliases(statement, tables):
+    """Maps the aliases and table names used in a statement (lower case) to the real table names."""
+    aliases = {}
+    for match in ALIAS_PATTERN.finditer(statement):
+        table_name = tables.get(match.group(1).lower())
+        if table_name is None:
+            continue
+        aliases[table_name.lower()] = table_name
+        alias = match.group(2)
+        if alias and alias.lower() not in KEYWORD_SET:
+            aliases[alias.lower()] = table_name
+    return aliases
+
+def completion_candidates(index, text_before, statement):
+    """Returns (prefix, matches) for the word in front of the cursor.
+
+    After "alias." only the columns of the aliased table are suggested, otherwise keywords,
+    tables and columns of the whole database.
+    """
+    match = COMPLETION_CONTEXT_PATTERN.search(text_before)
+    qualifier, prefix = match.group(1), match.group(2)
+    if qualifier:
+        table_name = statement_aliases(statement, index["tables"]).get(qualifier.lower())
+        if table_name is None:
+            return prefix, []
+        return prefix, lookup_prefix(index["columns"][table_name.lower()], prefix)
+    return prefix, lookup_prefix(index["words"], prefix)
+
+def current_completion_context():
+    """Text of the current line up to the cursor and the statement around the cursor."""
+    before = sql_entry.get("1.0", "insert")
+    after = sql_entry.get("insert", "end-1c")
+    statement_start = before.rfind(";") + 1
+    statement_end = after.find(";")
+    statement = before[statement_start:] + (after if statement_end == -1 else after[:statement_end])
+    return before[before.rfind("\n") + 1:], statement
+
+def show_completions(event=None):
+    """Ctrl+Space: completes the word at the cursor, shows a list if there is more than one match."""
+    db_name = selected_db.get()
+    with COMPLETION_LOCK:
+        index = COMPLETION_INDEX.get(db_name)
+    if index is None or "error" in index:
+        if index is not None:
+            with COMPLETION_LOCK:
+                COMPLETION_INDEX.pop(db_name, None) # try again next time
+            feedback_label.config(text=f"Autocomplete: could not load the schema of '{db_name}': {index['error']}")
+        else:
+            feedback_label.config(text="Autocomplete: schema is still loading, only keywords for now")
+        load_completion_index(db_name)
+        index = build_completion_index({"tables": {}})
+
+    line_before, statement = current_completion_context()
+    prefix, matches = completion_candidates(index, line_before, statement)
+    if len(matches) == 1:
+        insert_completion(prefix, matches[0][0])
+        return "break"
+    if not matches:
+        close_completions()
+        return "break"
+    open_completion_popup(prefix, matches)
+    return "break"
+
+def insert_completion(prefix, name):
+    close_completions()
+    if prefix:
+        sql_entry.delete(f"insert - {len(prefix)}c", "insert")
+    sql_entry.insert("insert", name)
+    sql_entry.see("insert")
+
+def open_completion_popup(prefix, matches):
+    global COMPLETION_POPUP
+    if COMPLETION_POPUP is None:
+        window = tk.Toplevel(root)
+        window.overrideredirect(True)
+        listbox = tk.Listbox(window, height=8, width=40, exportselection=False)
+        listbox.pack(expand=True, fill="both")
+        listbox.bind("<ButtonRelease-1>", lambda event: accept_completion())
+        COMPLETION_POPUP = {"window": window, "listbox": listbox}
+    listbox = COMPLETION_POPUP["listbox"]
+    COMPLETION_POPUP["prefix"] = prefix
+    COMPLETION_POPUP["matches"] = matches
+    listbox.delete(0, tk.END)
+    for name, kind in matches:
+        listbox.insert(tk.END, f"{name}  ({kind})")
+    listbox.selection_set(0)
+    listbox.config(height=min(len(matches), 8))
+    bbox = sql_entry.bbox("insert")
+    if bbox:
+        x, y, _, height = bbox
+        COMPLETION_POPUP["window"].geometry(f"+{sql_entry.winfo_rootx() + x}+{sql_entry.winfo_rooty() + y + height}")
+
+def close_completions(event=None):
+    global COMPLETION_POPUP
+    if COMPLETION_POPUP is not None:
+        COMPLETION_POPUP["window"].destroy()
+        COMPLETION_POPUP = None
+
+def close_completions_without_focus():
+    if root.focus_get() is not sql_entry:
+        close_completions()
+
+def accept_completion():
+    listbox = COMPLETION_POPUP["listbox"]
+    selection = listbox.curselection()
+    name = COMPLETION_POPUP["matches"][selection[0] if selection else 0][0]
+    insert_completion(COMPLETION_POPUP["prefix"], name)
+
+def on_completion_key(event):
+    # keys of the editor while the suggestion list is open
+    if COMPLETION_POPUP is None:
+        return None
+    listbox = COMPLETION_POPUP["listbox"]
+    if event.keysym in ("Up", "Down"):
+        selection = listbox.curselection()
+        position = (selection[0] if selection else 0) + (1 if event.keysym == "Down" else -1)
+        position = max(0, min(position, listbox.size() - 1))
+        listbox.selection_clear(0, tk.END)
+        listbox.selection_set(position)
+        listbox.see(position)
+        return "break"
+    if event.keysym in ("Return", "Tab"):
+        accept_completion()
+        return "break"
+    if event.keysym == "Escape":
+        close_completions()
+        return "break" # do not cancel the running query
+    return None
+
+def on_completion_typing(event):
+    # narrows the open suggestion list while typing
+    if COMPLETION_POPUP is None or event.keysym in ("Up", "Down", "Return", "Tab", "Escape", "space"):
+        return
+    if event.char and (event.char.isalnum() or event.char in "_$.") or event.keysym == "BackSpace":
+        show_completions()
+    elif event.char or event.keysym in ("Left", "Right", "Home", "End"):
+        close_completions()
+
+def setup_result_columns(columns):
+    """Clears the result store and configures the treeview for the given result columns."""
+    global VIEW_OFFSET, EDIT_TARGET
+    finish_cell_edit(save=False)
+    remember_previous_result()
+    RESULT_STORE.pop("diff_source", None)
+    EDIT_TARGET = None
+    PENDING_EDITS.clear()
+    update_edit_bar()
+    reset_result_view()
+    filter_column.config(values=list(columns))
+    filter_column.set("")
+    filter_text.set("")
+    RESULT_STORE["columns"] = list(columns)
+    RESULT_STORE["data"] = [[] for _ in columns]
+    RESULT_STORE["rows"] = 0
+    VIEW_OFFSET = 0
+    configure_tree_columns(columns)
+
+def configure_tree_columns(columns, widths=()):
+    """Empties the treeview and sets its columns, headings sort the result on click."""
+    tree.delete(*tree.get_children())
+    tree["columns"] = columns
+    tree["show"] = "headings"
+
+    for index, col in enumerate(columns):
+        tree.heading(col, text=col, command=lambda index=index: sort_result_by(index))
+        tree.column(col, width=widths[index] if index < len(widths) else 100)
+
+def append_result_rows(rows):
+    """Appends fetched row tuples to the column store."""
+    if not rows:
+        return
+    extend_column_store(RESULT_STORE, rows)
+    SORT_CACHE.clear()
+    FILTER_TEXT_CACHE.clear()
+
+def result_row(index):
+    """Returns the row at the given index of the result store as a tuple."""
+    return column_store_row(RESULT_STORE["data"], index)
+
+def iter_result_rows():
+    """Yields the rows shown in the grid as tuples, in display order (sorted/filtered if active)."""
+    if VIEW_ROWS is None:
+        return zip(*RESULT_STORE["data"])
+    return map(result_row, VIEW_ROWS)
+
+def view_row_count():
+    """Rows in the grid after the quick filters."""
+    return RESULT_STORE["rows"] if VIEW_ROWS is None else len(VIEW_ROWS)
+
+def store_row(view_index):
+    """Index in the result store of the row shown at view_index."""
+    return view_index if VIEW_ROWS is None else VIEW_ROWS[view_index]
+
+def reset_result_view():
+    global VIEW_ROWS, SORT_STATE
+    VIEW_ROWS = None
+    SORT_STATE = None
+    COLUMN_FILTERS.clear()
+    SORT_CACHE.clear()
+    FILTER_TEXT_CACHE.clear()
+
+def mixed_sort_key(value):
+    # columns with more than one type (e.g. edited strings in a number column): numbers first, then the rest as text
+    if isinstance(value, (int, float, Decimal)):
+        return (0, float(value), "")
+    if isinstance(value, str):
+        try:
+            return (0, float(value), "")
+        except ValueError:
+            return (1, 0.0, value.casefold())
+    return (1, 0.0, str(value))
+
+def column_sort_order(column_index):
+    """Ascending order of all store rows by one column (NULLs first), built on first use and cached.
+
+    Values are compared as what they are (int, Decimal, date...), not as the text shown in the grid.
+    """
+    order = SORT_CACHE.get(column_index)
+    if order is not None:
+        return order
+    values = RESULT_STORE["data"][column_index]
+    is_null = [value is None for value in values]
+    nulls = list(itertools.compress(range(len(values)), is_null))
+    present = list(itertools.compress(range(len(values)), [not null for null in is_null]))
+    types = set(map(type, values))
+    types.discard(type(None))
+    if types <= {int, float, Decimal, bool} or (len(types) == 1 and not types <= {str}):
+        present.sort(key=values.__getitem__) # homogeneous column, the values compare directly
+    else:
+        key_function = str.casefold if types == {str} else mixed_sort_key
+        keys = [key_function(values[index]) for index in present]
+        present = [index for _, index in sorted(zip(keys, present), key=itemgetter(0))]
+    order = nulls + present
+    SORT_CACHE[column_index] = order
+    return order
+
+def filter_rows(column_index, needle, candidates):
+    """Store rows whose value in the column contains needle (case-insensitive).
+
+    Works on a cached lowercase text copy of the column, the scan itself runs in map/compress.
+    """
+    texts = FILTER_TEXT_CACHE.get(column_index)
+    if texts is None:
+        texts = list(map(str.casefold, map(str, RESULT_STORE["data"][column_index])))
+        FILTER_TEXT_CACHE[column_index] = texts
+    if candidates is None:
+        return list(itertools.compress(range(len(texts)), map(str.__contains__, texts, itertools.repeat(needle))))
+    return list(itertools.compress(candidates, map(str.__contains__, map(texts.__getitem__, candidates), itertools.repeat(needle))))
+
+def apply_result_view():
+    """Recomputes the shown rows from the quick filters and the sort column, without the database."""
+    global VIEW_ROWS, VIEW_OFFSET
+    start_time = time.perf_counter()
+    finish_cell_edit(save=True) # the entry sits on a recycled item
+    rows = None
+    for column_index, needle in COLUMN_FILTERS.items():
+        rows = filter_rows(column_index, needle, rows)
+    if SORT_STATE is not None:
+        column_index, descending = SORT_STATE
+        order = column_sort_order(column_index)
+        if descending:
+            order = order[::-1]
+        if rows is not None:
+            keep = bytearray(RESULT_STORE["rows"])
+            for index in rows:
+                keep[index] = 1
+            order = list(itertools.compress(order, map(keep.__getitem__, order)))
+        rows = order
+    VIEW_ROWS = rows
+    VIEW_OFFSET = 0
+    tree.selection_remove(tree.selection())
+    update_sort_headings()
+    refresh_result_view()
+    return time.perf_counter() - start_time
+
+def update_sort_headings():
+    for index, column in enumerate(RESULT_STORE["columns"]):
+        arrow = ""
+        if SORT_STATE is not None and SORT_STATE[0] == index:
+            arrow = " ▼" if SORT_STATE[1] else " ▲"
+        tree.heading(column, text=column + arrow + (" *" if index in COLUMN_FILTERS else ""))
+
+def result_view_available():
+    """Sort and filter need the complete result set in the store."""
+    if PAGED_RESULT is not None:
+        feedback_label.config(text="Paged results are sorted by the server, turn off \"Paged results\" to sort or filter here.")
+        return False
+    if ACTIVE_QUERY is not None:
+        feedback_label.config(text="Still loading rows, sort and filter work once the result is complete.")
+        return False
+    return bool(RESULT_STORE["columns"])
+
+def sort_result_by(column_index):
+    """Header click: sorts the loaded rows by the column, a second click reverses the order."""
+    global SORT_STATE
+    if not result_view_available():
+        return
+    descending = SORT_STATE is not None and SORT_STATE[0] == column_index and not SORT_STATE[1]
+    SORT_STATE = (column_index, descending)
+    duration = apply_result_view()
+    direction = "descending" if descending else "ascending"
+    feedback_label.config(
+        text=f"{view_row_count()} rows sorted by {RESULT_STORE['columns'][column_index]} {direction} ({duration:.3f} sec, client-side)"
     )
 
-    if table_match:
-        # Extrahiere nur den Tabellennamen (den letzten Teil, falls Schema-Präfix vorhanden)
-        table_name = table_match.group(1).split('.')[-1]
-    # --------------------------------------------------------
+def on_filter_column_selected(event=None):
+    column = filter_column.get()
+    if column in RESULT_STORE["columns"]:
+        filter_text.set(COLUMN_FILTERS.get(RESULT_STORE["columns"].index(column), ""))
+        filter_entry.focus_set()
+
+def schedule_filter(*args):
+    global FILTER_AFTER_ID
+    if FILTER_AFTER_ID is not None:
+        root.after_cancel(FILTER_AFTER_ID)
+    FILTER_AFTER_ID = root.after(FILTER_DEBOUNCE_MS, apply_quick_filter)
+
+def apply_quick_filter():
+    global FILTER_AFTER_ID
+    FILTER_AFTER_ID = None
+    column = filter_column.get()
+    if column not in RESULT_STORE["columns"]:
+        return
+    column_index = RESULT_STORE["columns"].index(column)
+    needle = filter_text.get().casefold()
+    if needle == COLUMN_FILTERS.get(column_index, ""):
+        return
+    if not result_view_available():
+        return
+    if needle:
+        COLUMN_FILTERS[column_index] = needle
+    else:
+        COLUMN_FILTERS.pop(column_index, None)
+    duration = apply_result_view()
+    feedback_label.config(
+        text=f"{view_row_count()} of {RESULT_STORE['rows']} rows match the filters ({duration:.3f} sec, client-side)"
+    )
+
+def clear_quick_filters():
+    if not COLUMN_FILTERS:
+        return
+    COLUMN_FILTERS.clear()
+    filter_text.set("")
+    duration = apply_result_view()
+    feedback_label.config(text=f"Filters cleared, {view_row_count()} rows ({duration:.3f} sec)")
+
+def filter_by_cell(event):
+    """Context menu: quick filter on the value of the clicked cell."""
+    item_id = tree.identify_row(event.y)
+    column_id = tree.identify_column(event.x)
+    if not item_id or not column_id:
+        return
+    column_index = int(column_id.replace('#', '')) - 1
+    filter_column.set(RESULT_STORE["columns"][column_index])
+    filter_text.set(str(RESULT_STORE["data"][column_index][store_row(VIEW_OFFSET + tree.index(item_id))]))
 
+def remember_previous_result():
+    """Keeps the result that is about to be replaced for "Compare with previous result".
+
+    Big results are written to a temp file in the background, so two of them are not kept in memory.
+    """
+    global PREVIOUS_RESULT
+    if not RESULT_STORE["rows"]:
+        return
+    snapshot = RESULT_STORE.get("diff_source") or {
+        "columns": list(RESULT_STORE["columns"]), "data": RESULT_STORE["data"], "rows": RESULT_STORE["rows"], "path": None,
+    }
+    if snapshot is PREVIOUS_RESULT:
+        return
+    drop_snapshot(PREVIOUS_RESULT)
+    PREVIOUS_RESULT = snapshot
+    if estimate_result_size(snapshot["data"], snapshot["rows"]) > DIFF_SNAPSHOT_MAX_MB * 1024 * 1024:
+        threading.Thread(target=spill_snapshot, args=(snapshot,), daemon=True).start()
+
+def spill_snapshot(snapshot):
+    # runs in a background thread, the rows stay readable from "data" until the file is complete.
+    # the file belongs to this thread until it is published in "path", a snapshot dropped meanwhile
+    # is cleaned up here, so each file is removed exactly once
+    data = snapshot["data"]
+    path = None
     try:
-        cursor.execute(query)
-        duration = time.time() - start_time
-        
-        # --- Add to History only upon successful execution ---
-        add_query_to_history(query)
-        # ----------------------------------------------------
+        with tempfile.NamedTemporaryFile(prefix="sqlgui_result_", suffix=".pickle", delete=False) as f:
+            path = f.name
+            rows = zip(*data)
+            batch = list(itertools.islice(rows, DIFF_SPILL_BATCH_ROWS))
+            while batch:
+                pickle.dump(batch, f, pickle.HIGHEST_PROTOCOL)
+                batch = list(itertools.islice(rows, DIFF_SPILL_BATCH_ROWS))
+    except OSError:
+        dropped = True # disk full or similar, the snapshot just stays in memory
+    else:
+        with SNAPSHOT_LOCK:
+            dropped = snapshot.get("dropped", False)
+            if not dropped:
+                snapshot["path"] = path
+                snapshot["data"] = None
+    if dropped and path:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def drop_snapshot(snapshot):
+    if snapshot is None:
+        return
+    with SNAPSHOT_LOCK:
+        snapshot["dropped"] = True
+        path, snapshot["path"] = snapshot["path"], None
+    if path:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def iter_snapshot_rows(snapshot):
+    data = snapshot["data"]
+    if data is not None:
+        yield from zip(*data)
+        return
+    with open(snapshot["path"], "rb") as f:
+        while True:
+            try:
+                batch = pickle.load(f)
+            except EOFError:
+                return
+            yield from batch
+
+def hashable_getter(indexes):
+    """itemgetter for diff keys and row hashes. BINARY/BLOB values come as bytearray, which cannot be hashed,
+    they are compared as bytes."""
+    getter = itemgetter(*indexes)
+    if len(indexes) == 1:
+        def get(row):
+            value = getter(row)
+            return bytes(value) if isinstance(value, bytearray) else value
+    else:
+        def get(row):
+            values = getter(row)
+            if bytearray in map(type, values): # checked in C, rows without binary values stay as they are
+                return tuple(bytes(value) if isinstance(value, bytearray) else value for value in values)
+            return values
+    return get
+
+def diff_partitions(rows, key_getter, value_getter, partitions, directory, side):
+    """Writes (key, row hash, row index) of every row into one temp file per hash partition of the key."""
+    files = [open(os.path.join(directory, f"{side}_{number}.pickle"), "wb") for number in range(partitions)]
+    buffers = [[] for _ in range(partitions)]
+    try:
+        for index, row in enumerate(rows):
+            key = key_getter(row)
+            buffer = buffers[hash(key) % partitions]
+            buffer.append((key, hash(value_getter(row)), index))
+            if len(buffer) >= DIFF_SPILL_BATCH_ROWS:
+                pickle.dump(buffer, files[hash(key) % partitions], pickle.HIGHEST_PROTOCOL)
+                buffer.clear()
+        for buffer, f in zip(buffers, files):
+            if buffer:
+                pickle.dump(buffer, f, pickle.HIGHEST_PROTOCOL)
+    finally:
+        for f in files:
+            f.close()
+    return [f.name for f in files]
+
+def iter_partition(path):
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield from pickle.load(f)
+            except EOFError:
+                return
+
+def hash_join_diff(previous_entries, current_entries, statuses, removed, stats):
+    """Joins one partition: previous side into a dict, current side probes it.
+
+    statuses[current index] becomes 1 (added) or 2 (changed), unmatched previous rows go to removed.
+    """
+    table = {}
+    for key, row_hash, index in previous_entries:
+        if key in table:
+            stats["duplicates"] += 1
+            continue
+        table[key] = (row_hash, index)
+    for key, row_hash, index in current_entries:
+        entry = table.pop(key, None)
+        if entry is None:
+            statuses[index] = 1
+        elif entry[0] != row_hash:
+            statuses[index] = 2
+    removed.extend(index for _, index in table.values())
+
+def diff_worker(job):
+    # runs in a background thread, poll_diff reads the job dict
+    try:
+        previous, current = job["previous"], job["current"]
+        key_getter = hashable_getter([previous["columns"].index(column) for column in job["key_columns"]])
+        current_key_getter = hashable_getter([current["columns"].index(column) for column in job["key_columns"]])
+        value_getter = hashable_getter([previous["columns"].index(column) for column in job["common_columns"]])
+        current_value_getter = hashable_getter([current["columns"].index(column) for column in job["common_columns"]])
+        statuses = bytearray(current["rows"])
+        removed = []
+        stats = {"duplicates": 0}
+        partitions = max(1, -(-max(previous["rows"], current["rows"]) // DIFF_PARTITION_ROWS))
+        job["partitions"] = partitions
+
+        if partitions == 1:
+            hash_join_diff(
+                ((key_getter(row), hash(value_getter(row)), index) for index, row in enumerate(iter_snapshot_rows(previous))),
+                ((current_key_getter(row), hash(current_value_getter(row)), index) for index, row in enumerate(zip(*current["data"]))),
+                statuses, removed, stats
+            )
+        else:
+            # grace hash join: both sides are split by key hash into temp files, one partition is in memory at a time
+            with tempfile.TemporaryDirectory(prefix="sqlgui_diff_") as directory:
+                previous_files = diff_partitions(iter_snapshot_rows(previous), key_getter, value_getter, partitions, directory, "previous")
+                current_files = diff_partitions(zip(*current["data"]), current_key_getter, current_value_getter, partitions, directory, "current")
+                for previous_file, current_file in zip(previous_files, current_files):
+                    hash_join_diff(iter_partition(previous_file), iter_partition(current_file), statuses, removed, stats)
+
+        # contents of the removed rows, only the first DIFF_MAX_REMOVED_ROWS are shown
+        removed.sort()
+        shown = set(removed[:DIFF_MAX_REMOVED_ROWS])
+        job["removed_rows"] = [row for index, row in enumerate(iter_snapshot_rows(previous)) if index in shown]
+        job["removed"] = len(removed)
+        job["statuses"] = statuses
+        job["duplicates"] = stats["duplicates"]
+    except (OSError, TypeError, pickle.PickleError) as err:
+        job["error"] = err
+    finally:
+        job["duration"] = time.time() - job["start"]
+        job["finished"] = True
 
-        if cursor.description:  # SELECT-like queries (Data Retrieval)
-            rows = cursor.fetchall()
-            columns = [desc[0] for desc in cursor.description]
+def compare_with_previous():
+    """Diffs the result in the grid against the result shown before it, matched on a key column."""
+    if ACTIVE_QUERY is not None or RESULT_STORE.get("diff_source"):
+        feedback_label.config(text="Compare needs a complete result in the grid (run the query again first).")
+        return
+    if PREVIOUS_RESULT is None or not RESULT_STORE["columns"]:
+        messagebox.showinfo("Compare", "There is no previous result to compare with, run the query twice.")
+        return
+    columns = RESULT_STORE["columns"]
+    common_columns = [column for column in columns if column in PREVIOUS_RESULT["columns"]]
+    default_key = EDIT_TARGET["pk_columns"] if EDIT_TARGET else common_columns[:1]
+    answer = simpledialog.askstring(
+        "Compare with previous result", "Key column(s), comma separated:", initialvalue=", ".join(default_key)
+    )
+    if not answer:
+        return
+    key_columns = [column.strip().strip("`") for column in answer.split(",") if column.strip()]
+    missing = [column for column in key_columns if column not in common_columns]
+    if missing:
+        show_message_box(f"Key column(s) not in both results: {', '.join(missing)}")
+        return
 
-            # Clear and configure treeview
-            tree.delete(*tree.get_children())
-            tree["columns"] = columns
-            tree["show"] = "headings"
+    finish_cell_edit(save=True)
+    current = {"columns": list(columns), "data": RESULT_STORE["data"], "rows": RESULT_STORE["rows"], "path": None}
+    job = {
+        "previous": PREVIOUS_RESULT,
+        "current": current,
+        "key_columns": key_columns,
+        "common_columns": common_columns,
+        "session": ACTIVE_SESSION,
+        "start": time.time(),
+        "finished": False,
+    }
+    btn_compare.config(state=tk.DISABLED)
+    feedback_label.config(text=f"Comparing {current['rows']} rows with {PREVIOUS_RESULT['rows']} previous rows...")
+    threading.Thread(target=diff_worker, args=(job,), daemon=True).start()
+    root.after(100, poll_diff, job)
+
+def poll_diff(job):
+    if not job["finished"]:
+        root.after(100, poll_diff, job)
+        return
+    btn_compare.config(state=tk.NORMAL)
+    if wait_for_tab(job["session"], poll_diff, job):
+        return
+    if RESULT_STORE["data"] is not job["current"]["data"]:
+        return # another result replaced the compared one meanwhile
+    if "error" in job:
+        feedback_label.config(text="")
+        show_message_box(f"Compare failed: {job['error']}")
+        return
 
-            for col in columns:
-                tree.heading(col, text=col) 
-                tree.column(col, width=100)
+    # diff view: "diff" column in front (+ added, ~ changed, - removed), removed rows are appended at the end
+    current = job["current"]
+    previous_columns = job["previous"]["columns"]
+    removed_rows = job["removed_rows"]
+    symbols = ("", "+", "~")
+    data = [[symbols[status] for status in job["statuses"]] + ["-"] * len(removed_rows)]
+    for column, values in zip(current["columns"], current["data"]):
+        if column in previous_columns:
+            position = previous_columns.index(column)
+            data.append(values + [row[position] for row in removed_rows])
+        else:
+            data.append(values + [None] * len(removed_rows))
+    RESULT_STORE["diff_source"] = current # the compared result becomes the previous one, not the diff view
+    setup_result_columns(["diff"] + current["columns"])
+    RESULT_STORE["data"] = data
+    RESULT_STORE["rows"] = current["rows"] + len(removed_rows)
+    RESULT_STORE["diff_source"] = current
+    refresh_result_view()
+
+    added = job["statuses"].count(1)
+    changed = job["statuses"].count(2)
+    unchanged = current["rows"] - added - changed
+    notes = []
+    if job["removed"] > len(removed_rows):
+        notes.append(f"first {len(removed_rows)} removed rows shown")
+    if job["duplicates"]:
+        notes.append(f"{job['duplicates']} duplicate keys in the previous result ignored")
+    if job["partitions"] > 1:
+        notes.append(f"spilled to {job['partitions']} temp partitions")
+    only_previous = [column for column in previous_columns if column not in current["columns"]]
+    if only_previous:
+        notes.append(f"columns only in previous: {', '.join(only_previous)}")
+    feedback_label.config(
+        text=f"Diff on {', '.join(job['key_columns'])}: +{added} added, -{job['removed']} removed, ~{changed} changed, "
+             f"{unchanged} unchanged ({job['duration']:.3f} sec{'; ' + '; '.join(notes) if notes else ''})"
+    )
 
-            for row in rows:
-                tree.insert("", "end", values=row)
+def visible_row_capacity():
+    """Number of rows that fit into the tree at its current height."""
+    items = tree.get_children()
+    bbox = tree.bbox(items[0]) if items else None
+    if bbox:
+        header_height, row_height = bbox[1], bbox[3]
+    else:
+        header_height, row_height = DEFAULT_ROW_HEIGHT + 5, DEFAULT_ROW_HEIGHT
+    return max(1, (tree.winfo_height() - header_height) // row_height)
+
+def refresh_result_view():
+    """Fills the recycled tree items with the rows of the current window and updates the scrollbar."""
+    global VIEW_OFFSET
+    total = view_row_count()
+    VIEW_OFFSET, wanted = clamp_view_window(VIEW_OFFSET, visible_row_capacity(), total)
+
+    items = list(tree.get_children())
+    if len(items) > wanted:
+        tree.delete(*items[wanted:])
+        items = items[:wanted]
+
+    for position in range(wanted):
+        row_index = store_row(VIEW_OFFSET + position)
+        values = result_row(row_index)
+        tags = DIFF_TAGS.get(values[0], ()) if "diff_source" in RESULT_STORE else ()
+        if PENDING_EDITS:
+            edits = PENDING_EDITS.get(result_row_key(row_index))
+            if edits:
+                values = tuple(edits.get(index, value) for index, value in enumerate(values))
+                tags = ("edited",)
+        if position < len(items):
+            tree.item(items[position], values=values, tags=tags)
+        else:
+            tree.insert("", "end", values=values, tags=tags)
 
-            feedback_label.config(
-                text=f"{len(rows)} rows in set ({duration:.3f} sec)"
-            )
-        else:  # INSERT, UPDATE, DELETE, DDL (Data Modification/Definition)
-            conn.commit()
-            
-            # --- NEUE LOGIK FÜR POST-COMMIT-SELECT START ---
-            
-            if table_name and query_upper.startswith("INSERT INTO"):
-                last_id_of_first_row = cursor.lastrowid # Dies ist die ID der ersten eingefügten Zeile
-                num_rows_inserted = cursor.rowcount     # Anzahl aller eingefügten Zeilen
-                
-                # Prerequisite: get_primary_key_column needs the existing connection before closing it
-                pk_column = get_primary_key_column(conn, table_name) 
-
-                if last_id_of_first_row and pk_column and num_rows_inserted > 1:
-                    # FALL A: MEHRERE DATENSÄTZE
-                    # Selektiere alle IDs im Bereich [Start-ID] bis [Start-ID + Anzahl - 1]
-                    end_id = last_id_of_first_row + num_rows_inserted - 1
-                    post_commit_select_query = (
-                        f"SELECT * FROM `{table_name}` "
-                        f"WHERE {pk_column} BETWEEN {last_id_of_first_row} AND {end_id} "
-                        f"ORDER BY {pk_column} ASC"
-                    )
-                elif last_id_of_first_row and pk_column and num_rows_inserted == 1:
-                    # FALL B: EIN EINZELNER DATENSATZ
-                    post_commit_select_query = f"SELECT * FROM `{table_name}` WHERE {pk_column} = {last_id_of_first_row}"
-                elif table_name:
-                    # FALL C: Fallback (z.B. kein AUTO_INCREMENT oder PK unbekannt). 
-                    # Zeige die neuesten Einträge basierend auf der Anzahl der eingefügten Zeilen.
-                    # Wir nutzen hier ORDER BY 1 DESC, was annimmt, dass die erste Spalte (meist ID) absteigend sortiert wird.
-                    post_commit_select_query = f"SELECT * FROM `{table_name}` ORDER BY 1 DESC LIMIT {num_rows_inserted}"    
-                    
-            elif table_name and query_upper.startswith("UPDATE"):
-                # 2. Extrahiere die WHERE-Klausel (komplex und anfällig, daher nur rudimentär)
-                match_where = re.search(r"WHERE\s+(.+?)(?: LIMIT |;|$)", query, re.IGNORECASE | re.DOTALL)
-                
-                if match_where:
-                    where_clause = match_where.group(1).strip()
-                    post_commit_select_query = f"SELECT * FROM `{table_name}` WHERE {where_clause}"
-                else:
-                    # Fallback: Zeige die ersten 10 Zeilen der Tabelle
-                    post_commit_select_query = f"SELECT * FROM `{table_name}` LIMIT 10"
-
-            # Führe die nachträgliche SELECT-Abfrage aus
-            if post_commit_select_query:
-                
-                # Schließe den aktuellen Cursor/Verbindung, da wir eine neue Verbindung für den SELECT brauchen
-                cursor.close() 
-                conn.close()
-                
-                # NEUE VERBINDUNG FÜR DEN NACHTRÄGLICHEN SELECT
-                conn = connect_db(db_name)
-                if not conn:
-                    return # Verbindung fehlgeschlagen
-                cursor = conn.cursor()
-                
+    if total:
+        tree_scroll.set(VIEW_OFFSET / total, (VIEW_OFFSET + wanted) / total)
+    else:
+        tree_scroll.set(0, 1)
+
+    if PAGED_RESULT is not None and total:
+        update_paging_label(VIEW_OFFSET + 1, VIEW_OFFSET + wanted)
+        if VIEW_OFFSET + wanted >= total - PAGE_PREFETCH_ROWS:
+            fetch_next_page()
+
+def scroll_result_view_to(offset):
+    """Moves the visible window to start at the given row index."""
+    global VIEW_OFFSET
+    if offset == VIEW_OFFSET:
+        return
+    VIEW_OFFSET = offset
+    finish_cell_edit(save=True) # the entry sits on a recycled item
+    # selection belongs to the recycled items, not to the rows, so it would wander along
+    tree.selection_remove(tree.selection())
+    refresh_result_view()
+
+def on_tree_scrollbar(*args):
+    """Scrollbar command: translates moveto/scroll requests into a new row offset."""
+    capacity = visible_row_capacity()
+    if args[0] == "moveto":
+        offset = int(float(args[1]) * view_row_count())
+    elif args[2] == "pages":
+        offset = VIEW_OFFSET + int(args[1]) * capacity
+    else:
+        offset = VIEW_OFFSET + int(args[1])
+    scroll_result_view_to(max(0, min(offset, view_row_count() - capacity)))
+
+def on_tree_mousewheel(event):
+    if event.num == 4 or event.delta > 0:
+        on_tree_scrollbar("scroll", -3, "units")
+    else:
+        on_tree_scrollbar("scroll", 3, "units")
+    return "break"
+
+def on_tree_key(event):
+    """Scrolls the window when the keyboard focus would leave the visible rows."""
+    items = tree.get_children()
+    if not items:
+        return None
+    focus = tree.focus()
+    if event.keysym == "Next":
+        on_tree_scrollbar("scroll", 1, "pages")
+    elif event.keysym == "Prior":
+        on_tree_scrollbar("scroll", -1, "pages")
+    elif event.keysym == "Down" and focus == items[-1]:
+        on_tree_scrollbar("scroll", 1, "units")
+    elif event.keysym == "Up" and focus == items[0]:
+        on_tree_scrollbar("scroll", -1, "units")
+    else:
+        return None # let the tree move the focus inside the window
+    if focus:
+        tree.selection_set(focus)
+    return "break"
+
+def cancel_result_stream():
+    """Stops the background loader of the previous result set, if any."""
+    global ACTIVE_QUERY
+    if ACTIVE_QUERY is not None:
+        ACTIVE_QUERY["stop"].set()
+        ACTIVE_QUERY = None
+
+INSERT_TARGET_PATTERN = re.compile(
+    r"\s*INSERT\s+(?:IGNORE\s+)?INTO\s+((?:`[^`]+`|\w+)(?:\s*\.\s*(?:`[^`]+`|\w+))?)", re.IGNORECASE
+)
+INSERT_VALUES_PATTERN = re.compile(r"\s*(?:\([^)]*\)\s*)?(?:VALUES?|SET)\b", re.IGNORECASE)
+ON_DUPLICATE_PATTERN = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.IGNORECASE)
+
+def split_table_name(table_sql):
+    """`db`.`table` / db.table / table -> (database or None, table)."""
+    parts = [
+        quoted.replace("``", "`") if quoted else plain
+        for quoted, plain in re.findall(r"`((?:[^`]|``)*)`|([\w$]+)", table_sql)
+    ]
+    return (parts[0], parts[-1]) if len(parts) == 2 else (None, parts[-1])
+
+def parse_update_target(statement):
+    """Table part and WHERE/ORDER BY/LIMIT tail of a single-table UPDATE, None for anything else (joins, ...)."""
+    tokens = tokenize_sql(statement)
+    offsets = []
+    position = 0
+    for _, value in tokens:
+        offsets.append(position)
+        position += len(value)
+    significant = [index for index, (kind, _) in enumerate(tokens) if kind not in ("space", "comment")]
+    if not significant or tokens[significant[0]][1].upper() != "UPDATE":
+        return None
+
+    cursor_index = 1
+    while cursor_index < len(significant) and tokens[significant[cursor_index]][1].upper() in ("LOW_PRIORITY", "IGNORE"):
+        cursor_index += 1
+    table_start = cursor_index
+    while cursor_index < len(significant) and tokens[significant[cursor_index]][1].upper() != "SET":
+        cursor_index += 1
+    table_part = [tokens[index] for index in significant[table_start:cursor_index]]
+    if cursor_index == len(significant) or not table_part:
+        return None
+    if any(value in (",", "(") for kind, value in table_part if kind == "op") or \
+            any(value.upper() == "JOIN" for kind, value in table_part if kind == "word"):
+        return None # multi-table UPDATE
+
+    name_length = 3 if len(table_part) >= 3 and table_part[1] == ("op", ".") else 1
+    alias_part = table_part[name_length:]
+    if alias_part and alias_part[0][1].upper() == "AS":
+        alias_part = alias_part[1:]
+    if len(alias_part) > 1:
+        return None
+    first = significant[table_start]
+    name_end = significant[table_start + name_length - 1]
+    table_sql = statement[offsets[first]:offsets[name_end] + len(tokens[name_end][1])]
+    database, table = split_table_name(table_sql)
+
+    # assigned columns and WHERE / ORDER BY / LIMIT of the UPDATE itself (depth 0, subqueries do not count)
+    tail = ""
+    has_limit = False
+    set_columns = set()
+    depth = 0
+    previous = None
+    for index in significant[cursor_index + 1:]:
+        kind, value = tokens[index]
+        if kind == "op" and value == "(":
+            depth += 1
+        elif kind == "op" and value == ")":
+            depth -= 1
+        elif kind == "op" and value == "=" and depth == 0 and not tail and previous is not None:
+            set_columns.add(split_table_name(previous[1])[1].lower())
+        elif kind == "word" and depth == 0 and value.upper() in ("WHERE", "ORDER", "LIMIT"):
+            if not tail:
+                tail = statement[offsets[index]:].strip()
+            has_limit = has_limit or value.upper() == "LIMIT"
+        previous = tokens[index]
+    return {
+        "database": database,
+        "table": table,
+        "table_sql": table_sql,
+        "table_ref": statement[offsets[first]:offsets[significant[cursor_index - 1]] + len(tokens[significant[cursor_index - 1]][1])],
+        "qualifier": alias_part[0][1] if alias_part else table_sql,
+        "tail": tail,
+        "has_limit": has_limit,
+        "set_columns": set_columns,
+    }
+
+def plan_auto_select(conn, statement, database):
+    """How the rows written by an INSERT/UPDATE are shown afterwards, None if they are not.
+
+    Needs the primary key (from the schema cache), the rows are always read back by key.
+    """
+    insert_match = INSERT_TARGET_PATTERN.match(statement)
+    if insert_match:
+        rest = statement[insert_match.end():]
+        if not INSERT_VALUES_PATTERN.match(rest) or ON_DUPLICATE_PATTERN.search(rest):
+            # INSERT ... SELECT may get gaps in its AUTO_INCREMENT values (innodb_autoinc_lock_mode=2),
+            # an upsert updates existing rows, in both cases lastrowid does not tell which rows were written
+            return None
+        target = {"kind": "insert", "table_sql": insert_match.group(1)}
+        target["database"], target["table"] = split_table_name(target["table_sql"])
+    else:
+        target = parse_update_target(statement)
+        if target is None:
+            return None
+        target["kind"] = "update"
+    target["pk_columns"] = get_primary_key_columns(conn, target["table"], target["database"] or database)
+    if target["kind"] == "update" and {column.lower() for column in target["pk_columns"]} & target["set_columns"]:
+        return None # the UPDATE changes the key itself, the captured keys would not find the rows again
+    if target["kind"] == "insert" and len(target["pk_columns"]) != 1:
+        return None # inserted rows are only found by their AUTO_INCREMENT key
+    return target if target["pk_columns"] else None
+
+def quoted_column_list(columns):
+    return ", ".join(f"`{column}`" for column in columns)
+
+def capture_update_keys(conn, target):
+    """Locks and remembers the primary keys the UPDATE is going to change (before it runs, same transaction).
+
+    Rows that no longer match after the write (the UPDATE changed a WHERE column) are still found by key.
+    """
+    keys = ", ".join(f"{target['qualifier']}.`{column}`" for column in target["pk_columns"])
+    capture_sql = f"SELECT {keys} FROM {target['table_ref']}"
+    if target["tail"]:
+        capture_sql += " " + target["tail"]
+    if not target["has_limit"]:
+        capture_sql += f" LIMIT {AUTO_SELECT_LIMIT}"
+    cursor = conn.cursor()
+    try:
+        cursor.execute(capture_sql + " FOR UPDATE")
+        target["keys"] = cursor.fetchall()
+    finally:
+        cursor.close()
+
+def run_auto_select(conn, cursor, target, result):
+    """Reads the written rows back by primary key inside the still open transaction."""
+    pk_columns = target["pk_columns"]
+    order_by = quoted_column_list(pk_columns)
+    if target["kind"] == "update":
+        keys = target.get("keys")
+        if not keys:
+            return
+        if len(pk_columns) == 1:
+            condition = f"`{pk_columns[0]}` IN ({', '.join(['%s'] * len(keys))})"
+            params = [key[0] for key in keys]
+        else:
+            placeholder = "(" + ", ".join(["%s"] * len(pk_columns)) + ")"
+            condition = f"({order_by}) IN ({', '.join([placeholder] * len(keys))})"
+            params = [value for key in keys for value in key]
+        select_sql = f"SELECT * FROM {target['table_sql']} WHERE {condition} ORDER BY {order_by}"
+        result["select_truncated"] = not target["has_limit"] and len(keys) >= AUTO_SELECT_LIMIT
+    else:
+        row_count = cursor.rowcount
+        if row_count is None or row_count <= 0:
+            return
+        if not cursor.lastrowid:
+            # kein AUTO_INCREMENT oder explizite Schlüssel: die höchsten Schlüssel wären geraten, also nichts zeigen
+            result["select_skipped"] = "no AUTO_INCREMENT id to find the inserted rows by"
+            return
+        shown = min(row_count, AUTO_SELECT_LIMIT)
+        result["select_truncated"] = row_count > AUTO_SELECT_LIMIT
+        params = None
+        # lastrowid ist die ID der ersten eingefügten Zeile, bei INSERT ... VALUES folgen die weiteren lückenlos
+        select_sql = (
+            f"SELECT * FROM {target['table_sql']} "
+            f"WHERE `{pk_columns[0]}` BETWEEN {int(cursor.lastrowid)} AND {int(cursor.lastrowid) + shown - 1} "
+            f"ORDER BY {order_by}"
+        )
+
+    select_cursor = conn.cursor()
+    try:
+        select_start_time = time.time()
+        select_cursor.execute(select_sql, params)
+        result["select_rows"] = select_cursor.fetchall()
+        result["select_columns"] = [desc[0] for desc in select_cursor.description]
+        result["select_duration"] = time.time() - select_start_time
+    finally:
+        select_cursor.close()
+
+def stream_result_set(job, cursor, conn=None, transaction_conn=None):
+    """Sends the columns and rows of the cursor to the gui in batches (worker thread).
+
+    The transaction of transaction_conn is committed once the result set is read, before that
+    the connection refuses to commit.
+    """
+    messages = job["queue"]
+    phases = job["profile"]["phases"]
+    with job["lock"]:
+        job["connection_id"] = None # nothing left to KILL, cancelling only stops the fetch
+    messages.put(("columns", [desc[0] for desc in cursor.description]))
+    fetch_start_time = time.time()
+    batch = cursor.fetchmany(INITIAL_ROWS)
+    phases["fetch"] += time.time() - fetch_start_time
+    while batch:
+        messages.put(("rows", batch))
+        if job["stop"].is_set():
+            break
+        fetch_start_time = time.time()
+        batch = cursor.fetchmany(FETCH_BATCH_SIZE)
+        phases["fetch"] += time.time() - fetch_start_time
+    if job["profile"]["server"] and conn is not None and not batch:
+        finish_server_profile(conn, job["profile"]) # only possible once all rows are read
+    if transaction_conn is not None:
+        if batch:
+            transaction_conn.consume_results() # loading was stopped, the rest is dropped unread
+        transaction_conn.commit()
+    messages.put(("done",))
+
+def run_script(job, conn, cursor, statements):
+    """Runs several statements on one connection and logs duration and row count of each (worker thread).
+
+    Result sets of intermediate statements are only counted, the one of the last statement is streamed
+    into the grid. With job["transaction"] the whole script is committed or rolled back as one unit,
+    inside a transaction the tab has opened itself it just becomes part of that one.
+    """
+    messages = job["queue"]
+    script_start_time = time.time()
+    affected_rows = 0
+    own_transaction = job["transaction"] and not conn.in_transaction
+    if own_transaction:
+        conn.start_transaction()
+        job["own_transaction"] = True
+
+    for index, statement in enumerate(statements, start=1):
+        if job["stop"].is_set():
+            raise mysql.connector.Error(msg="Query execution was interrupted", errno=QUERY_INTERRUPTED_ERRNO)
+        start_time = time.time()
+        try:
+            cursor.execute(statement)
+            track_use_statement(conn, statement)
+            is_last = index == len(statements)
+            if cursor.description and is_last:
+                job["duration"] = time.time() - script_start_time
+                messages.put(("statement", index, statement_summary(statement), time.time() - start_time, "result set below"))
+                stream_result_set(job, cursor, transaction_conn=conn if own_transaction else None)
+                return
+            if cursor.description:
+                # intermediate result set: read it to free the connection, but do not keep it
+                row_count = 0
+                batch = cursor.fetchmany(FETCH_BATCH_SIZE)
+                while batch:
+                    row_count += len(batch)
+                    batch = cursor.fetchmany(FETCH_BATCH_SIZE)
+                outcome = f"{row_count} rows in set (discarded)"
+            else:
+                affected_rows += max(cursor.rowcount, 0)
+                outcome = f"{cursor.rowcount} rows affected"
+                if is_ddl_statement(statement):
+                    invalidate_schema()
+                invalidate_result_cache(statement)
+                track_transaction_writes(job["session"], conn, statement)
+            messages.put(("statement", index, statement_summary(statement), time.time() - start_time, outcome))
+        except mysql.connector.Error:
+            messages.put(("statement", index, statement_summary(statement), time.time() - start_time, "FAILED"))
+            if own_transaction:
+                conn.rollback()
+            raise
+
+    if own_transaction:
+        conn.commit()
+    job["duration"] = time.time() - script_start_time
+    messages.put(("script_done", {"statements": len(statements), "affected_rows": affected_rows}))
+
+def take_tab_connection(session, database):
+    """The connection the tab kept from its last query, a pooled one if it has none (worker thread).
+
+    Keeping it per tab lets session variables, temporary tables and a transaction the user opened
+    (START TRANSACTION) survive between the queries of the tab, while the tabs still run in parallel
+    on different connections.
+    """
+    with session["lock"]:
+        kept, session["connection"] = session["connection"], None
+    if kept is not None:
+        conn, last_used = kept
+        try:
+            if time.time() - last_used > engine.POOL_PING_AFTER:
+                conn.ping()
+            if engine.CONNECTION_DATABASES.get(conn) != database:
+                conn.cmd_init_db(database)
+                engine.CONNECTION_DATABASES[conn] = database
+            return conn
+        except mysql.connector.Error:
+            release_connection(conn) # dead, release_connection closes it
+    return acquire_connection(database, raise_errors=True)
+
+def return_tab_connection(session, conn, cursor):
+    """Keeps the connection for the next query of the tab, an open transaction stays open (the tab
+    title shows it). A connection the tab cannot keep goes to release_connection, which rolls back.
+
+    If another worker of the tab (paging, EXPLAIN) gave back a pooled connection meanwhile, the one
+    with the open transaction is kept and the other one released.
+    """
+    try:
+        cursor.close()
+    except mysql.connector.Error:
+        pass
+    try:
+        keep = not conn.unread_result
+        in_transaction = keep and conn.in_transaction
+    except mysql.connector.Error:
+        keep = in_transaction = False
+    with session["lock"]:
+        kept = session["connection"]
+        if keep and not session["closed"] and (kept is None or (in_transaction and not session["in_transaction"])):
+            session["connection"] = (conn, time.time())
+            session["in_transaction"] = in_transaction
+            if kept is None:
+                return
+            conn = kept[0]
+        elif kept is None:
+            session["in_transaction"] = False
+    release_connection(conn) # a second connection of the tab, or the tab was closed
+
+def query_worker(job):
+    # runs in a background thread, must not touch any tk widget. everything the gui
+    # needs to know is put into job["queue"] and picked up by poll_query_job.
+    messages = job["queue"]
+    connect_start_time = time.time()
+    try:
+        conn = take_tab_connection(job["session"], job["db"])
+    except mysql.connector.Error as err:
+        job["connection_returned"] = True
+        messages.put(("connect_error", err))
+        return
+    cursor = conn.cursor()
+    job["connect_duration"] = time.time() - connect_start_time
+
+    try:
+        with job["lock"]:
+            if job["stop"].is_set():
+                messages.put(("cancelled",))
+                return
+            job["connection_id"] = conn.connection_id
+        if conn.in_transaction:
+            job["cache_key"] = None # the result may hold uncommitted rows of the tab's transaction
+
+        statements = split_sql_statements(job["query"]) or [job["query"]]
+        if len(statements) > 1:
+            run_script(job, conn, cursor, statements)
+            return
+        statement = statements[0] # without DELIMITER lines and trailing delimiter
+
+        # INSERT/UPDATE with a known primary key: write and auto-SELECT run in one transaction on this
+        # connection, an UPDATE locks and remembers its keys first so exactly those rows are read back
+        auto_select = plan_auto_select(conn, statement, job["db"])
+        auto_select_error = None
+        if auto_select:
+            if not conn.in_transaction: # else it runs inside the transaction the user opened in this tab
+                conn.start_transaction()
+                job["own_transaction"] = True
+            if auto_select["kind"] == "update":
                 try:
-                    select_start_time = time.time()
-                    cursor.execute(post_commit_select_query)
-                    select_duration = time.time() - select_start_time
-                    
-                    rows = cursor.fetchall()
-                    columns = [desc[0] for desc in cursor.description]
-                    
-                    # Treeview leeren und konfigurieren
-                    tree.delete(*tree.get_children())
-                    tree["columns"] = columns
-                    tree["show"] = "headings"
-
-                    for col in columns:
-                        tree.heading(col, text=col) 
-                        tree.column(col, width=100)
-
-                    for row in rows:
-                        tree.insert("", "end", values=row)
-
-                    # Gib Feedback für beide Aktionen
-                    action_type = "Updated" if query_upper.startswith("UPDATE") else "Inserted"
-                    feedback_label.config(
-                        text=f"Query OK, {cursor.rowcount} rows affected. Auto-SELECT: {len(rows)} rows from `{table_name}` in set ({select_duration:.3f} sec)"
-                    )
-                    
-                    # Zeige eine Erfolgsmeldung für die ursprüngliche Operation
-                    messagebox.showinfo("Success", f"{action_type} query ran successfully. {cursor.rowcount} rows affected. Showing results in the table below.") 
-                    
+                    capture_update_keys(conn, auto_select)
+                except mysql.connector.Error as capture_err:
+                    auto_select_error = capture_err # the UPDATE itself still runs
+
+        if job["profile"]["server"]:
+            start_server_profile(conn, job["profile"])
+        start_time = time.time()
+        cursor.execute(statement)
+        job["duration"] = time.time() - start_time
+        job["profile"]["phases"]["execute"] = job["duration"]
+        track_use_statement(conn, statement)
+
+        if cursor.description:  # SELECT-like queries (Data Retrieval)
+            job["edit_target"] = plan_result_editing(conn, statement, job["db"])
+            stream_result_set(job, cursor, conn)
+            return
+
+        # INSERT, UPDATE, DELETE, DDL (Data Modification/Definition)
+        if job["profile"]["server"]:
+            finish_server_profile(conn, job["profile"])
+        result = {"affected_rows": cursor.rowcount}
+        if auto_select:
+            result["table_name"] = auto_select["table"]
+            if auto_select_error is None:
+                try:
+                    run_auto_select(conn, cursor, auto_select, result)
                 except mysql.connector.Error as select_err:
-                    # Gib Feedback nur für die ursprüngliche Operation, zeige aber den Fehler der SELECT-Folgeabfrage
-                    feedback_label.config(
-                        text=f"Query OK, {cursor.rowcount} rows affected ({duration:.3f} sec). Auto-SELECT FAILED."
-                    )
-                    error_message = f"Success on initial query, but auto-select failed: {str(select_err)[(str(select_err).find(';')+2):]}"
-                    show_message_box(error_message)
-                    
-            # --- NEUE LOGIK FÜR POST-COMMIT-SELECT END ---
-            
-            elif "CREATE DATABASE" in query_upper or "DROP DATABASE" in query_upper:
-                load_databases() 
+                    auto_select_error = select_err
+            if auto_select_error is not None:
+                result["select_error"] = auto_select_error
+        track_transaction_writes(job["session"], conn, statement)
+        if job["own_transaction"]:
+            conn.commit()
+        if is_ddl_statement(statement):
+            invalidate_schema() # the statement may name another database, so drop everything
+        invalidate_result_cache(statement)
+
+        messages.put(("modified", result))
+
+    except mysql.connector.Error as err:
+        if err.errno == QUERY_INTERRUPTED_ERRNO and job["stop"].is_set():
+            messages.put(("cancelled",))
+        else:
+            messages.put(("error", err))
+    finally:
+        with job["lock"]:
+            job["connection_id"] = None
+        if job["own_transaction"]:
+            try:
+                if conn.in_transaction:
+                    conn.rollback() # failed or cancelled before the commit, only the user's transactions stay open
+            except mysql.connector.Error:
+                pass
+        track_transaction_writes(job["session"], conn) # the transaction may have ended
+        return_tab_connection(job["session"], conn, cursor)
+        job["connection_returned"] = True
+
+def kill_running_query(job):
+    # runs in a background thread: KILL QUERY has to go over a second connection,
+    # the one running the query is busy until the server aborts it
+    with job["lock"]:
+        connection_id = job.get("connection_id")
+        if connection_id is None:
+            return
+        try:
+            side_conn = acquire_connection(raise_errors=True)
+        except mysql.connector.Error:
+            return
+        side_cursor = side_conn.cursor()
+        try:
+            side_cursor.execute(f"KILL QUERY {int(connection_id)}")
+        except mysql.connector.Error:
+            pass # query finished in the meantime
+        finally:
+            release_connection(side_conn, side_cursor)
+
+def cancel_query(event=None):
+    """Cancels the running query with KILL QUERY, or stops loading the current result set."""
+    job = ACTIVE_QUERY
+    if job is None:
+        return
+    job["stop"].set()
+    if job["phase"] == "executing":
+        feedback_label.config(text="Cancelling query...")
+        threading.Thread(target=kill_running_query, args=(job,), daemon=True).start()
+
+def set_query_running(running):
+    """Switches run/cancel buttons between idle and in-flight state."""
+    if running:
+        btn_execute.config(state=tk.DISABLED)
+        btn_cancel.config(state=tk.NORMAL)
+    else:
+        btn_execute.config(state=tk.NORMAL, text="Run Query (F5)")
+        btn_cancel.config(state=tk.DISABLED)
+
+def show_modification_result(job, result):
+    """Shows feedback for INSERT/UPDATE/DELETE/DDL, including the auto-SELECT rows if there are any."""
+    affected_rows = result["affected_rows"]
+    timing = format_timing(job["duration"], job["connect_duration"])
+    query_upper = job["query"].upper().strip()
+    table_name = result.get("table_name")
+
+    if "select_columns" in result:
+        # Treeview leeren und konfigurieren
+        setup_result_columns(result["select_columns"])
+        append_result_rows(result["select_rows"])
+        refresh_result_view()
+
+        # Gib Feedback für beide Aktionen
+        action_type = "Updated" if query_upper.startswith("UPDATE") else "Inserted"
+        shown = f"first {len(result['select_rows'])}" if result.get("select_truncated") else len(result["select_rows"])
+        feedback_label.config(
+            text=f"Query OK, {affected_rows} rows affected ({timing}). Auto-SELECT: {shown} rows from `{table_name}` in set ({result['select_duration']:.3f} sec)"
+        )
+        
+        # Zeige eine Erfolgsmeldung für die ursprüngliche Operation
+        messagebox.showinfo("Success", f"{action_type} query ran successfully. {affected_rows} rows affected. Showing results in the table below.") 
+    elif "select_error" in result:
+        # Gib Feedback nur für die ursprüngliche Operation, zeige aber den Fehler der SELECT-Folgeabfrage
+        select_err = result["select_error"]
+        feedback_label.config(
+            text=f"Query OK, {affected_rows} rows affected ({timing}). Auto-SELECT FAILED."
+        )
+        error_message = f"Success on initial query, but auto-select failed: {str(select_err)[(str(select_err).find(';')+2):]}"
+        show_message_box(error_message)
+    elif "select_skipped" in result:
+        feedback_label.config(
+            text=f"Query OK, {affected_rows} rows affected ({timing}). Auto-SELECT skipped: {result['select_skipped']}."
+        )
+        messagebox.showinfo("Success", f"Query ran successfully. {affected_rows} rows affected.")
+    elif "CREATE DATABASE" in query_upper or "DROP DATABASE" in query_upper:
+        load_databases() 
+        feedback_label.config(
+            text=f"Query OK, {affected_rows} rows affected ({timing})"
+        )
+        messagebox.showinfo("Success", f"DDL query ran successfully. {affected_rows} rows affected.")
+    else:
+        # Standardbehandlung für DELETE und andere DML/DDL, die keinen Auto-Select auslösen
+        feedback_label.config(
+            text=f"Query OK, {affected_rows} rows affected ({timing})"
+        )
+        messagebox.showinfo("Success", f"Query ran successfully. {affected_rows} rows affected.")
+
+def drain_background_job(job):
+    """Moves the rows of a query whose tab is not selected into a column store of the job, without widgets.
+
+    Everything else (result shown, errors, script log...) is held back until the tab is selected again.
+    Returns True once the query has finished.
+    """
+    if job["held"] and job["held"][-1][0] != "statement":
+        return True
+    deadline = time.time() + RENDER_BUDGET_MS / 1000
+    while time.time() < deadline:
+        try:
+            message = job["queue"].get_nowait()
+        except queue.Empty:
+            break
+        conversion_start_time = time.time()
+        if message[0] == "columns":
+            job["store"] = {"columns": list(message[1]), "data": [[] for _ in message[1]], "rows": 0}
+            job["phase"] = "loading"
+        elif message[0] == "rows":
+            # rows of a result that was already shown go into the stored result of the tab
+            extend_column_store(job["store"] or job["session"]["state"]["RESULT_STORE"], message[1])
+            job["rows"] += len(message[1])
+        else:
+            job["held"].append(message)
+            if message[0] != "statement":
+                update_tab_title(job["session"], "\u25cf ") # finished, not seen yet
+                return True
+        job["profile"]["phases"]["conversion"] += time.time() - conversion_start_time
+    return False
+
+def adopt_background_result(job):
+    """Shows the rows that a query collected while its tab was in the background."""
+    store = job["store"]
+    job["store"] = None
+    setup_result_columns(store["columns"])
+    RESULT_STORE["data"] = store["data"]
+    RESULT_STORE["rows"] = store["rows"]
+    enable_result_editing(job.get("edit_target"))
+    set_query_running(False)
+
+def poll_query_job(job):
+    """Picks up the messages of query_worker on the tk thread, then reschedules itself."""
+    session = job["session"]
+    if session is not ACTIVE_SESSION:
+        if session in SESSIONS and job is session["state"]["ACTIVE_QUERY"]:
+            finished = drain_background_job(job)
+            root.after(BACKGROUND_POLL_MS if finished else RENDER_INTERVAL_MS, poll_query_job, job)
+        return
+    if job is not ACTIVE_QUERY:
+        return # a newer query replaced this one
+
+    deadline = time.time() + RENDER_BUDGET_MS / 1000
+    rows_arrived = False
+    finished = False
+    if job["store"] is not None:
+        adopt_background_result(job)
+        rows_arrived = True
+    while time.time() < deadline and not finished:
+        if job["held"]:
+            message = job["held"].pop(0)
+        else:
+            try:
+                message = job["queue"].get_nowait()
+            except queue.Empty:
+                break
+        kind = message[0]
+
+        if kind == "columns":
+            setup_result_columns(message[1])
+            enable_result_editing(job.get("edit_target"))
+            job["phase"] = "loading"
+            set_query_running(False)
+        elif kind == "rows":
+            conversion_start_time = time.time()
+            append_result_rows(message[1])
+            job["profile"]["phases"]["conversion"] += time.time() - conversion_start_time
+            job["rows"] += len(message[1])
+            rows_arrived = True
+        elif kind == "done":
+            finished = True
+            # --- Add to History only upon successful execution ---
+            add_query_to_history(job["query"], job["db"], job["duration"], job["rows"])
+            timing = format_timing(job["duration"], job["connect_duration"])
+            load_duration = time.time() - job["start"]
+            if job["stop"].is_set():
+                feedback_label.config(text=f"{job['rows']} rows loaded, loading cancelled ({timing})")
+            elif job["rows"] > INITIAL_ROWS:
                 feedback_label.config(
-                    text=f"Query OK, {cursor.rowcount} rows affected ({duration:.3f} sec)"
+                    text=f"{job['rows']} rows in set ({timing}, all rows loaded after {load_duration:.3f} sec)"
                 )
-                messagebox.showinfo("Success", f"DDL query ran successfully. {cursor.rowcount} rows affected.")
             else:
-                # Standardbehandlung für DELETE und andere DML/DDL, die keinen Auto-Select auslösen
-                feedback_label.config(
-                    text=f"Query OK, {cursor.rowcount} rows affected ({duration:.3f} sec)"
+                feedback_label.config(text=f"{job['rows']} rows in set ({timing})")
+            if job["cache_key"] and not job["stop"].is_set():
+                result_cache_store(
+                    job["cache_key"], job["query"], RESULT_STORE["columns"], RESULT_STORE["data"],
+                    RESULT_STORE["rows"], job["duration"]
                 )
-                messagebox.showinfo("Success", f"Query ran successfully. {cursor.rowcount} rows affected.")
-                
+        elif kind == "statement":
+            _, index, summary, statement_duration, outcome = message
+            if index == 1:
+                log_script_line(f"--- script started {time.strftime('%H:%M:%S', time.localtime(job['start']))} ---")
+            log_script_line(f"[{index}] {statement_duration:8.3f} sec  {outcome:<28} {summary}")
+        elif kind == "script_done":
+            finished = True
+            summary = message[1]
+            add_query_to_history(job["query"], job["db"], job["duration"], summary["affected_rows"])
+            timing = format_timing(job["duration"], job["connect_duration"])
+            mode = "in one transaction" if job["transaction"] else "autocommit"
+            feedback_label.config(
+                text=f"Script OK, {summary['statements']} statements ({mode}), {summary['affected_rows']} rows affected ({timing})"
+            )
+            log_script_line(f"done: {summary['statements']} statements in {job['duration']:.3f} sec")
+            query_upper = job["query"].upper()
+            if "CREATE DATABASE" in query_upper or "DROP DATABASE" in query_upper:
+                load_databases()
+        elif kind == "modified":
+            finished = True
+            add_query_to_history(job["query"], job["db"], job["duration"], message[1]["affected_rows"])
+            set_query_running(False)
+            show_modification_result(job, message[1])
+        elif kind == "cancelled":
+            finished = True
+            feedback_label.config(text="Query cancelled.")
+        elif kind == "connect_error":
+            finished = True
+            feedback_label.config(text="")
+            format_and_display_error(message[1])
+        elif kind == "error":
+            finished = True
+            feedback_label.config(text="")
+            error_message = str(message[1])
+            error_message = error_message[(error_message.find(';')+2):]
+            if job["phase"] == "loading":
+                feedback_label.config(text=f"{job['rows']} rows loaded, fetching the rest failed.")
+            show_message_box(error_message)
+
+    if rows_arrived:
+        render_start_time = time.time()
+        refresh_result_view()
+        job["profile"]["phases"]["render"] += time.time() - render_start_time
+
+    if finished:
+        cancel_result_stream()
+        set_query_running(False)
+        show_transaction_state(job)
+        if profile_enabled.get() and kind in ("done", "modified"):
+            show_profile(job)
+        return
+
+    if job["phase"] == "executing":
+        # elapsed time ticker on the run button while the server is working
+        elapsed = time.time() - job["start"]
+        spinner = SPINNER_FRAMES[int(elapsed * 10) % len(SPINNER_FRAMES)]
+        btn_execute.config(text=f"{spinner} Running... {elapsed:.1f} sec")
+    elif rows_arrived:
+        timing = format_timing(job["duration"], job["connect_duration"])
+        feedback_label.config(text=f"{job['rows']} rows loaded, fetching more... ({timing})")
+    root.after(RENDER_INTERVAL_MS, poll_query_job, job)
+
+SQL_TOKEN_PATTERN = re.compile(r"""('(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*"|`[^`]*`)|(\s+)|([^'"`\s]+)""")
+TABLE_REFERENCE_PATTERN = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO|TABLE)\s+", re.IGNORECASE)
+TABLE_NAME_PATTERN = re.compile(r"`?([\w$]+)`?(?:\.`?([\w$]+)`?)?(?:\s+(?:AS\s+)?`?[\w$]+`?)?\s*(,)?\s*", re.IGNORECASE)
+
+def normalize_sql(sql):
+    """Uppercases and collapses whitespace outside of string literals and quoted identifiers."""
+    parts = []
+    for quoted, space, word in SQL_TOKEN_PATTERN.findall(sql.strip().rstrip(';').strip()):
+        if quoted:
+            parts.append(quoted)
+        elif space:
+            parts.append(" ")
+        else:
+            parts.append(word.upper())
+    return "".join(parts)
+
+def referenced_tables(statement):
+    """Lower-case names of the tables a statement reads or writes (FROM/JOIN/UPDATE/INTO/TABLE lists)."""
+    tables = set()
+    for keyword in TABLE_REFERENCE_PATTERN.finditer(statement):
+        position = keyword.end()
+        while True:
+            match = TABLE_NAME_PATTERN.match(statement, position)
+            if not match:
+                break # subquery in parentheses, its own FROM is found separately
+            tables.add((match.group(2) or match.group(1)).lower()) # last part of schema.table
+            if not match.group(3):
+                break # no comma, end of the table list
+            position = match.end()
+    return tables
+
+def is_cacheable_select(statement):
+    return re.match(r"\s*(SELECT|WITH)\b", statement, re.IGNORECASE) is not None
+
+def estimate_result_size(data, rows):
+    """Rough memory size of a column store in bytes, sampled from the first rows."""
+    if not data or not rows:
+        return 0
+    sample = min(rows, 50)
+    sampled_bytes = sum(sys.getsizeof(column_values[i]) for column_values in data for i in range(sample))
+    return sum(sys.getsizeof(column_values) for column_values in data) + sampled_bytes * rows // sample
+
+def result_cache_lookup(key):
+    """Returns a fresh cache entry for the key (and marks it as recently used), or None."""
+    with RESULT_CACHE_LOCK:
+        entry = RESULT_CACHE.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry["created"] > RESULT_CACHE_TTL:
+            del RESULT_CACHE[key]
+            return None
+        RESULT_CACHE.move_to_end(key)
+        return entry
+
+def result_cache_store(key, statement, columns, data, rows, duration):
+    """Stores a loaded result set, evicting the least recently used entries above RESULT_CACHE_MAX_MB."""
+    size = estimate_result_size(data, rows)
+    max_bytes = RESULT_CACHE_MAX_MB * 1024 * 1024
+    if size > max_bytes:
+        return # would evict everything else
+    with RESULT_CACHE_LOCK:
+        RESULT_CACHE[key] = {
+            "columns": list(columns),
+            "data": data, # the column lists are never modified after loading, sharing them is safe
+            "rows": rows,
+            "tables": referenced_tables(statement),
+            "size": size,
+            "duration": duration,
+            "created": time.time(),
+        }
+        RESULT_CACHE.move_to_end(key)
+        while sum(entry["size"] for entry in RESULT_CACHE.values()) > max_bytes:
+            RESULT_CACHE.popitem(last=False)
+
+def written_tables(statement):
+    """Tables a statement may change: an empty set for reads, None if unknown (DDL, CALL, LOAD)."""
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    if keyword in ("INSERT", "REPLACE", "UPDATE", "DELETE", "TRUNCATE"):
+        return referenced_tables(statement)
+    if keyword in ("CREATE", "ALTER", "DROP", "RENAME", "CALL", "LOAD", "IMPORT"):
+        return None # unknown effect, be safe
+    return set() # SELECT, SHOW, SET, USE, ...
+
+def invalidate_result_cache(statement=None, tables=None):
+    """Drops cached results that may be stale after a write.
+
+    Pass the statement that was executed (reads are ignored, DDL/CALL/LOAD clear everything)
+    or the set of written tables directly.
+    """
+    if statement is not None:
+        tables = written_tables(statement)
+        if tables is not None and not tables:
+            return
+    with RESULT_CACHE_LOCK:
+        if tables is None:
+            RESULT_CACHE.clear()
+            return
+        tables = {table.lower() for table in tables}
+        for key in [key for key, entry in RESULT_CACHE.items() if entry["tables"] & tables]:
+            del RESULT_CACHE[key]
+
+def track_transaction_writes(session, conn, statement=""):
+    """Remembers the tables written in an open transaction of the tab and drops their cached results
+    again when it ends with COMMIT or ROLLBACK (worker thread).
+
+    invalidate_result_cache runs at the write already, but until the COMMIT the other tabs still read
+    and cache the old rows.
+    """
+    tables = written_tables(statement)
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    with session["lock"]:
+        written = session["transaction_tables"]
+        if conn.in_transaction and keyword not in ("START", "BEGIN"): # START TRANSACTION commits an open one
+            if tables is None or written is None:
+                session["transaction_tables"] = None
+            else:
+                written.update(tables)
+            return
+        session["transaction_tables"] = set()
+    if written is None or written:
+        invalidate_result_cache(tables=written)
+
+def show_cached_result(job, entry):
+    """Puts a cached result set into the grid without touching the database."""
+    setup_result_columns(entry["columns"])
+    RESULT_STORE["data"] = entry["data"]
+    RESULT_STORE["rows"] = entry["rows"]
+    refresh_result_view()
+    add_query_to_history(job["query"], job["db"], 0.0, entry["rows"])
+    age = time.time() - entry["created"]
+    feedback_label.config(
+        text=f"{entry['rows']} rows in set (result cache hit, {age:.1f} sec old, originally {entry['duration']:.3f} sec; Shift+F5 to refresh)"
+    )
+
+# SELECT columns FROM table [[AS] alias] [WHERE ...] [ORDER BY ...], anything else runs unpaged
+SIMPLE_SELECT_PATTERN = re.compile(
+    r"\s*SELECT\s+(?P<columns>.+?)\s+FROM\s+(?P<table>`[^`]+`|[\w$]+)"
+    r"(?:\s+(?:AS\s+)?(?P<alias>(?!WHERE\b|ORDER\b)[\w$]+))?"
+    r"(?:\s+WHERE\s+(?P<where>.+?))?(?:\s+ORDER\s+BY\s+(?P<order>.+?))?\s*$",
+    re.IGNORECASE | re.DOTALL
+)
+UNPAGEABLE_WORDS = {
+    "JOIN", "GROUP", "HAVING", "LIMIT", "OFFSET", "UNION", "INTO", "FOR", "DISTINCT", "LOCK", "WINDOW",
+    "COUNT", "SUM", "AVG", "MIN", "MAX", "GROUP_CONCAT",  # aggregates return one row anyway
+}
+
+def parse_simple_select(statement):
+    """Returns the parts of a single-table SELECT that can be paged, or None."""
+    match = SIMPLE_SELECT_PATTERN.match(statement)
+    if not match:
+        return None
+    words = [value.upper() for kind, value in tokenize_sql(statement) if kind == "word"]
+    if words.count("SELECT") != 1 or UNPAGEABLE_WORDS.intersection(words):
+        return None # subqueries, aggregates over groups, explicit limits...
+    if match.group("alias") and match.group("alias").lower() in KEYWORD_SET:
+        return None
+    parts = match.groupdict()
+    parts["table"] = parts["table"].strip("`")
+    return parts
+
+def plan_paging(conn, paging):
+    """Chooses keyset or LIMIT/OFFSET paging and reads the row estimate (worker thread).
+
+    Keyset paging (WHERE pk > last key ORDER BY pk) costs the same for every page, it is used when
+    the table has a primary key and the query has no ORDER BY of its own (or orders by the key).
+    """
+    parts = paging["parts"]
+    primary_key = get_primary_key_column(conn, parts["table"], paging["db"])
+    table_ref = f"`{parts['table']}`" + (f" {parts['alias']}" if parts["alias"] else "")
+    paging["table_ref"] = table_ref
+    paging["primary_key"] = primary_key
+    paging["key_ref"] = f"{parts['alias'] or '`' + parts['table'] + '`'}.`{primary_key}`" if primary_key else None
+    order = (parts["order"] or "").replace("`", "").strip()
+    order_is_key = re.fullmatch(rf"(?:[\w$]+\.)?{re.escape(primary_key)}(?:\s+ASC)?", order, re.IGNORECASE) if primary_key else None
+    paging["mode"] = "keyset" if primary_key and (not order or order_is_key) else "offset"
+
+    cursor = conn.cursor(buffered=True)
+    try:
+        # cheap estimate from the table statistics instead of COUNT(*)
+        cursor.execute(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s",
+            (paging["db"], parts["table"])
+        )
+        row = cursor.fetchone()
+        paging["estimate"] = int(row[0]) if row and row[0] is not None else None
+    finally:
+        cursor.close()
+    paging["edit_target"] = plan_result_editing(conn, split_sql_statements(paging["query"])[0], paging["db"])
+
+def page_query(paging):
+    """Returns (sql, params) for the next page."""
+    parts = paging["parts"]
+    after_key = paging["last_key"] if paging["mode"] == "keyset" and paging["loaded"] else None
+    # with a parameter, % in the user's sql would be taken as a placeholder
+    escape = (lambda text: text.replace("%", "%%")) if after_key is not None else (lambda text: text)
+    conditions = [f"({escape(parts['where'])})"] if parts["where"] else []
+    if after_key is not None:
+        conditions.append(f"{paging['key_ref']} > %s")
+    sql = f"SELECT {escape(parts['columns'])} FROM {paging['table_ref']}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    order = parts["order"] or paging["key_ref"] # a stable order, otherwise pages could overlap
+    if order:
+        sql += f" ORDER BY {escape(order)}"
+    sql += f" LIMIT {PAGE_SIZE}"
+    if paging["mode"] == "offset" and paging["loaded"]:
+        sql += f" OFFSET {paging['loaded']}"
+    return sql, ((after_key,) if after_key is not None else ())
+
+def page_worker(paging):
+    # runs in a background thread, the page is picked up by poll_page
+    messages = paging["queue"]
+    try:
+        # the tab's connection: pages inside a transaction the user opened show its uncommitted rows
+        conn = take_tab_connection(paging["session"], paging["db"])
+    except mysql.connector.Error as err:
+        messages.put(("error", err))
+        return
+    cursor = conn.cursor()
+    try:
+        start_time = time.time()
+        if paging["mode"] is None:
+            plan_paging(conn, paging)
+        sql, params = page_query(paging)
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        messages.put(("page", [desc[0] for desc in cursor.description], rows, time.time() - start_time))
+    except mysql.connector.Error as err:
+        messages.put(("error", err))
+    finally:
+        return_tab_connection(paging["session"], conn, cursor)
+
+def fetch_next_page():
+    """Requests the next page of the paged result unless one is loading or the end was reached."""
+    paging = PAGED_RESULT
+    if paging is None or paging["loading"] or paging["exhausted"]:
+        return
+    paging["loading"] = True
+    threading.Thread(target=page_worker, args=(paging,), daemon=True).start()
+    root.after(RENDER_INTERVAL_MS, poll_page, paging)
+
+def poll_page(paging):
+    if wait_for_tab(paging["session"], poll_page, paging):
+        return
+    if paging is not PAGED_RESULT:
+        return # another query replaced the paged result
+    try:
+        message = paging["queue"].get_nowait()
+    except queue.Empty:
+        root.after(RENDER_INTERVAL_MS, poll_page, paging)
+        return
+    paging["loading"] = False
+    set_query_running(False)
+    if message[0] == "error":
+        paging["exhausted"] = True
+        error_message = str(message[1])
+        show_message_box(error_message[(error_message.find(';')+2):])
+        return
+
+    _, columns, rows, duration = message
+    if not paging["loaded"]:
+        setup_result_columns(columns)
+        enable_result_editing(paging["edit_target"])
+        add_query_to_history(paging["query"], paging["db"], duration, len(rows))
+        if paging["mode"] == "keyset":
+            if paging["primary_key"] in columns:
+                paging["key_index"] = columns.index(paging["primary_key"])
+            else:
+                paging["mode"] = "offset" # key not selected, the order by key stays the same
+    append_result_rows(rows)
+    paging["loaded"] += len(rows)
+    paging["page_duration"] = duration
+    if paging["mode"] == "keyset" and rows:
+        paging["last_key"] = rows[-1][paging["key_index"]]
+    if len(rows) < PAGE_SIZE:
+        paging["exhausted"] = True
+    refresh_result_view()
+    if not RESULT_STORE["rows"]:
+        feedback_label.config(text=f"0 rows in set ({duration:.3f} sec)")
+
+def update_paging_label(first, last):
+    paging = PAGED_RESULT
+    if paging["exhausted"]:
+        total = f"{paging['loaded']}"
+    elif paging["estimate"] is not None:
+        total = f"\u2248{max(paging['estimate'], paging['loaded'])}"
+    else:
+        total = "?"
+    mode = "keyset on " + paging["primary_key"] if paging["mode"] == "keyset" else "LIMIT/OFFSET"
+    feedback_label.config(
+        text=f"rows {first}\u2013{last} of {total} (paged by {mode}, last page {paging['page_duration']:.3f} sec)"
+    )
+
+def start_paged_query(query, db_name, parts):
+    """Shows the first page of a simple SELECT, further pages are fetched while scrolling."""
+    global PAGED_RESULT
+    PAGED_RESULT = {
+        "query": query,
+        "db": db_name,
+        "parts": parts,
+        "session": ACTIVE_SESSION,
+        "queue": queue.Queue(),
+        "mode": None,          # keyset or offset, decided with the first page
+        "primary_key": None,
+        "edit_target": None,
+        "key_index": None,
+        "last_key": None,
+        "loaded": 0,
+        "estimate": None,
+        "exhausted": False,
+        "loading": False,
+        "page_duration": 0.0,
+    }
+    set_query_running(True)
+    fetch_next_page()
+
+PLAIN_COLUMN_LIST_PATTERN = re.compile(r"\s*(?:\*|[\w$`.]+(?:\s*,\s*[\w$`.]+)*)\s*$")
+TRAILING_LIMIT_PATTERN = re.compile(r"\s+LIMIT\s+\d+(?:\s*(?:,|OFFSET)\s*\d+)?\s*$", re.IGNORECASE)
+
+def plan_result_editing(conn, statement, database):
+    """Table and primary key of a result that can be edited in the grid, None if it cannot (worker thread).
+
+    Only single-table SELECTs of * or plain column names, so every result column is a column of the table.
+    """
+    parts = parse_simple_select(TRAILING_LIMIT_PATTERN.sub("", statement))
+    if parts is None or not PLAIN_COLUMN_LIST_PATTERN.match(parts["columns"]):
+        return None
+    pk_columns = get_primary_key_columns(conn, parts["table"], database)
+    if not pk_columns:
+        return None
+    return {"db": database, "table": parts["table"], "pk_columns": pk_columns}
+
+def enable_result_editing(target):
+    """Makes the result in the grid editable if its primary key columns were selected."""
+    global EDIT_TARGET
+    columns = RESULT_STORE["columns"]
+    if target is None or not all(column in columns for column in target["pk_columns"]):
+        return
+    EDIT_TARGET = dict(target, columns=list(columns), pk_indexes=[columns.index(column) for column in target["pk_columns"]])
+    update_edit_bar()
+
+def pending_edit_count():
+    return sum(len(edits) for edits in PENDING_EDITS.values())
+
+def result_row_key(row_index):
+    """Primary key values of a row of the result store."""
+    return tuple(RESULT_STORE["data"][index][row_index] for index in EDIT_TARGET["pk_indexes"])
+
+def update_edit_bar():
+    if EDIT_TARGET is None:
+        edit_bar.pack_forget()
+        return
+    count = pending_edit_count()
+    edit_label.config(text=f"`{EDIT_TARGET['table']}` is editable (double-click a cell, NULL for null): {count} pending changes")
+    state = tk.NORMAL if count else tk.DISABLED
+    btn_commit_edits.config(state=state)
+    btn_rollback_edits.config(state=state)
+    if not edit_bar.winfo_manager():
+        edit_bar.pack(side="bottom", fill="x", before=tree_scroll)
+
+def begin_cell_edit(event):
+    """Double-click: places an entry over the cell, Return/leaving it queues the edit, Escape drops it."""
+    global CELL_EDITOR
+    if EDIT_TARGET is None:
+        return None
+    item_id = tree.identify_row(event.y)
+    column_id = tree.identify_column(event.x)
+    if not item_id or not column_id:
+        return None
+    column_index = int(column_id.replace('#', '')) - 1
+    if column_index in EDIT_TARGET["pk_indexes"]:
+        feedback_label.config(text="Primary key columns cannot be edited in the grid.")
+        return "break"
+    bbox = tree.bbox(item_id, column_id)
+    if not bbox:
+        return None
+
+    finish_cell_edit(save=True)
+    row_index = store_row(VIEW_OFFSET + tree.index(item_id))
+    edits = PENDING_EDITS.get(result_row_key(row_index), {})
+    value = edits[column_index] if column_index in edits else RESULT_STORE["data"][column_index][row_index]
+    entry = tk.Entry(tree)
+    entry.insert(0, "NULL" if value is None else str(value))
+    entry.select_range(0, tk.END)
+    entry.place(x=bbox[0], y=bbox[1], width=bbox[2], height=bbox[3])
+    entry.focus_set()
+    entry.bind("<Return>", lambda e: finish_cell_edit(save=True))
+    entry.bind("<KP_Enter>", lambda e: finish_cell_edit(save=True))
+    entry.bind("<Escape>", lambda e: finish_cell_edit(save=False)) # "break" keeps Esc from cancelling the query
+    entry.bind("<FocusOut>", lambda e: finish_cell_edit(save=True))
+    CELL_EDITOR = {"entry": entry, "row": row_index, "column": column_index}
+    return "break"
+
+def finish_cell_edit(save):
+    global CELL_EDITOR
+    editor = CELL_EDITOR
+    if editor is None:
+        return "break"
+    CELL_EDITOR = None # destroy() fires FocusOut, which must not save a second time
+    text = editor["entry"].get()
+    editor["entry"].destroy()
+    if save:
+        queue_cell_edit(editor["row"], editor["column"], None if text == "NULL" else text)
+    return "break"
+
+def queue_cell_edit(row_index, column_index, value):
+    """Remembers the new value of a cell by primary key, an edit back to the original value is dropped."""
+    key = result_row_key(row_index)
+    original = RESULT_STORE["data"][column_index][row_index]
+    edits = PENDING_EDITS.setdefault(key, {})
+    if value == original or (value is not None and original is not None and value == str(original)):
+        edits.pop(column_index, None)
+    else:
+        edits[column_index] = value
+    if not edits:
+        del PENDING_EDITS[key]
+    refresh_result_view()
+    update_edit_bar()
+
+def edit_statements(target, pending):
+    """Groups pending edits by the set of edited columns: [(UPDATE sql, params), ...].
+
+    Each group of up to EDIT_BATCH_ROWS rows becomes one statement, so one round trip:
+    UPDATE t SET a = CASE WHEN pk = %s THEN %s ... END, ... WHERE pk IN (%s, ...)
+    (executemany only rewrites INSERTs, UPDATEs would still be sent row by row)
+    """
+    groups = {}
+    for key, edits in pending.items():
+        groups.setdefault(tuple(sorted(edits)), []).append(key)
+    pk_columns = target["pk_columns"]
+    if len(pk_columns) == 1:
+        key_sql, key_params = f"`{pk_columns[0]}`", "%s"
+    else:
+        key_sql = "(" + ", ".join(f"`{column}`" for column in pk_columns) + ")"
+        key_params = "(" + ", ".join(["%s"] * len(pk_columns)) + ")"
+    statements = []
+    for column_indexes, keys in groups.items():
+        for start in range(0, len(keys), EDIT_BATCH_ROWS):
+            batch = keys[start:start + EDIT_BATCH_ROWS]
+            assignments = []
+            params = []
+            for index in column_indexes:
+                cases = " ".join(f"WHEN {key_sql} = {key_params} THEN %s" for _ in batch)
+                assignments.append(f"`{target['columns'][index]}` = CASE {cases} END")
+                for key in batch:
+                    params.extend(key)
+                    params.append(pending[key][index])
+            for key in batch:
+                params.extend(key)
+            key_list = ", ".join([key_params] * len(batch))
+            statements.append((f"UPDATE `{target['table']}` SET {', '.join(assignments)} WHERE {key_sql} IN ({key_list})", params))
+    return statements
+
+def edit_commit_worker(job):
+    # runs in a background thread, poll_edit_commit reads the job dict
+    try:
+        conn = take_tab_connection(job["session"], job["db"])
+    except mysql.connector.Error as err:
+        job["error"] = err
+        job["finished"] = True
+        return
+    cursor = conn.cursor()
+    try:
+        # in a transaction the user opened in the tab the edits become part of it, the user's COMMIT writes them.
+        # the savepoint takes a failed batch back out without touching the rest of that transaction
+        job["in_user_transaction"] = conn.in_transaction
+        if job["in_user_transaction"]:
+            cursor.execute("SAVEPOINT sqlgui_grid_edits")
+        else:
+            conn.start_transaction()
+        for sql, params in job["statements"]:
+            cursor.execute(sql, params)
+            job["affected_rows"] += max(cursor.rowcount, 0)
+            track_transaction_writes(job["session"], conn, sql)
+        if job["in_user_transaction"]:
+            cursor.execute("RELEASE SAVEPOINT sqlgui_grid_edits")
+        else:
+            conn.commit()
+    except mysql.connector.Error as err:
+        job["error"] = err
+        try:
+            if job["in_user_transaction"]:
+                cursor.execute("ROLLBACK TO SAVEPOINT sqlgui_grid_edits")
+            else:
+                conn.rollback()
+        except mysql.connector.Error:
+            pass # connection lost, the server drops the transaction anyway
+    finally:
+        track_transaction_writes(job["session"], conn)
+        return_tab_connection(job["session"], conn, cursor)
+        job["duration"] = time.time() - job["start"]
+        job["finished"] = True
+
+def commit_edits():
+    """Writes all pending edits in one transaction."""
+    finish_cell_edit(save=True)
+    if EDIT_TARGET is None or not PENDING_EDITS:
+        return
+    edits = {key: dict(row_edits) for key, row_edits in PENDING_EDITS.items()}
+    job = {
+        "db": EDIT_TARGET["db"],
+        "target": EDIT_TARGET,
+        "edits": edits,
+        "statements": edit_statements(EDIT_TARGET, edits),
+        "session": ACTIVE_SESSION,
+        "in_user_transaction": False,  # the tab had an open transaction, the edits were not committed
+        "affected_rows": 0,
+        "start": time.time(),
+        "finished": False,
+    }
+    btn_commit_edits.config(state=tk.DISABLED)
+    btn_rollback_edits.config(state=tk.DISABLED)
+    feedback_label.config(text=f"Committing {pending_edit_count()} changes...")
+    threading.Thread(target=edit_commit_worker, args=(job,), daemon=True).start()
+    root.after(100, poll_edit_commit, job)
+
+def poll_edit_commit(job):
+    if not job["finished"]:
+        root.after(100, poll_edit_commit, job)
+        return
+    if wait_for_tab(job["session"], poll_edit_commit, job):
+        return
+    changes = sum(len(edits) for edits in job["edits"].values())
+    if "error" in job:
+        update_edit_bar()
+        feedback_label.config(text=f"Commit failed, nothing was written. {changes} changes are still pending.")
+        format_and_display_error(job["error"])
+        return
+
+    invalidate_result_cache(tables={job["target"]["table"]})
+    if job["target"] is EDIT_TARGET:
+        # the committed values become the values of the result store, edits made meanwhile stay pending
+        rows_by_key = {key: row for row, key in enumerate(zip(*(RESULT_STORE["data"][index] for index in EDIT_TARGET["pk_indexes"])))}
+        for column_index in {index for edits in job["edits"].values() for index in edits}:
+            SORT_CACHE.pop(column_index, None)
+            FILTER_TEXT_CACHE.pop(column_index, None)
+        for key, edits in job["edits"].items():
+            row_index = rows_by_key.get(key)
+            pending = PENDING_EDITS.get(key, {})
+            for column_index, value in edits.items():
+                if row_index is not None:
+                    RESULT_STORE["data"][column_index][row_index] = value
+                if column_index in pending and pending[column_index] == value:
+                    del pending[column_index]
+            if key in PENDING_EDITS and not pending:
+                del PENDING_EDITS[key]
+        refresh_result_view()
+        update_edit_bar()
+    batches = f"{len(job['statements'])} batched statements, {job['affected_rows']} rows affected, {job['duration']:.3f} sec"
+    if job["in_user_transaction"]:
+        feedback_label.config(
+            text=f"Wrote {changes} changes to `{job['target']['table']}` in the open transaction of the tab, "
+                 f"COMMIT to keep them ({batches})"
+        )
+    else:
+        feedback_label.config(text=f"Committed {changes} changes to `{job['target']['table']}` in one transaction ({batches})")
+
+def rollback_edits():
+    """Drops all pending edits, nothing was sent to the server yet."""
+    finish_cell_edit(save=False)
+    PENDING_EDITS.clear()
+    refresh_result_view()
+    update_edit_bar()
+    feedback_label.config(text="Pending changes discarded.")
+
+def iter_plan_tables(node):
+    """Yields every "table" object of an EXPLAIN FORMAT=JSON plan."""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "table" and isinstance(value, dict):
+                yield value
+            yield from iter_plan_tables(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from iter_plan_tables(value)
+
+# `db`.`alias`.`column` <op> something that is not another column (a constant, <cache>(...), a list)
+CONDITION_COLUMN_PATTERN = re.compile(
+    r"(?:`[^`]+`\.)?`(?P<table>[^`]+)`\.`(?P<column>[^`]+)`\s*(?P<op><=>|>=|<=|<>|!=|=|>|<|\bin\b|\blike\b|\bbetween\b)\s*(?!`)",
+    re.IGNORECASE
+)
+
+def condition_columns(condition, table_alias):
+    """Returns (equality columns, range columns) of a table in an attached_condition, in order."""
+    equality, ranges = [], []
+    for match in CONDITION_COLUMN_PATTERN.finditer(condition or ""):
+        if match.group("table") != table_alias:
+            continue
+        operator = match.group("op").lower()
+        if operator in ("<>", "!="):
+            continue # an index does not help for not-equal
+        target = equality if operator in ("=", "<=>", "in") else ranges
+        if match.group("column") not in equality + ranges:
+            target.append(match.group("column"))
+    return equality, ranges
+
+def suggest_indexes(plan, statement, schema):
+    """Suggests indexes for tables the plan reads with a full scan.
+
+    Columns compared with constants in the attached condition become the index, equality
+    columns first and range columns last, e.g. bestellungen(lieferstatus, bestelldatum).
+    """
+    tables = {table_name.lower(): table_name for table_name in schema["tables"]}
+    aliases = statement_aliases(statement, tables)
+    suggestions = []
+    for table in iter_plan_tables(plan):
+        if table.get("access_type") not in ("ALL", "index"):
+            continue
+        table_name = aliases.get(str(table.get("table_name", "")).lower())
+        if table_name is None:
+            continue
+        known_columns = {row[0].lower(): row for row in schema["tables"][table_name]}
+        equality, ranges = condition_columns(table.get("attached_condition"), table.get("table_name"))
+        columns = [column for column in equality + ranges[:1] if column.lower() in known_columns]
+        if not columns:
+            continue
+        suggestion = f"{table_name}({', '.join(columns)})"
+        if known_columns[columns[0].lower()][3]:
+            suggestion += f"  -- {columns[0]} already has a {known_columns[columns[0].lower()][3]} index"
+        if suggestion not in suggestions:
+            suggestions.append(suggestion)
+    return suggestions
+
+def explain_worker(job):
+    # runs in a background thread, the result is picked up by poll_explain
+    try:
+        conn = take_tab_connection(job["session"], job["db"]) # sees the tables of the tab's transaction
+    except mysql.connector.Error as err:
+        job["queue"].put(("connect_error", err))
+        return
+    cursor = conn.cursor(buffered=True)
+    try:
+        result = {}
+        cursor.execute("EXPLAIN FORMAT=JSON " + job["statement"])
+        plan_json = cursor.fetchone()[0]
+        result["plan"] = json.loads(plan_json.decode() if isinstance(plan_json, (bytes, bytearray)) else plan_json)
+        # EXPLAIN ANALYZE runs the query, only for SELECTs and only where the server has it (MySQL 8.0.18+)
+        version = conn.get_server_version() or ()
+        is_mariadb = "mariadb" in (conn.get_server_info() or "").lower()
+        if not is_mariadb and tuple(version) >= (8, 0, 18) and re.match(r"\s*(SELECT|WITH)\b", job["statement"], re.IGNORECASE):
+            start_time = time.time()
+            cursor.execute("EXPLAIN ANALYZE " + job["statement"])
+            result["analyze"] = "\n".join(str(row[0]) for row in cursor.fetchall())
+            result["analyze_duration"] = time.time() - start_time
+        try:
+            result["suggestions"] = suggest_indexes(result["plan"], job["statement"], get_schema(conn, job["db"]))
+        except mysql.connector.Error:
+            result["suggestions"] = []
+        job["queue"].put(("done", result))
     except mysql.connector.Error as err:
+        job["queue"].put(("error", err))
+    finally:
+        return_tab_connection(job["session"], conn, cursor)
+
+def explain_query(event=None):
+    """F6: shows the execution plan of the statement under the cursor in the side panel."""
+    db_name = selected_db.get()
+    if not db_name:
+        messagebox.showwarning("warning", "please choose a database.")
+        return
+    _, statement = current_completion_context()
+    statements = split_sql_statements(statement)
+    if not statements:
+        messagebox.showwarning("warning", "please enter an SQL query.")
+        return
+    job = {"statement": statements[0], "db": db_name, "session": ACTIVE_SESSION, "queue": queue.Queue(), "start": time.time()}
+    feedback_label.config(text="Explaining query...")
+    threading.Thread(target=explain_worker, args=(job,), daemon=True).start()
+    root.after(RENDER_INTERVAL_MS, poll_explain, job)
+    return "break"
+
+def poll_explain(job):
+    try:
+        message = job["queue"].get_nowait()
+    except queue.Empty:
+        root.after(RENDER_INTERVAL_MS, poll_explain, job)
+        return
+    if message[0] == "connect_error":
         feedback_label.config(text="")
-        # Die ursprüngliche Fehlerbehandlung (wie in Ihrer Vorlage)
-        error_message = str(err)
-        error_message = error_message[(error_message.find(';')+2):]
-        show_message_box(error_message)
-        
+        format_and_display_error(message[1])
+    elif message[0] == "error":
+        feedback_label.config(text="")
+        error_message = str(message[1])
+        show_message_box(f"EXPLAIN failed: {error_message[(error_message.find(';')+2):]}")
+    else:
+        show_explain_result(message[1])
+        feedback_label.config(text=f"Plan loaded ({time.time() - job['start']:.3f} sec)")
+
+def plan_table_label(table):
+    """One line summary of a table access, returns (label, tags)."""
+    access_type = table.get("access_type", "?")
+    label = f"{table.get('table_name', '?')}: {access_type}"
+    if table.get("key"):
+        label += f" on {table['key']}"
+    examined = table.get("rows_examined_per_scan")
+    produced = table.get("rows_produced_per_join")
+    tags = ()
+    if examined is not None and produced is not None:
+        label += f", rows examined {examined}, produced {produced}"
+        if examined > 1000 and produced < examined / 10:
+            tags = ("note",) # most examined rows are thrown away again
+    if access_type == "ALL":
+        label += "  (full table scan)"
+        tags = ("warning",)
+    return label, tags
+
+def insert_plan_node(parent, key, value):
+    """Adds a json plan node to the explain tree, recursively."""
+    if isinstance(value, dict):
+        if key == "table":
+            label, tags = plan_table_label(value)
+        else:
+            label, tags = key, ()
+        item = explain_tree.insert(parent, "end", text=label, values=("",), open=key not in ("cost_info", "used_columns"), tags=tags)
+        for child_key, child_value in value.items():
+            insert_plan_node(item, child_key, child_value)
+    elif isinstance(value, list):
+        if all(isinstance(element, dict) for element in value):
+            item = explain_tree.insert(parent, "end", text=key, values=("",), open=True)
+            for element in value:
+                for child_key, child_value in element.items():
+                    insert_plan_node(item, child_key, child_value)
+        else:
+            explain_tree.insert(parent, "end", text=key, values=(", ".join(map(str, value)),))
+    else:
+        warn = (key in ("using_filesort", "using_temporary_table") and value is True) or (key == "access_type" and value == "ALL")
+        explain_tree.insert(parent, "end", text=key, values=(str(value),), tags=("warning",) if warn else ())
+
+ANALYZE_ROWS_PATTERN = re.compile(r"\(cost=[^)]*rows=([\d.e+]+)\) \(actual time=[^)]*rows=([\d.e+]+) loops=(\d+)\)")
+
+def insert_analyze_lines(parent, text):
+    """Adds the indented EXPLAIN ANALYZE tree ("-> ..." lines) to the explain tree."""
+    stack = [(-1, parent)]
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        indent = len(line) - len(line.lstrip())
+        while stack[-1][0] >= indent:
+            stack.pop()
+        content = line.strip().lstrip("-> ")
+        tags = ()
+        match = ANALYZE_ROWS_PATTERN.search(content)
+        if match:
+            estimated, actual = float(match.group(1)), float(match.group(2))
+            if max(estimated, actual) > 100 and max(estimated, actual) > 10 * max(min(estimated, actual), 1):
+                tags = ("note",) # estimate far off, statistics may be stale
+        if content.startswith("Table scan") or content.startswith("Sort") or "temporary" in content:
+            tags = ("warning",)
+        item = explain_tree.insert(stack[-1][1], "end", text=content, values=("",), open=True, tags=tags)
+        stack.append((indent, item))
+
+def show_explain_result(result):
+    """Fills the explain panel and shows it next to the editor."""
+    explain_tree.delete(*explain_tree.get_children())
+    if result["suggestions"]:
+        suggestions = explain_tree.insert("", "end", text="Index suggestions", values=("",), open=True)
+        for suggestion in result["suggestions"]:
+            explain_tree.insert(suggestions, "end", text=suggestion, values=("",), tags=("suggestion",))
+    plan = explain_tree.insert("", "end", text="EXPLAIN FORMAT=JSON", values=("",), open=True)
+    for key, value in result["plan"].items():
+        insert_plan_node(plan, key, value)
+    if "analyze" in result:
+        analyze = explain_tree.insert(
+            "", "end", text=f"EXPLAIN ANALYZE ({result['analyze_duration']:.3f} sec)", values=("",), open=True
+        )
+        insert_analyze_lines(analyze, result["analyze"])
+    if str(explain_frame) not in main_paned.panes():
+        main_paned.add(explain_frame, weight=1)
+
+def close_explain_panel():
+    if str(explain_frame) in main_paned.panes():
+        main_paned.forget(explain_frame)
+
+# SHOW SESSION STATUS counters that explain where the server spent its work
+PROFILE_STATUS_FILTER = (
+    "Variable_name LIKE 'Handler_read%' OR Variable_name IN "
+    "('Created_tmp_disk_tables', 'Created_tmp_tables', 'Sort_merge_passes', 'Sort_rows', 'Select_scan', 'Select_full_join')"
+)
+
+def read_session_status(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SHOW SESSION STATUS WHERE " + PROFILE_STATUS_FILTER)
+        status = {}
+        for name, value in cursor.fetchall():
+            name = name.decode() if isinstance(name, (bytes, bytearray)) else name
+            status[name] = int(value.decode() if isinstance(value, (bytes, bytearray)) else value)
+        return status
+    finally:
+        cursor.close()
+
+def start_server_profile(conn, profile):
+    """Takes the status snapshot and the performance_schema marker before the statement (worker thread).
+
+    The status is read twice, the difference is what one SHOW SESSION STATUS costs itself
+    and is subtracted from the final delta.
+    """
+    try:
+        first = read_session_status(conn)
+        profile["status_before"] = read_session_status(conn)
+        profile["status_overhead"] = {name: value - first.get(name, 0) for name, value in profile["status_before"].items()}
+    except mysql.connector.Error as err:
+        profile["status_error"] = str(err)
+    cursor = conn.cursor(buffered=True)
+    try:
+        cursor.execute("SELECT THREAD_ID FROM performance_schema.threads WHERE PROCESSLIST_ID = CONNECTION_ID()")
+        profile["thread_id"] = cursor.fetchone()[0]
+        # the marker is the EVENT_ID of this SELECT itself, it ends up in the history too
+        cursor.execute(
+            "SELECT EVENT_ID FROM performance_schema.events_statements_current WHERE THREAD_ID = %s",
+            (profile["thread_id"],)
+        )
+        profile["event_marker"] = cursor.fetchone()[0]
+    except (mysql.connector.Error, TypeError) as err:
+        profile["stages_error"] = f"performance_schema not available: {err}"
+    finally:
+        cursor.close()
+
+def finish_server_profile(conn, profile):
+    """Status deltas and stage events of the statement, after its result was read completely (worker thread)."""
+    if "status_before" in profile:
+        try:
+            after = read_session_status(conn)
+            before, overhead = profile["status_before"], profile["status_overhead"]
+            profile["status"] = {name: after[name] - before.get(name, 0) - overhead.get(name, 0) for name in after}
+        except mysql.connector.Error as err:
+            profile["status_error"] = str(err)
+    if "event_marker" not in profile:
+        return
+    cursor = conn.cursor(buffered=True)
+    try:
+        # the first statement that ended after the marker query is the profiled one
+        cursor.execute(
+            "SELECT EVENT_ID FROM performance_schema.events_statements_history "
+            "WHERE THREAD_ID = %s AND EVENT_ID > %s ORDER BY EVENT_ID LIMIT 1",
+            (profile["thread_id"], profile["event_marker"])
+        )
+        row = cursor.fetchone()
+        if row:
+            cursor.execute(
+                "SELECT EVENT_NAME, TIMER_WAIT / 1000000000000 FROM performance_schema.events_stages_history_long "
+                "WHERE THREAD_ID = %s AND NESTING_EVENT_ID = %s ORDER BY EVENT_ID",
+                (profile["thread_id"], row[0])
+            )
+            profile["stages"] = [(str(name).replace("stage/sql/", ""), float(seconds or 0)) for name, seconds in cursor.fetchall()]
+        if not profile.get("stages"):
+            profile["stages_error"] = "no stage events recorded, enable the events_stages_history_long consumer"
+    except mysql.connector.Error as err:
+        profile["stages_error"] = f"performance_schema not available: {err}"
     finally:
-        # Cursor und Verbindung schließen, falls sie nicht bereits für den Auto-Select geschlossen wurden
-        if 'cursor' in locals() and cursor is not None:
-             cursor.close()
-        if 'conn' in locals() and conn is not None:
-             conn.close()
+        cursor.close()
+
+def new_profile(server):
+    """Per run timings, filled by the worker thread (connect, execute, fetch) and the tk thread (conversion, render)."""
+    return {
+        "server": server,  # also capture session status deltas and stage events
+        "phases": {"connect": 0.0, "execute": 0.0, "fetch": 0.0, "conversion": 0.0, "render": 0.0},
+    }
+
+def show_profile(job):
+    """Puts the profile of a finished run into the profiler panel."""
+    global LAST_PROFILE
+    profile = job["profile"]
+    profile["phases"]["connect"] = job["connect_duration"]
+    LAST_PROFILE = {
+        "query": job["query"],
+        "db": job["db"],
+        "started_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(job["start"])),
+        "rows": job["rows"],
+        "phases": profile["phases"],
+        "status": {name: value for name, value in profile.get("status", {}).items() if value},
+        "stages": profile.get("stages", []),
+    }
+    for key in ("status_error", "stages_error"):
+        if key in profile:
+            LAST_PROFILE[key] = profile[key]
+
+    profile_tree.delete(*profile_tree.get_children())
+    total = sum(profile["phases"].values()) or 1
+    phases = profile_tree.insert("", "end", text=f"phases ({sum(profile['phases'].values()):.3f} sec)", values=("",), open=True)
+    slowest = max(profile["phases"], key=profile["phases"].get)
+    for name, seconds in profile["phases"].items():
+        profile_tree.insert(
+            phases, "end", text=name, values=(f"{seconds:.4f} sec  {seconds / total:5.1%}",),
+            tags=("slowest",) if name == slowest and seconds else ()
+        )
+    if profile["server"]:
+        status = profile_tree.insert("", "end", text="session status delta", values=("",), open=True)
+        if "status_error" in profile:
+            profile_tree.insert(status, "end", text=profile["status_error"], values=("",))
+        for name, value in LAST_PROFILE["status"].items():
+            warn = (name in ("Created_tmp_disk_tables", "Sort_merge_passes") or name == "Handler_read_rnd_next" and value > 10000)
+            profile_tree.insert(status, "end", text=name, values=(value,), tags=("warning",) if warn else ())
+        stages = profile_tree.insert("", "end", text="performance_schema stages", values=("",), open=False)
+        if "stages_error" in profile:
+            profile_tree.insert(stages, "end", text=profile["stages_error"], values=("",))
+        for name, seconds in LAST_PROFILE["stages"]:
+            profile_tree.insert(stages, "end", text=name, values=(f"{seconds:.6f} sec",))
+    if str(profile_frame) not in paned_window.panes():
+        paned_window.add(profile_frame, weight=0)
+
+def toggle_profile_panel():
+    # collapses the panel to its header line and back
+    if profile_body.winfo_manager():
+        profile_body.pack_forget()
+        btn_profile_toggle.config(text="▸ Profiler")
+    else:
+        profile_body.pack(expand=True, fill="both")
+        btn_profile_toggle.config(text="▾ Profiler")
+
+def export_profile():
+    if LAST_PROFILE is None:
+        messagebox.showinfo("Info", "Nothing profiled yet.")
+        return
+    file_path = filedialog.asksaveasfilename(
+        defaultextension=".json", filetypes=[("JSON", "*.json"), ("All files", "*.*")], title="Export profile"
+    )
+    if not file_path:
+        return
+    try:
+        with open(file_path, "w", encoding="utf-8") as file:
+            json.dump(LAST_PROFILE, file, indent=2, default=str)
+        feedback_label.config(text=f"Profile written to {file_path}")
+    except OSError as err:
+        messagebox.showerror("Error", f"Could not write the profile: {err}")
+
+def log_script_line(line):
+    """Appends a line to the script log and shows the log pane if it is hidden."""
+    if str(script_log_frame) not in paned_window.panes():
+        paned_window.add(script_log_frame, weight=0)
+    script_log.config(state=tk.NORMAL)
+    script_log.insert(tk.END, line + "\n")
+    script_log.see(tk.END)
+    script_log.config(state=tk.DISABLED)
+
+def execute_query(force_refresh=False):
+    global ACTIVE_QUERY, PAGED_RESULT
+    query = sql_entry.get("1.0", tk.END).strip()
+    if not query:
+        messagebox.showwarning("warning", "please enter an SQL query.")
+        return
+
+    db_name = selected_db.get()
+    if not db_name:
+        messagebox.showwarning("warning", "please choose a database.")
+        return
+
+    if ACTIVE_QUERY is not None and ACTIVE_QUERY["phase"] == "executing":
+        messagebox.showwarning("warning", "a query is still running, cancel it first (Esc).")
+        return
+
+    if PENDING_EDITS and not messagebox.askyesno(
+        "Pending changes", f"{pending_edit_count()} changes in the grid are not committed. Discard them?"
+    ):
+        return
+
+    cancel_result_stream()
+    PAGED_RESULT = None
+    if paged_results.get():
+        statements = split_sql_statements(query)
+        parts = parse_simple_select(statements[0]) if len(statements) == 1 else None
+        if parts:
+            start_paged_query(query, db_name, parts)
+            return
+
+    job = {
+        "query": query,
+        "cache_key": None,
+        "db": db_name,
+        "queue": queue.Queue(),
+        "stop": threading.Event(),
+        "lock": threading.Lock(),
+        "phase": "executing",  # executing -> loading (result set streaming in)
+        "connection_id": None,
+        "start": time.time(),
+        "connect_duration": 0.0,
+        "duration": 0.0,
+        "rows": 0,
+        "transaction": script_transaction.get(),
+        "profile": new_profile(profile_enabled.get()),
+        "edit_target": None,  # set by the worker when the result can be edited in the grid
+        "session": ACTIVE_SESSION,
+        "store": None,  # columns and rows collected while the tab is in the background
+        "held": [],     # other messages that arrived meanwhile
+        "own_transaction": False,     # the worker started a transaction (script/auto-SELECT), not the user
+        "connection_returned": False,
+    }
+
+    # inside a transaction the tab sees its own uncommitted rows, they are neither served from nor put into the cache
+    if result_cache_enabled.get() and not ACTIVE_SESSION["in_transaction"]:
+        statements = split_sql_statements(query)
+        if len(statements) == 1 and is_cacheable_select(statements[0]):
+            job["cache_key"] = (db_name, normalize_sql(statements[0]))
+            entry = None if force_refresh else result_cache_lookup(job["cache_key"])
+            if entry is not None:
+                show_cached_result(job, entry)
+                return
+
+    ACTIVE_QUERY = job
+    set_query_running(True)
+    threading.Thread(target=query_worker, args=(job,), daemon=True).start()
+    root.after(RENDER_INTERVAL_MS, poll_query_job, job)
+
+def new_session_state():
+    return {
+        "RESULT_STORE": {"columns": [], "data": [], "rows": 0},
+        "VIEW_OFFSET": 0,
+        "VIEW_ROWS": None,
+        "SORT_STATE": None,
+        "COLUMN_FILTERS": {},
+        "ACTIVE_QUERY": None,
+        "PAGED_RESULT": None,
+        "EDIT_TARGET": None,
+        "PENDING_EDITS": {},
+        "PREVIOUS_RESULT": None,
+        "HISTORY_POSITION": None,
+        "HIGHLIGHT_LINE_STATES": [None],
+        "HIGHLIGHT_DIRTY": set(),
+    }
+
+def session_state(session):
+    """The tab's part of the globals, live for the selected tab and stored for the others."""
+    if session is ACTIVE_SESSION:
+        return {name: globals()[name] for name in SESSION_GLOBALS}
+    return session["state"]
+
+def update_tab_title(session, marker=""):
+    transaction = " (open transaction)" if session["in_transaction"] else ""
+    editor_tabs.tab(session["frame"], text=f"{marker}{session['name']}{transaction}")
+
+def show_transaction_state(job):
+    # the worker hands its connection back to the tab right after its last message
+    if not job["connection_returned"]:
+        root.after(RENDER_INTERVAL_MS, show_transaction_state, job)
+        return
+    if job["session"] in SESSIONS:
+        update_tab_title(job["session"])
+
+def wait_for_tab(session, poll, *args):
+    """Results of a tab in the background wait until it is selected again, True if the caller has to stop here."""
+    if session is ACTIVE_SESSION:
+        return False
+    if session in SESSIONS:
+        root.after(BACKGROUND_POLL_MS, poll, *args)
+    return True
+
+def store_session_state(session):
+    """Moves the state of the selected tab out of the globals. Only the column store and the row
+    order stay, the tree items are deleted and the sort/filter caches are rebuilt when needed."""
+    finish_cell_edit(save=True)
+    close_completions()
+    if FILTER_AFTER_ID is not None:
+        root.after_cancel(FILTER_AFTER_ID)
+        apply_quick_filter()
+    session["state"] = {name: globals()[name] for name in SESSION_GLOBALS}
+    session["db"] = selected_db.get()
+    session["feedback"] = feedback_label.cget("text")
+    session["filter"] = (filter_column.get(), filter_text.get())
+    session["column_widths"] = [tree.column(column, "width") for column in tree["columns"]]
+    SORT_CACHE.clear()
+    FILTER_TEXT_CACHE.clear()
+    tree.delete(*tree.get_children())
+    busy = ACTIVE_QUERY is not None or (PAGED_RESULT is not None and PAGED_RESULT["loading"])
+    update_tab_title(session, "\u2026 " if busy else "")
+
+def restore_session_state(session):
+    """Puts the stored state of a tab back into the globals and shows its editor, result and feedback."""
+    global ACTIVE_SESSION, sql_entry
+    globals().update(session["state"])
+    session["state"] = None
+    ACTIVE_SESSION = session
+    sql_entry = session["editor"]
+    if session["db"]:
+        selected_db.set(session["db"])
+
+    columns = RESULT_STORE["columns"]
+    configure_tree_columns(columns, session["column_widths"])
+    update_sort_headings()
+    filter_column.config(values=list(columns))
+    filter_column.set(session["filter"][0])
+    filter_text.set(session["filter"][1]) # the same text as the active filter, so nothing is recomputed
+    update_edit_bar()
+    feedback_label.config(text=session["feedback"])
+    paging_started = PAGED_RESULT is not None and PAGED_RESULT["loading"] and not PAGED_RESULT["loaded"]
+    set_query_running((ACTIVE_QUERY is not None and ACTIVE_QUERY["phase"] == "executing") or paging_started)
+    update_history_buttons()
+    update_tab_title(session)
+    if HIGHLIGHT_DIRTY:
+        schedule_highlight(1)
+    root.after_idle(refresh_result_view) # the tree has its size only after the next layout pass
+    sql_entry.focus_set()
+
+def activate_session(session):
+    if session is ACTIVE_SESSION:
+        return
+    if ACTIVE_SESSION is not None:
+        store_session_state(ACTIVE_SESSION)
+    restore_session_state(session)
+    editor_tabs.select(session["frame"])
+
+def on_tab_changed(event):
+    selected = editor_tabs.select()
+    for session in SESSIONS:
+        if str(session["frame"]) == selected:
+            activate_session(session)
+
+def new_session(event=None):
+    """Opens a query tab with its own editor, history, result and connection (Ctrl+T)."""
+    number = next(SESSION_NUMBERS)
+    frame = tk.Frame(editor_tabs)
+    editor = tk.Text(frame, height=10)
+    editor.pack(expand=True, fill="both") # Fill the frame
+    for kind, options in HIGHLIGHT_COLORS.items():
+        editor.tag_configure(kind, **options)
+    editor.tag_raise("sel")
+    install_edit_hook(editor, on_sql_entry_edit)
+    editor.bind("<Control-space>", show_completions)
+    for key in ("<Up>", "<Down>", "<Return>", "<Tab>", "<Escape>"):
+        editor.bind(key, on_completion_key)
+    editor.bind("<KeyRelease>", on_completion_typing)
+    editor.bind("<FocusOut>", lambda event: root.after(150, close_completions_without_focus))
+    editor.bind("<Button-1>", close_completions, add="+")
+    # the text class binds Ctrl+T to transpose, the tab bindings have to win
+    editor.bind("<Control-t>", new_session)
+    editor.bind("<Control-w>", close_session)
+
+    session = {
+        "name": f"Query {number}",
+        "key": f"{os.getpid()}:{number}",  # marks the history entries of this tab
+        "opened_at": time.time(),  # F1/F2 show runs of other tabs only from before this
+        "frame": frame,
+        "editor": editor,
+        "db": selected_db.get(),
+        "feedback": "",
+        "filter": ("", ""),
+        "column_widths": [],
+        "state": new_session_state(),
+        "connection": None,  # (connection, last used) kept between the queries of the tab
+        "in_transaction": False,  # the kept connection has an open transaction
+        "transaction_tables": set(),  # tables written in that transaction, None = unknown (CALL, LOAD)
+        "lock": threading.Lock(),
+        "closed": False,
+    }
+    SESSIONS.append(session)
+    editor_tabs.add(frame, text=session["name"])
+    activate_session(session)
+    return "break"
+
+def release_session(session):
+    """Stops the work of a closed tab and gives back its connection and temp files."""
+    state = session_state(session)
+    job = state["ACTIVE_QUERY"]
+    if job is not None:
+        job["stop"].set()
+        if job["phase"] == "executing":
+            threading.Thread(target=kill_running_query, args=(job,), daemon=True).start()
+    drop_snapshot(state["PREVIOUS_RESULT"])
+    with session["lock"]:
+        session["closed"] = True
+        kept, session["connection"] = session["connection"], None
+    if kept is not None:
+        release_connection(kept[0])
+
+def close_session(event=None, session=None):
+    """Closes the selected tab (Ctrl+W), the last tab stays open."""
+    session = session or ACTIVE_SESSION
+    if len(SESSIONS) < 2:
+        return "break"
+    pending = session_state(session)["PENDING_EDITS"]
+    if pending and not messagebox.askyesno(
+        "Pending changes", f"{session['name']} has {sum(len(edits) for edits in pending.values())} uncommitted changes in the grid. Close it anyway?"
+    ):
+        return "break"
+    if session["in_transaction"] and not messagebox.askyesno(
+        "Open transaction", f"{session['name']} has an open transaction, closing the tab rolls it back. Close it anyway?"
+    ):
+        return "break"
+    if session is ACTIVE_SESSION:
+        position = SESSIONS.index(session)
+        activate_session(SESSIONS[position + 1] if position + 1 < len(SESSIONS) else SESSIONS[position - 1])
+    release_session(session)
+    SESSIONS.remove(session)
+    editor_tabs.forget(session["frame"])
+    session["frame"].destroy()
+    return "break"
+
+def close_tab_under_mouse(event):
+    # middle click on a tab closes it
+    try:
+        index = editor_tabs.index(f"@{event.x},{event.y}")
+    except tk.TclError:
+        return # not on a tab
+    if isinstance(index, int) and index < len(SESSIONS):
+        close_session(session=SESSIONS[index])
+
+def install_edit_hook(text_widget, callback):
+    """Wraps the tcl command of a text widget so callback(first_line, line_delta) runs after every
+    insert/delete/replace, no matter if it came from typing, pasting or the code."""
+    widget_command = text_widget._w
+    original_command = widget_command + "_orig"
+    text_widget.tk.call("rename", widget_command, original_command)
+
+    def proxy(*args):
+        if args and args[0] in ("insert", "delete", "replace"):
+            lines_before = int(text_widget.tk.call(original_command, "index", "end-1c").split(".")[0])
+            first_line = int(text_widget.tk.call(original_command, "index", args[1]).split(".")[0])
+            result = text_widget.tk.call((original_command,) + args)
+            lines_after = int(text_widget.tk.call(original_command, "index", "end-1c").split(".")[0])
+            callback(min(first_line, lines_before), lines_after - lines_before)
+            return result
+        return text_widget.tk.call((original_command,) + args)
+
+    text_widget.tk.createcommand(widget_command, proxy)
+
+def on_sql_entry_edit(first_line, line_delta):
+    # keep the per-line states aligned with the text and mark the touched lines
+    global HIGHLIGHT_DIRTY
+    # the old end state of the edited line belongs to the last line of the edited range
+    if line_delta > 0:
+        HIGHLIGHT_LINE_STATES[first_line - 1:first_line - 1] = [None] * line_delta
+    elif line_delta < 0:
+        del HIGHLIGHT_LINE_STATES[first_line - 1:first_line - 1 - line_delta]
+    if line_delta and HIGHLIGHT_DIRTY:
+        # pending lines below the edit moved
+        HIGHLIGHT_DIRTY = {line if line <= first_line else max(first_line, line + line_delta) for line in HIGHLIGHT_DIRTY}
+    HIGHLIGHT_DIRTY.update(range(first_line, first_line + max(line_delta, 0) + 1))
+    schedule_highlight(HIGHLIGHT_DEBOUNCE_MS)
+
+def schedule_highlight(delay):
+    global HIGHLIGHT_AFTER_ID
+    if HIGHLIGHT_AFTER_ID is None:
+        HIGHLIGHT_AFTER_ID = root.after(delay, highlight_dirty_lines)
+
+def highlight_dirty_lines():
+    """Lexes the dirty lines in order and applies the tags in one batch per tag.
+
+    A line is lexed with the end state of the line above, if its own end state changes
+    (e.g. a comment was opened) the next line becomes dirty too, so multiline comments and
+    strings are carried over without lexing the whole script.
+    """
+    global HIGHLIGHT_AFTER_ID, HIGHLIGHT_LINE_STATES
+    HIGHLIGHT_AFTER_ID = None
+    line_count = int(sql_entry.index("end-1c").split(".")[0])
+    if len(HIGHLIGHT_LINE_STATES) != line_count:
+        # should not happen, but a full pass is always correct
+        HIGHLIGHT_LINE_STATES = [None] * line_count
+        HIGHLIGHT_DIRTY.update(range(1, line_count + 1))
+
+    HIGHLIGHT_DIRTY.difference_update([line for line in HIGHLIGHT_DIRTY if line > line_count])
+
+    ranges = {kind: [] for kind in HIGHLIGHT_COLORS}
+    lexed_runs = []  # (first, last) line of consecutive lexed lines, their old tags are removed at once
+    processed = 0
+    while HIGHLIGHT_DIRTY and processed < HIGHLIGHT_LINES_PER_TICK:
+        line = min(HIGHLIGHT_DIRTY)
+        # read the dirty run in one call instead of one call per line
+        run_end = line
+        while run_end + 1 in HIGHLIGHT_DIRTY and run_end - line + 1 < HIGHLIGHT_LINES_PER_TICK - processed:
+            run_end += 1
+        texts = sql_entry.get(f"{line}.0", f"{run_end}.end").split("\n")
+        current = line
+        while True:
+            if current - line >= len(texts):
+                texts.append(sql_entry.get(f"{current}.0", f"{current}.end"))
+            HIGHLIGHT_DIRTY.discard(current)
+            state = HIGHLIGHT_LINE_STATES[current - 2] if current > 1 else None
+            spans, end_state = lex_line(texts[current - line], state)
+            for kind, start, end in spans:
+                ranges[kind].extend((f"{current}.{start}", f"{current}.{end}"))
+            processed += 1
+            if HIGHLIGHT_LINE_STATES[current - 1] != end_state and current < line_count:
+                HIGHLIGHT_DIRTY.add(current + 1) # an opened/closed comment or string continues below
+            HIGHLIGHT_LINE_STATES[current - 1] = end_state
+            if current + 1 not in HIGHLIGHT_DIRTY or processed >= HIGHLIGHT_LINES_PER_TICK:
+                break
+            current += 1
+        lexed_runs.append((line, current))
+
+    for first, last in lexed_runs:
+        for kind in HIGHLIGHT_COLORS:
+            sql_entry.tag_remove(kind, f"{first}.0", f"{last}.end")
+    for kind, indices in ranges.items():
+        if indices:
+            sql_entry.tag_add(kind, *indices)
+    if HIGHLIGHT_DIRTY:
+        schedule_highlight(1) # rest of a big paste, the gui handles events in between
 
 def show_message_box(message):
     message_box = tk.Toplevel(root)
@@ -568,6 +3653,23 @@ db_dropdown.pack(side="left")
 btn_desc_all = tk.Button(db_frame, text="DESC All Tables", command=describe_all_tables)
 btn_desc_all.pack(side="left", padx=(10, 5))
 
+btn_refresh_schema = tk.Button(db_frame, text="Refresh Schema", command=refresh_schema)
+btn_refresh_schema.pack(side="left", padx=5)
+
+btn_import = tk.Button(db_frame, text="Import CSV into table...", command=import_csv)
+btn_import.pack(side="left", padx=5)
+
+btn_export_query = tk.Button(db_frame, text="Export query result to file...", command=export_query_to_file)
+btn_export_query.pack(side="left", padx=5)
+
+btn_close_tab = tk.Button(db_frame, text="Close Tab (Ctrl+W)", command=close_session)
+btn_close_tab.pack(side="right", padx=(5, 0))
+
+btn_new_tab = tk.Button(db_frame, text="New Tab (Ctrl+T)", command=new_session)
+btn_new_tab.pack(side="right", padx=5)
+
+import_progress = ttk.Progressbar(db_frame, length=150, maximum=100) # only shown while importing
+
 btn_frame = tk.Frame(root)
 btn_frame.pack(pady=5)
 
@@ -580,20 +3682,48 @@ btn_forward.pack(side="left", padx=5)
 btn_execute = tk.Button(btn_frame, text="Run Query (F5)", command=execute_query)
 btn_execute.pack(side="left", padx=5)
 
+btn_cancel = tk.Button(btn_frame, text="Cancel (Esc)", command=cancel_query, state=tk.DISABLED)
+btn_cancel.pack(side="left", padx=5)
+
 btn_beautify = tk.Button(btn_frame, text="Beautify Query (F9)", command=beautify)
 btn_beautify.pack(side="left", padx=5)
 
-paned_window = ttk.PanedWindow(root, orient=tk.VERTICAL)
-paned_window.pack(expand=True, fill="both", padx=10, pady=(0, 10))
+btn_explain = tk.Button(btn_frame, text="Explain (F6)", command=explain_query)
+btn_explain.pack(side="left", padx=5)
 
-sql_entry_frame = tk.Frame(paned_window)
-sql_entry = tk.Text(sql_entry_frame, height=10)
-sql_entry.pack(expand=True, fill="both") # Fill the frame
-sql_entry.insert("1.0", "SHOW TABLES")
+btn_compare = tk.Button(btn_frame, text="Compare with previous", command=compare_with_previous)
+btn_compare.pack(side="left", padx=5)
+
+script_transaction = tk.BooleanVar(value=False)
+chk_transaction = tk.Checkbutton(btn_frame, text="Run script as one transaction", variable=script_transaction)
+chk_transaction.pack(side="left", padx=5)
+
+result_cache_enabled = tk.BooleanVar(value=False)
+chk_result_cache = tk.Checkbutton(btn_frame, text="Cache SELECT results", variable=result_cache_enabled)
+chk_result_cache.pack(side="left", padx=5)
+
+profile_enabled = tk.BooleanVar(value=False)
+chk_profile = tk.Checkbutton(btn_frame, text="Profile", variable=profile_enabled)
+chk_profile.pack(side="left", padx=5)
+
+paged_results = tk.BooleanVar(value=False)
+chk_paged = tk.Checkbutton(btn_frame, text="Paged results", variable=paged_results)
+chk_paged.pack(side="left", padx=5)
+
+# editor/results on the left, the explain panel is added on the right when it is used
+main_paned = ttk.PanedWindow(root, orient=tk.HORIZONTAL)
+main_paned.pack(expand=True, fill="both", padx=10, pady=(0, 10))
 
-add_query_to_history(sql_entry.get("1.0", tk.END).strip()) 
+paned_window = ttk.PanedWindow(main_paned, orient=tk.VERTICAL)
+main_paned.add(paned_window, weight=3)
 
-paned_window.add(sql_entry_frame, weight=0)
+# one editor per query tab (new_session), the grid below always shows the result of the selected tab
+editor_tabs = ttk.Notebook(paned_window)
+editor_tabs.bind("<<NotebookTabChanged>>", on_tab_changed)
+editor_tabs.bind("<Button-2>", close_tab_under_mouse)
+sql_entry = None  # editor of the selected tab
+
+paned_window.add(editor_tabs, weight=0)
 
 tree_frame = tk.Frame(paned_window)
 paned_window.add(tree_frame, weight=1) 
@@ -601,15 +3731,83 @@ paned_window.add(tree_frame, weight=1)
 tree_scroll = tk.Scrollbar(tree_frame)
 tree_scroll.pack(side="right", fill="y")
 
-tree = ttk.Treeview(tree_frame, yscrollcommand=tree_scroll.set)
+# quick filter over the loaded rows: column + text, filters on several columns are combined
+filter_bar = tk.Frame(tree_frame)
+filter_bar.pack(side="top", fill="x", before=tree_scroll)
+tk.Label(filter_bar, text="Filter").pack(side="left", padx=(5, 2))
+filter_column = ttk.Combobox(filter_bar, state="readonly", width=20)
+filter_column.pack(side="left")
+filter_column.bind("<<ComboboxSelected>>", on_filter_column_selected)
+filter_text = tk.StringVar()
+filter_entry = tk.Entry(filter_bar, textvariable=filter_text)
+filter_entry.pack(side="left", fill="x", expand=True, padx=2)
+filter_text.trace_add("write", schedule_filter)
+tk.Button(filter_bar, text="Clear filters", command=clear_quick_filters).pack(side="left", padx=(2, 5), pady=2)
+
+tree = ttk.Treeview(tree_frame)
 tree.pack(expand=True, fill="both")
-
-tree_scroll.config(command=tree.yview)
+tree.tag_configure("edited", background="#fff3b0")
+tree.tag_configure("diff_added", background="#d9f2d0")
+tree.tag_configure("diff_changed", background="#fde5b8")
+tree.tag_configure("diff_removed", background="#f6d0d0")
+
+# shown below the grid while the result is editable
+edit_bar = tk.Frame(tree_frame)
+edit_label = tk.Label(edit_bar, text="", anchor="w")
+edit_label.pack(side="left", padx=5)
+btn_rollback_edits = tk.Button(edit_bar, text="Rollback", command=rollback_edits, state=tk.DISABLED)
+btn_rollback_edits.pack(side="right", padx=5, pady=2)
+btn_commit_edits = tk.Button(edit_bar, text="Commit", command=commit_edits, state=tk.DISABLED)
+btn_commit_edits.pack(side="right", pady=2)
+
+# the scrollbar moves the window over the result store instead of scrolling the tree itself
+tree_scroll.config(command=on_tree_scrollbar)
+
+# per-statement log of multi-statement scripts, added to the paned window on the first script run
+script_log_frame = tk.Frame(paned_window)
+script_log = tk.Text(script_log_frame, height=6, state=tk.DISABLED, fg="gray")
+script_log.pack(expand=True, fill="both")
+
+# profiler panel, added to the paned window after the first profiled run
+profile_frame = tk.Frame(paned_window)
+profile_header = tk.Frame(profile_frame)
+profile_header.pack(fill="x")
+btn_profile_toggle = tk.Button(profile_header, text="▾ Profiler", relief="flat", command=toggle_profile_panel)
+btn_profile_toggle.pack(side="left")
+tk.Button(profile_header, text="Export JSON...", command=export_profile).pack(side="right")
+profile_body = tk.Frame(profile_frame)
+profile_body.pack(expand=True, fill="both")
+profile_tree = ttk.Treeview(profile_body, columns=("value",), show="tree", height=8)
+profile_tree.column("value", width=180, stretch=False)
+profile_tree.tag_configure("warning", foreground="red")
+profile_tree.tag_configure("slowest", foreground="blue")
+profile_tree.pack(expand=True, fill="both")
+
+explain_frame = tk.Frame(main_paned)
+explain_header = tk.Frame(explain_frame)
+explain_header.pack(fill="x")
+tk.Label(explain_header, text="Execution plan", anchor="w").pack(side="left")
+tk.Button(explain_header, text="close", command=close_explain_panel).pack(side="right")
+explain_tree = ttk.Treeview(explain_frame, columns=("value",), show="tree headings")
+explain_tree.heading("#0", text="plan")
+explain_tree.heading("value", text="value")
+explain_tree.column("value", width=120, stretch=False)
+explain_tree.tag_configure("warning", foreground="red")
+explain_tree.tag_configure("note", foreground="darkorange")
+explain_tree.tag_configure("suggestion", foreground="blue")
+explain_scroll = tk.Scrollbar(explain_frame, command=explain_tree.yview)
+explain_tree.config(yscrollcommand=explain_scroll.set)
+explain_scroll.pack(side="right", fill="y")
+explain_tree.pack(expand=True, fill="both")
 
 feedback_label = tk.Label(root, text="", anchor="w", fg="gray")
 feedback_label.pack(fill="x", padx=10, pady=(0, 10))
 
+selected_db.trace_add("write", lambda *args: load_completion_index(selected_db.get()))
 load_databases()
+new_session()
+sql_entry.insert("1.0", "SHOW TABLES")
+init_history_store()
 update_history_buttons()
 
 context_menu = tk.Menu(root, tearoff=0) # menu for right-click
@@ -633,9 +3831,14 @@ def show_context_menu(event):
         context_menu.add_separator()
 
     # always add these options
+    if item_id and column_id:
+        context_menu.add_command(label="Filter by this value", command=lambda: filter_by_cell(event))
     context_menu.add_command(label="Copy All Data (Tab separated)", command=copy_table_content)
     context_menu.add_separator()
     context_menu.add_command(label="Export to Excel (CSV)", command=export_to_excel)
+    context_menu.add_command(label="Export query result to file...", command=export_query_to_file)
+    context_menu.add_separator()
+    context_menu.add_command(label="Compare with previous result...", command=compare_with_previous)
 
     try:
         context_menu.post(event.x_root, event.y_root)
@@ -645,10 +3848,29 @@ def show_context_menu(event):
 # bind right-click
 tree.bind("<Button-3>", show_context_menu)
 
+# virtual scrolling
+tree.bind("<Configure>", lambda event: refresh_result_view())
+tree.bind("<MouseWheel>", on_tree_mousewheel)
+tree.bind("<Button-4>", on_tree_mousewheel)
+tree.bind("<Button-5>", on_tree_mousewheel)
+for key in ("<Up>", "<Down>", "<Prior>", "<Next>"):
+    tree.bind(key, on_tree_key)
+tree.bind("<Double-1>", begin_cell_edit)
+
 root.bind('<F5>', lambda event: execute_query()) 
+root.bind('<Shift-F5>', lambda event: execute_query(force_refresh=True)) # bypasses the result cache
+root.bind('<F6>', explain_query)
 root.bind('<F9>', lambda event: beautify())
+root.bind('<Escape>', cancel_query)
 root.bind('<F1>', lambda event: query_back())
 root.bind('<F2>', lambda event: query_forward())
+root.bind('<Control-r>', open_history_search)
+root.bind('<Control-t>', new_session)
+root.bind('<Control-w>', close_session)
 
 root.mainloop()
+flush_history() # the writer thread is a daemon, let it write the last entries
+for session in SESSIONS:
+    release_session(session)
+close_connection_pool()
 
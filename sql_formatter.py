@@ -0,0 +1,312 @@
+import re
+
+# keywords that beautify writes in upper case
+SQL_KEYWORDS = [
+    "select", "from", "where", "join", "inner", "left", "right", "on",
+    "group", "order", "by", "having", "limit", "offset", "insert", "into",
+    "values", "update", "set", "delete", "create", "table", "drop", "alter",
+    "add", "distinct", "union", "all", "as", "and", "or", "not", "in", "is",
+    "null", "like", "between", "exists", "case", "when", "then", "else", "end",
+    "sum", "avg", "min", "max", "count", "upper", "lower", "show", "desc", "asc",
+    "outer", "cross", "full", "natural", "using", "with", "database", "use",
+    "primary", "key", "foreign", "references", "default", "auto_increment", "unique",
+    "index", "if", "replace", "ignore", "duplicate", "truncate", "describe", "explain"
+]
+KEYWORD_SET = frozenset(SQL_KEYWORDS)
+
+# one regex for the whole text, tried left to right at every position -> a single linear pass
+TOKEN_PATTERN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<comment>(?:--(?=\s|$)|\#)[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<string>'(?:[^'\\]|\\.|'')*(?:'|\Z)|"(?:[^"\\]|\\.|"")*(?:"|\Z))
+  | (?P<ident>`(?:[^`]|``)*(?:`|\Z))
+  | (?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+)
+  | (?P<word>[A-Za-z_$][\w$]*|@@?[\w$.]+)
+  | (?P<op><=>|<=|>=|<>|!=|:=|\|\||&&|<<|>>|->>?|.)
+""", re.VERBOSE | re.DOTALL)
+
+CLAUSE_KEYWORDS = {"FROM", "WHERE", "HAVING", "LIMIT", "OFFSET", "VALUES", "SET"}
+JOIN_PREFIXES = {"INNER", "LEFT", "RIGHT", "CROSS", "FULL", "NATURAL", "OUTER", "STRAIGHT_JOIN"}
+# keywords after which "(" always gets a space, e.g. IN (1, 2) or VALUES (...), unlike function calls
+PAREN_SPACE_KEYWORDS = {"IN", "VALUES", "EXISTS", "AS", "ON", "USING", "FROM", "JOIN", "INTO", "AND", "OR", "NOT"}
+
+
+def tokenize_sql(text):
+    """Splits sql text into (kind, value) tokens in one pass.
+
+    kinds: space, comment, string, ident (backticks), number, word, op.
+    Strings, backtick identifiers and comments are single tokens, so nothing inside them
+    is ever treated as a keyword. Unterminated ones run to the end of the text.
+    """
+    return [(match.lastgroup, match.group()) for match in TOKEN_PATTERN.finditer(text)]
+
+
+def mark_multi_item_selects(tokens):
+    """Returns the token indices of SELECTs whose select list has more than one item.
+
+    Single pass with a stack per parenthesis level, so it stays linear.
+    """
+    multi = set()
+    open_selects = [None]  # per paren level: index of the SELECT whose list is still open
+    for index, (kind, value) in enumerate(tokens):
+        if kind == "op":
+            if value == "(":
+                open_selects.append(None)
+            elif value == ")" and len(open_selects) > 1:
+                open_selects.pop()
+            elif value == "," and open_selects[-1] is not None:
+                multi.add(open_selects[-1])
+            elif value == ";":
+                open_selects = [None]
+        elif kind == "word":
+            upper = value.upper()
+            if upper == "SELECT":
+                open_selects[-1] = index
+            elif upper in ("FROM", "INTO", "WHERE", "UNION", "GROUP", "ORDER", "HAVING", "LIMIT"):
+                open_selects[-1] = None
+    return multi
+
+
+def format_sql(text):
+    """Formats sql: keywords upper case, one clause per line, select lists one item per line,
+    JOIN ... ON, CASE blocks and subqueries indented. Runs in linear time over the token stream.
+    """
+    tokens = tokenize_sql(text.strip())
+    significant = [index for index, (kind, _) in enumerate(tokens) if kind not in ("space", "comment")]
+    next_significant = {}
+    for position, index in enumerate(significant):
+        next_significant[index] = significant[position + 1] if position + 1 < len(significant) else None
+    multi_item_selects = mark_multi_item_selects(tokens)
+
+    out = []
+    state = {
+        "indent": 0,          # indent of the current output line
+        "line_start": True,   # nothing written on the current line yet
+        "space": False,       # whitespace was seen since the last written token
+    }
+    base = 0                  # indent of the SELECT of the current (sub)query
+    select_items = None       # indent of select list items while inside a multi item select list
+    after_join = False        # ON gets its own line only right after a JOIN (or a joined subquery)
+    upsert = False            # after ON DUPLICATE KEY UPDATE, VALUES(col) there is a function, not a clause
+    values_function = False   # the last token was VALUES used as a function
+    frames = []               # open parentheses: (kind, saved base, saved select_items, line indent, saved after_join)
+    cases = []                # indents of open CASE blocks
+    statement_start = True
+    create_table = False      # inside CREATE TABLE, its first "(" holds the column definitions
+    previous = None           # (kind, upper value) of the last significant token
+
+    def newline(indent):
+        while out and out[-1] == " ":
+            out.pop()
+        if state["line_start"] and out:
+            out.pop() # an empty line was just started, replace it
+        out.append("\n" + " " * indent)
+        state["indent"] = indent
+        state["line_start"] = True
+        state["space"] = False
+
+    def emit(value, space_before=None):
+        if space_before is None:
+            space_before = state["space"]
+        if space_before and not state["line_start"]:
+            out.append(" ")
+        out.append(value)
+        state["line_start"] = False
+        state["space"] = False
+
+    def next_word(index, skip=0):
+        following = next_significant.get(index)
+        while following is not None and skip:
+            following = next_significant.get(following)
+            skip -= 1
+        if following is None or tokens[following][0] != "word":
+            return None
+        return tokens[following][1].upper()
+
+    in_query_level = lambda: not frames or frames[-1][0] == "subquery"
+
+    for index, (kind, value) in enumerate(tokens):
+        if kind == "space":
+            state["space"] = True
+            continue
+        if kind == "comment":
+            emit(value, space_before=True)
+            if not value.startswith("/*"):
+                newline(state["indent"]) # line comment, the next token must not end up inside it
+            continue
+
+        upper = value.upper() if kind == "word" else value
+        is_keyword = kind == "word" and upper.lower() in KEYWORD_SET and not (previous and previous[1] == ".")
+        if is_keyword:
+            value = upper
+
+        if kind == "op" and value == ";":
+            emit(";", space_before=False)
+            newline(0)
+            base, select_items, after_join, upsert = 0, None, False, False
+            frames, cases = [], []
+            statement_start, previous, create_table = True, None, False
+            continue
+
+        if kind == "op" and value == "(":
+            if next_word(index) in ("SELECT", "WITH"):
+                frame_kind = "subquery"
+            elif create_table and not frames:
+                frame_kind = "definitions"
+                create_table = False
+            else:
+                frame_kind = "paren"
+            space_before = state["space"] or (
+                previous is not None and previous[1] in PAREN_SPACE_KEYWORDS and not values_function
+            )
+            emit("(", space_before=space_before)
+            frames.append((frame_kind, base, select_items, state["indent"], after_join))
+            values_function = False
+            if frame_kind == "subquery":
+                base = state["indent"] + 4
+                select_items = None
+                after_join = False
+                newline(base)
+            elif frame_kind == "definitions":
+                newline(state["indent"] + 4)
+            previous = (kind, value)
+            continue
+
+        if kind == "op" and value == ")" and frames:
+            frame_kind, saved_base, saved_select_items, line_indent, saved_after_join = frames.pop()
+            if frame_kind != "paren":
+                newline(line_indent)
+            emit(")", space_before=False)
+            base, select_items, after_join = saved_base, saved_select_items, saved_after_join
+            previous = (kind, value)
+            continue
+
+        if kind == "op" and value == ",":
+            emit(",", space_before=False)
+            if select_items is not None and in_query_level() and not cases:
+                newline(select_items)
+            elif frames and frames[-1][0] == "definitions":
+                newline(frames[-1][3] + 4)
+            else:
+                state["space"] = True
+            previous = (kind, value)
+            continue
+
+        if kind == "word" and upper == "TABLE" and previous is not None and previous[1] in ("CREATE", "TEMPORARY"):
+            create_table = True
+        if kind == "word" and upper == "UPDATE" and previous is not None and previous[1] == "KEY":
+            upsert = True
+        # VALUES(col) in ON DUPLICATE KEY UPDATE or inside an expression (a = VALUES(a) + 1)
+        values_function = kind == "word" and upper == "VALUES" and (
+            upsert or (previous is not None and previous[0] == "op" and previous[1] != ")")
+        )
+
+        if kind == "word" and in_query_level():
+            if upper == "SELECT":
+                if not statement_start and previous is not None and previous[1] not in ("(",):
+                    newline(base)
+                emit(value)
+                if index in multi_item_selects:
+                    select_items = base + 4
+                    newline(select_items)
+                else:
+                    select_items = None
+                after_join = False
+                statement_start = False
+                previous = (kind, upper)
+                continue
+
+            starts_join = upper == "JOIN" and not (previous and previous[1] in JOIN_PREFIXES)
+            if upper in JOIN_PREFIXES and upper != "OUTER":
+                starts_join = "JOIN" in (next_word(index), next_word(index, 1))
+            if upper in ("GROUP", "ORDER") and next_word(index) == "BY":
+                select_items = None
+                newline(base + 2)
+            elif upper == "UNION":
+                select_items = None
+                newline(base)
+            elif starts_join:
+                select_items = None
+                after_join = True
+                newline(base + 2)
+            elif upper == "ON" and after_join and next_word(index) != "DUPLICATE":
+                newline(base + 4)
+                after_join = False
+            elif (upper in CLAUSE_KEYWORDS and not statement_start and not values_function
+                  and not (previous and previous[1] == "CHARACTER")):
+                select_items = None
+                after_join = False
+                newline(base + 2)
+
+        if kind == "word" and upper == "CASE":
+            emit(value)
+            cases.append(state["indent"])
+            previous = (kind, upper)
+            statement_start = False
+            continue
+        if kind == "word" and cases and upper in ("WHEN", "ELSE"):
+            newline(cases[-1] + 4)
+        elif kind == "word" and cases and upper == "END":
+            newline(cases.pop())
+
+        space_before = state["space"]
+        if kind == "op" and value == ".":
+            space_before = False
+        elif previous is not None and previous[1] in (".", "("):
+            space_before = False
+        emit(value, space_before=space_before)
+        statement_start = False
+        previous = (kind, upper)
+
+    return re.sub(r"[ \t]+\n", "\n", "".join(out)).strip()
+
+
+# --- line based lexing for the editor highlighting ---
+
+# rest of a construct that was opened on an earlier line, up to and including its end
+CONTINUATION_PATTERNS = {
+    "/*": re.compile(r".*?\*/"),
+    "'": re.compile(r"(?:[^'\\]|\\.|'')*'"),
+    '"': re.compile(r'(?:[^"\\]|\\.|"")*"'),
+    "`": re.compile(r"(?:[^`]|``)*`"),
+}
+CONTINUATION_KINDS = {"/*": "comment", "'": "string", '"': "string", "`": "ident"}
+
+
+def open_construct(kind, value):
+    """Returns the lexer state if a token at the end of a line is still open ("/*", quote, backtick), else None."""
+    if kind == "comment" and value.startswith("/*"):
+        return None if len(value) >= 4 and value.endswith("*/") else "/*"
+    if kind in ("string", "ident"):
+        quote = value[0]
+        return None if CONTINUATION_PATTERNS[quote].fullmatch(value[1:]) else quote
+    return None
+
+
+def lex_line(line, state=None):
+    """Lexes one editor line for highlighting.
+
+    state is the lexer state at the end of the previous line: None, or an open "/*", "'", '"' or "`".
+    Returns (spans, end_state) with spans as (kind, start column, end column) for keyword, string,
+    comment, number and ident tokens.
+    """
+    spans = []
+    position = 0
+    if state:
+        match = CONTINUATION_PATTERNS[state].match(line)
+        if not match:
+            return [(CONTINUATION_KINDS[state], 0, len(line))] if line else [], state
+        spans.append((CONTINUATION_KINDS[state], 0, match.end()))
+        position = match.end()
+
+    end_state = None
+    for match in TOKEN_PATTERN.finditer(line, position):
+        kind = match.lastgroup
+        if kind == "word":
+            if match.group().lower() in KEYWORD_SET:
+                spans.append(("keyword", match.start(), match.end()))
+        elif kind in ("string", "comment", "ident", "number"):
+            spans.append((kind, match.start(), match.end()))
+            if match.end() == len(line):
+                end_state = open_construct(kind, match.group())
+    return spans, end_state
@@ -0,0 +1,108 @@
+"""Headless runner for cron jobs and CI, no tkinter and no display needed.
+
+    python sqlgui.py run --db wws_test --file q.sql --out result.csv
+    python sqlgui.py run --db wws_test --query "SELECT * FROM kunden" --out kunden.jsonl.gz
+    python sqlgui.py describe --db wws_test
+    python sqlgui.py beautify --file q.sql
+
+Uses the same connection settings (MYSQL_PASSWORD, MYSQL_PORT...) and pool as the gui.
+"""
+import argparse
+import sys
+import time
+import mysql.connector
+import engine
+from sql_formatter import format_sql
+
+
+def read_sql(args):
+    if args.query is not None:
+        return args.query
+    if args.file == "-":
+        return sys.stdin.read()
+    with open(args.file, encoding="utf-8") as f:
+        return f.read()
+
+
+def log_statement(index, statement, duration, rows):
+    # progress goes to stderr, stdout may be the result itself
+    print(f"[{index}] {duration:8.3f} sec  {rows:>8} rows  {engine.statement_summary(statement)}", file=sys.stderr)
+
+
+def run_command(args):
+    statements = engine.split_sql_statements(read_sql(args))
+    if not statements:
+        print("no sql statements found", file=sys.stderr)
+        return 1
+    export_format = args.format or (engine.export_format_for(args.out) if args.out else "tsv")
+
+    start_time = time.time()
+    conn = engine.acquire_connection(args.db)
+    try:
+        if args.out:
+            with engine.open_export_file(args.out) as f:
+                total = engine.run_statements(conn, statements, f, export_format, log_statement)
+        else:
+            total = engine.run_statements(conn, statements, sys.stdout, export_format, log_statement)
+    finally:
+        engine.release_connection(conn)
+    target = f" -> {args.out}" if args.out else ""
+    print(f"done: {len(statements)} statements, {total} rows in {time.time() - start_time:.3f} sec{target}", file=sys.stderr)
+    return 0
+
+
+def describe_command(args):
+    conn = engine.acquire_connection(args.db)
+    try:
+        print(engine.describe_tables_text(engine.get_schema(conn, args.db)))
+    finally:
+        engine.release_connection(conn)
+    return 0
+
+
+def beautify_command(args):
+    print(format_sql(read_sql(args)))
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="sqlgui", description="Runs sql without the gui.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run a query or script and stream the last result set into a file")
+    run.add_argument("--db", required=True, help="database to use")
+    source = run.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", help="sql file, - for stdin")
+    source.add_argument("--query", help="sql text")
+    run.add_argument("--out", help="result file (.csv, .tsv, .jsonl, optionally .gz), default stdout")
+    run.add_argument("--format", choices=["csv", "tsv", "jsonl"], help="overrides the format taken from --out")
+    run.set_defaults(handler=run_command)
+
+    describe = commands.add_parser("describe", help="print DESCRIBE of all tables")
+    describe.add_argument("--db", required=True)
+    describe.set_defaults(handler=describe_command)
+
+    beautify = commands.add_parser("beautify", help="print the formatted sql")
+    source = beautify.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", help="sql file, - for stdin")
+    source.add_argument("--query", help="sql text")
+    beautify.set_defaults(handler=beautify_command)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except mysql.connector.Error as err:
+        print(f"error: {err}", file=sys.stderr)
+        return 1
+    except OSError as err:
+        print(f"error: {err}", file=sys.stderr)
+        return 1
+    finally:
+        engine.close_connection_pool()
+
+
+if __name__ == "__main__":
+    sys.exit(main())